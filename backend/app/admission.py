@@ -0,0 +1,160 @@
+"""
+受付制御モジュール
+同時に処理するファイルの合計サイズとファイル数を制限し、超えた分は待たせるか断る
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Tuple
+
+from fastapi import HTTPException
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionTicket:
+    """受付済みの処理が確保している枠（処理の終了時にreleaseする）"""
+
+    def __init__(self, controller: "AdmissionController", files: int, size: int):
+        self.controller = controller
+        self.files = files
+        self.size = size
+        self._released = False
+
+    def release(self) -> None:
+        """確保した枠を返却する（複数回呼び出しても1回だけ返却する）"""
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """処理中のファイルの合計サイズ・ファイル数の上限と、上限付きの待ち行列"""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_files: int,
+        queue_size: int,
+        wait_timeout: float,
+        retry_after: int
+    ):
+        """
+        Args:
+            max_bytes: 同時に処理するファイルの合計サイズの上限（0の場合は無制限）
+            max_files: 同時に処理するファイル数の上限（0の場合は無制限）
+            queue_size: 枠が空くのを待てるリクエスト数（超えた場合は429エラー）
+            wait_timeout: 枠が空くのを待つ最大秒数（超えた場合は503エラー）
+            retry_after: エラー時に返すRetry-Afterヘッダーの秒数
+        """
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.queue_size = queue_size
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self._bytes = 0
+        self._files = 0
+        self._waiters: Deque[Tuple[AdmissionTicket, asyncio.Future]] = deque()
+        self.admitted = 0
+        self.rejected = 0
+
+    async def acquire(self, files: int, size: int, background: bool = False) -> AdmissionTicket:
+        """
+        処理の枠を確保する（イベントループ上で呼び出す）
+
+        Args:
+            files: 処理するファイル数
+            size: 処理するファイルの合計サイズ（バイト）
+            background: ジョブなどバックグラウンドの処理の場合True（待ち行列の上限と待ち時間の上限を適用しない）
+
+        Raises:
+            HTTPException: 待ち行列が満杯（429）、または待ち時間の上限を超えた（503）
+        """
+        ticket = AdmissionTicket(self, files, size)
+        if not self._waiters and self._fits(ticket):
+            self._admit(ticket)
+            return ticket
+
+        if not background and len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            logger.warning(f"処理待ちのリクエストが上限に達したため拒否しました: {files}ファイル, {size} bytes")
+            raise self._error(429, "処理待ちのリクエストが多すぎます。しばらくしてから再度お試しください")
+
+        # 先着順に枠を割り当てるため、先に待っているリクエストがあれば後ろに並ぶ
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((ticket, waiter))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), None if background else self.wait_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # 枠の割り当てと同時に待ちを中止した場合は、割り当てられた枠を返す
+                ticket.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove((ticket, waiter))
+                self._wake()
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                logger.warning(f"処理待ちがタイムアウトしたため拒否しました: {files}ファイル, {size} bytes")
+                raise self._error(503, "サーバーが混雑しています。しばらくしてから再度お試しください")
+            raise
+        return ticket
+
+    def stats(self) -> dict:
+        """処理中・待機中の件数などの統計情報"""
+        return {
+            "active_bytes": self._bytes,
+            "active_files": self._files,
+            "max_bytes": self.max_bytes,
+            "max_files": self.max_files,
+            "waiting": len(self._waiters),
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+    def _fits(self, ticket: AdmissionTicket) -> bool:
+        # 何も処理していないときは、上限より大きなリクエストも単独で受け付ける
+        if self._bytes == 0 and self._files == 0:
+            return True
+        if self.max_bytes and self._bytes + ticket.size > self.max_bytes:
+            return False
+        if self.max_files and self._files + ticket.files > self.max_files:
+            return False
+        return True
+
+    def _admit(self, ticket: AdmissionTicket) -> None:
+        self._bytes += ticket.size
+        self._files += ticket.files
+        self.admitted += 1
+
+    def _release(self, ticket: AdmissionTicket) -> None:
+        self._bytes -= ticket.size
+        self._files -= ticket.files
+        self._wake()
+
+    def _wake(self) -> None:
+        # 先頭から順に、枠に収まるリクエストを受け付ける
+        while self._waiters and self._fits(self._waiters[0][0]):
+            ticket, waiter = self._waiters.popleft()
+            self._admit(ticket)
+            waiter.set_result(ticket)
+
+    def _error(self, status_code: int, detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+
+# シングルトンインスタンス
+admission_controller = AdmissionController(
+    settings.MAX_CONCURRENT_BYTES,
+    settings.MAX_CONCURRENT_FILES,
+    settings.ADMISSION_QUEUE_SIZE,
+    settings.ADMISSION_WAIT_TIMEOUT,
+    settings.ADMISSION_RETRY_AFTER
+)
@@ -0,0 +1,107 @@
+"""
+複数パターン照合モジュール
+Aho–Corasick法により、辞書中の全リテラル語句をテキスト1パスで検出する
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class AhoCorasickMatcher:
+    """リテラル語句の一括照合器（語句ごとにルールIDを関連付ける）"""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]] = ()):
+        """
+        Args:
+            entries: (語句, ルールID) の組の列
+        """
+        # 状態ごとの遷移表・失敗遷移・出力（語句, ルールID）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[str, str]]] = [[]]
+        # 初期状態で読み飛ばせない文字（いずれかの語句の先頭文字）の検索用
+        self._start_chars: Optional["re.Pattern"] = None
+        self._built = False
+        for term, rule_id in entries:
+            self.add(term, rule_id)
+        self.build()
+
+    def add(self, term: str, rule_id: str) -> None:
+        """語句を追加する（追加後はbuild()が必要）"""
+        if not term:
+            raise ValueError("空の語句は登録できません")
+        state = 0
+        for ch in term:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = nxt
+        if (term, rule_id) not in self._outputs[state]:
+            self._outputs[state].append((term, rule_id))
+        self._built = False
+
+    def build(self) -> None:
+        """失敗遷移を構築し、出力を失敗先とマージする"""
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # 接尾辞として含まれる語句の出力も引き継ぐ
+                for output in self._outputs[self._fail[nxt]]:
+                    if output not in self._outputs[nxt]:
+                        self._outputs[nxt].append(output)
+        if self._goto[0]:
+            chars = ''.join(re.escape(ch) for ch in self._goto[0])
+            self._start_chars = re.compile(f'[{chars}]')
+        else:
+            self._start_chars = None
+        self._built = True
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str, str]]:
+        """
+        テキスト中の全出現（重なりを含む）を検出する
+
+        Yields:
+            (開始オフセット, 語句, ルールID)
+        """
+        if not self._built:
+            self.build()
+        if self._start_chars is None:
+            return
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        search_start = self._start_chars.search
+        state = 0
+        i = 0
+        length = len(text)
+        while i < length:
+            if not state:
+                # 初期状態では語句の先頭になりうる文字まで正規表現（C実装）で読み飛ばす
+                m = search_start(text, i)
+                if m is None:
+                    return
+                i = m.start()
+            ch = text[i]
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if outputs[state]:
+                for term, rule_id in outputs[state]:
+                    yield i - len(term) + 1, term, rule_id
+            i += 1
@@ -0,0 +1,260 @@
+"""
+ベンチマークモジュール
+コーパスに対してチェック処理の各段階（テキスト抽出・クリーンアップ・統計取得・校正チェック）を実行し、
+段階ごとのレイテンシ（p50/p95）・スループット・ピークRSSをJSONに記録する。記録どうしを比較して性能の劣化を検出する:
+
+    python -m app.synthetic_corpus /tmp/corpus
+    python -m app.benchmark run /tmp/corpus --output baseline.json
+    python -m app.benchmark run /tmp/corpus --output current.json
+    python -m app.benchmark compare baseline.json current.json [--threshold 0.1]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 計測する処理段階（pipeline.run_check_pipelineと同じ順序）
+STAGES = ("extract", "clean", "stats", "check")
+
+# 比較する指標（値が大きいほど悪いもの）
+LATENCY_METRICS = ("p50_ms", "p95_ms")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """線形補間による百分位数（valuesは空でないこと）"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(seconds: List[float]) -> dict:
+    """所要時間（秒）のリストを集計する"""
+    if not seconds:
+        return {"count": 0}
+    return {
+        "count": len(seconds),
+        "mean_ms": round(sum(seconds) * 1000 / len(seconds), 3),
+        "p50_ms": round(percentile(seconds, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(seconds, 0.95) * 1000, 3),
+        "max_ms": round(max(seconds) * 1000, 3),
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """プロセスのピークRSS（MB、取得できない環境ではNone）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト単位
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def run_benchmark(
+    paths: Iterable[str],
+    repeat: int = 3,
+    warmup: int = 1,
+    mode: Optional[str] = None,
+    rules_path: Optional[str] = None
+) -> dict:
+    """
+    ファイルごとに各段階をrepeat回実行し、段階・形式ごとの所要時間を集計する
+
+    ファイルはあらかじめメモリに読み込み、ディスクI/Oを計測に含めない。
+    最初のwarmup回はルールのコンパイルや形態素解析器の辞書の読み込みを含むため、集計から除く。
+    """
+    from . import morphology
+    from .proofreading_rules import ENGINE_VERSION
+    from .rule_profiler import iter_corpus_files
+    from .rules_registry import get_proofreading_rules
+    from .text_extractor import TextExtractor
+
+    rules = get_proofreading_rules(rules_path)
+    if rules.morphology_backend:
+        morphology.get_tokenizer()
+
+    samples: Dict[str, Dict[str, List[float]]] = {}
+    totals: List[float] = []
+    corpus = {"files": 0, "bytes": 0, "chars": 0, "issues": 0}
+    failed = []
+    for path in iter_corpus_files(paths):
+        file_format = os.path.splitext(path)[1].lower().lstrip(".")
+        with open(path, "rb") as f:
+            data = f.read()
+        filename = os.path.basename(path)
+        try:
+            for iteration in range(warmup + repeat):
+                elapsed = {}
+                started = time.perf_counter()
+                text = TextExtractor.extract_text(data, filename)
+                elapsed["extract"] = time.perf_counter() - started
+                started = time.perf_counter()
+                text = TextExtractor.clean_extracted_text(text)
+                elapsed["clean"] = time.perf_counter() - started
+                started = time.perf_counter()
+                TextExtractor.get_text_stats(text)
+                elapsed["stats"] = time.perf_counter() - started
+                started = time.perf_counter()
+                issues = rules.check_all_rules(text, mode=mode)
+                elapsed["check"] = time.perf_counter() - started
+                if iteration < warmup:
+                    continue
+                by_stage = samples.setdefault(file_format, {stage: [] for stage in STAGES})
+                for stage in STAGES:
+                    by_stage[stage].append(elapsed[stage])
+                totals.append(sum(elapsed.values()))
+        except Exception as e:
+            logger.error(f"ベンチマークに失敗したためスキップします: {path}, エラー: {e}")
+            failed.append(path)
+            continue
+        corpus["files"] += 1
+        corpus["bytes"] += len(data)
+        corpus["chars"] += len(text)
+        corpus["issues"] += len(issues)
+
+    stages = {stage: summarize([s for by_stage in samples.values() for s in by_stage[stage]]) for stage in STAGES}
+    stages["total"] = summarize(totals)
+    elapsed_total = sum(totals)
+    runs = max(repeat, 1)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "engine_version": ENGINE_VERSION,
+        "rules_version": rules.version,
+        "morphology_backend": rules.morphology_backend,
+        "mode": mode or "default",
+        "repeat": repeat,
+        "warmup": warmup,
+        "corpus": corpus,
+        "failed_files": failed,
+        "stages": stages,
+        "formats": {
+            file_format: {stage: summarize(by_stage[stage]) for stage in STAGES}
+            for file_format, by_stage in sorted(samples.items())
+        },
+        "throughput": {
+            "files_per_sec": round(len(totals) / elapsed_total, 3) if elapsed_total else None,
+            "mb_per_sec": round(corpus["bytes"] * runs / elapsed_total / 1e6, 3) if elapsed_total else None,
+            "chars_per_sec": round(corpus["chars"] * runs / elapsed_total, 1) if elapsed_total else None,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.1, min_ms: float = 1.0) -> List[dict]:
+    """
+    2つのベンチマーク結果を比較し、threshold（割合）を超えて悪化した指標を返す
+
+    レイテンシは段階ごと・形式ごとのp50/p95を、スループットは1秒あたりのファイル数を比較する。
+    計測誤差の影響が大きいため、基準値がmin_msミリ秒未満のレイテンシは比較しない。
+    """
+    regressions = []
+
+    def check(name: str, before: Optional[float], after: Optional[float], higher_is_worse: bool = True):
+        if not before or after is None:
+            return
+        change = (after - before) / before
+        if (change if higher_is_worse else -change) > threshold:
+            regressions.append({
+                "metric": name,
+                "baseline": before,
+                "current": after,
+                "change": round(change, 3),
+            })
+
+    def check_latencies(prefix: str, before_stages: dict, after_stages: dict):
+        for stage, before in before_stages.items():
+            after = after_stages.get(stage, {})
+            for metric in LATENCY_METRICS:
+                if before.get(metric, 0) >= min_ms:
+                    check(f"{prefix}{stage}.{metric}", before.get(metric), after.get(metric))
+
+    check_latencies("stages.", baseline.get("stages", {}), current.get("stages", {}))
+    for file_format, before_stages in baseline.get("formats", {}).items():
+        check_latencies(f"formats.{file_format}.", before_stages, current.get("formats", {}).get(file_format, {}))
+    check(
+        "throughput.files_per_sec",
+        baseline.get("throughput", {}).get("files_per_sec"),
+        current.get("throughput", {}).get("files_per_sec"),
+        higher_is_worse=False
+    )
+    check("peak_rss_mb", baseline.get("peak_rss_mb"), current.get("peak_rss_mb"))
+    return regressions
+
+
+def print_result(result: dict) -> None:
+    corpus = result["corpus"]
+    print(f"files={corpus['files']} bytes={corpus['bytes']} chars={corpus['chars']} issues={corpus['issues']} "
+          f"repeat={result['repeat']} mode={result['mode']}")
+    print(f"{'stage':<16} {'count':>6} {'mean_ms':>10} {'p50_ms':>10} {'p95_ms':>10} {'max_ms':>10}")
+    rows = [(stage, stats) for stage, stats in result["stages"].items()]
+    for file_format, stages in result["formats"].items():
+        rows.extend((f"{file_format}.{stage}", stats) for stage, stats in stages.items())
+    for name, stats in rows:
+        if stats["count"]:
+            print(f"{name:<16} {stats['count']:>6} {stats['mean_ms']:>10.3f} {stats['p50_ms']:>10.3f} "
+                  f"{stats['p95_ms']:>10.3f} {stats['max_ms']:>10.3f}")
+    throughput = result["throughput"]
+    print(f"throughput: {throughput['files_per_sec']} files/s, {throughput['mb_per_sec']} MB/s, "
+          f"{throughput['chars_per_sec']} chars/s, peak RSS: {result['peak_rss_mb']} MB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="チェック処理のベンチマークを実行・比較する")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="コーパスに対してベンチマークを実行する")
+    run_parser.add_argument("paths", nargs="+", help="ドキュメントのファイルまたはディレクトリ")
+    run_parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    run_parser.add_argument("--repeat", type=int, default=3, help="各ファイルを計測する回数")
+    run_parser.add_argument("--warmup", type=int, default=1, help="計測前に実行する回数")
+    run_parser.add_argument("--mode", choices=["document", "line"], help="ルールの適用方式")
+    run_parser.add_argument("--rules", help="rules.jsonのパス（省略時はアプリケーションのルール）")
+
+    compare_parser = subparsers.add_parser("compare", help="2つの結果を比較し、悪化した指標があれば終了コード1を返す")
+    compare_parser.add_argument("baseline", help="基準とする結果のJSONファイル")
+    compare_parser.add_argument("current", help="比較する結果のJSONファイル")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="許容する悪化の割合")
+    compare_parser.add_argument("--min-ms", type=float, default=1.0, help="比較するレイテンシの基準値の下限（ミリ秒）")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        result = run_benchmark(args.paths, args.repeat, args.warmup, args.mode, args.rules)
+        print_result(result)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    regressions = compare_results(baseline, current, args.threshold, args.min_ms)
+    for regression in regressions:
+        print(f"{regression['metric']}: {regression['baseline']} → {regression['current']} "
+              f"({regression['change']:+.1%})")
+    if regressions:
+        print(f"{len(regressions)}件の指標が {args.threshold:.0%} を超えて悪化しました")
+        return 1
+    print("悪化した指標はありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
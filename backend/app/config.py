@@ -2,7 +2,17 @@
 アプリケーション設定モジュール
 """
 import os
-from typing import List
+from typing import Dict, List
+
+
+def _parse_format_counts(value: str) -> Dict[str, int]:
+    """"pdf=2,docx=1" の形式の指定を、形式（拡張子からドットを除いたもの）と数の辞書に変換する"""
+    counts = {}
+    for item in value.split(","):
+        if item.strip():
+            file_format, _, count = item.partition("=")
+            counts[file_format.strip().lower().lstrip(".")] = int(count)
+    return counts
 
 
 class Settings:
@@ -11,9 +21,26 @@ class Settings:
     # ファイルサイズ制限（バイト）
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", 200 * 1024 * 1024))  # 50MB
     
+    # アップロードを一時ファイルへ書き出す際のチャンクサイズ（バイト）
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+    
+    # メモリ上で処理するアップロードの最大サイズ（バイト）。超えるものは一時ファイルに保存しメモリマップで読む
+    IN_MEMORY_UPLOAD_LIMIT: int = int(os.getenv("IN_MEMORY_UPLOAD_LIMIT", 16 * 1024 * 1024))
+    
     # 最大ファイル数
     MAX_FILES_COUNT: int = int(os.getenv("MAX_FILES_COUNT", 100))
     
+    # 同時に処理するファイルの合計サイズ・ファイル数の上限（0の場合は無制限）
+    MAX_CONCURRENT_BYTES: int = int(os.getenv("MAX_CONCURRENT_BYTES", 1024 * 1024 * 1024))
+    MAX_CONCURRENT_FILES: int = int(os.getenv("MAX_CONCURRENT_FILES", 200))
+    
+    # 上限に達したときに処理待ちにできるリクエスト数と、待つ最大秒数
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", 32))
+    ADMISSION_WAIT_TIMEOUT: float = float(os.getenv("ADMISSION_WAIT_TIMEOUT", 30))
+    
+    # 処理待ちが上限を超えて拒否した場合に返すRetry-Afterの秒数
+    ADMISSION_RETRY_AFTER: int = int(os.getenv("ADMISSION_RETRY_AFTER", 5))
+    
     # 一時ファイル保存ディレクトリ
     TEMP_DIR: str = os.getenv("TEMP_DIR", "/tmp")
     
@@ -25,15 +52,99 @@ class Settings:
         '.pptx'               # PowerPoint (新形式のみ)
     ]
     
+    # Excelを読み取り専用（ストリーミング）モードで読み込むか
+    EXCEL_READ_ONLY: bool = os.getenv("EXCEL_READ_ONLY", "true").lower() in ("1", "true", "yes")
+    
+    # Excelのシートごとに抽出する最大行数・最大セル数（空でないもののみ数える。0の場合は無制限）
+    EXCEL_MAX_ROWS_PER_SHEET: int = int(os.getenv("EXCEL_MAX_ROWS_PER_SHEET", 0))
+    EXCEL_MAX_CELLS_PER_SHEET: int = int(os.getenv("EXCEL_MAX_CELLS_PER_SHEET", 0))
+    
     # CORS設定
     CORS_ORIGINS: List[str] = os.getenv("CORS_ORIGINS", "*").split(",")
     
     # 校正チェック設定
     MAX_SENTENCE_LENGTH: int = int(os.getenv("MAX_SENTENCE_LENGTH", 120))
     
+    # ルール適用方式（"document": 文書全体に一括適用, "line": 行ごとに適用）
+    CHECK_MODE: str = os.getenv("CHECK_MODE", "document")
+    
+    # ワーカープロセス数（テキスト抽出と校正チェックを並列実行する。0の場合はプロセスを使わない）
+    WORKER_PROCESSES: int = int(os.getenv("WORKER_PROCESSES", os.cpu_count() or 1))
+    
+    # ワーカープロセスの起動方式（forkserver / spawn / fork）
+    WORKER_START_METHOD: str = os.getenv("WORKER_START_METHOD", "forkserver")
+    
+    # PDFをページ範囲ごとに並列抽出するプロセス数と、並列化するPDFの最小ページ数（1以下の場合は並列化しない）
+    # ワーカープールを使う場合はファイル単位で並列化されるため、コア数を取り合わないようデフォルトでは並列化しない
+    PDF_PAGE_WORKERS: int = int(os.getenv("PDF_PAGE_WORKERS", 1 if WORKER_PROCESSES > 0 else min(4, os.cpu_count() or 1)))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 64))
+    
+    # 形式ごとの専用ワーカープール（"pdf=2,docx=1" の形式で形式とプロセス数を指定する。指定しない形式は共通のプールで処理する）
+    FORMAT_WORKER_POOLS: Dict[str, int] = _parse_format_counts(os.getenv("FORMAT_WORKER_POOLS", ""))
+    
+    # 共通のワーカープールで形式ごとに同時に処理するファイル数の上限（"pdf=2" の形式。指定しない形式は形式ごとの既定の割合から決める）
+    FORMAT_CONCURRENCY: Dict[str, int] = _parse_format_counts(os.getenv("FORMAT_CONCURRENCY", ""))
+    
+    # 起動時に抽出ライブラリを読み込んでおく形式（カンマ区切り。指定しない形式は最初に使うときに読み込む）
+    PRELOAD_FORMATS: List[str] = [
+        f.strip().lower().lstrip(".") for f in os.getenv("PRELOAD_FORMATS", "").split(",") if f.strip()
+    ]
+    
+    # サーバーモード（python -m app.server）で起動するHTTPワーカープロセス数
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", os.cpu_count() or 1))
+    
+    # チェック結果キャッシュ（メモリ層の最大件数と合計サイズの上限（バイト）。件数が0の場合は無効、サイズが0の場合は件数のみで制限）
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", 256))
+    RESULT_CACHE_MEMORY_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_MEMORY_MAX_BYTES", 64 * 1024 * 1024))
+    
+    # チェック結果キャッシュのディスク層（保存ディレクトリ。空の場合は無効）
+    RESULT_CACHE_DIR: str = os.getenv("RESULT_CACHE_DIR", "")
+    
+    # ディスク層の合計サイズ上限（バイト）
+    RESULT_CACHE_DISK_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024))
+    
+    # 助詞・連続語句のルールに使う形態素解析器（janome: Janomeがインストールされていれば使う / none: 使わない）
+    MORPHOLOGY_TOKENIZER: str = os.getenv("MORPHOLOGY_TOKENIZER", "janome")
+    
+    # rules.jsonの変更を確認する間隔（秒、0の場合は監視しない）
+    RULES_WATCH_INTERVAL: float = float(os.getenv("RULES_WATCH_INTERVAL", 2.0))
+    
+    # 外部ルール（正規表現）の処理時間の上限（ミリ秒）。ルール1件ごとと、文書1件あたりの全ルールの合計（0の場合は無制限）
+    EXTERNAL_RULE_TIMEOUT_MS: int = int(os.getenv("EXTERNAL_RULE_TIMEOUT_MS", 2000))
+    EXTERNAL_RULES_DOCUMENT_TIMEOUT_MS: int = int(os.getenv("EXTERNAL_RULES_DOCUMENT_TIMEOUT_MS", 10000))
+    
+    # 校正ルール1件が文書1件に使える時間（ミリ秒、0の場合は予算を設けない）
+    RULE_TIME_BUDGET_MS: float = float(os.getenv("RULE_TIME_BUDGET_MS", 500))
+    
+    # 時間予算を超えたルールの扱い（flag: 警告とプロファイルへの記録のみ / disable: 無効化）と、無効化までの超過回数
+    RULE_BUDGET_ACTION: str = os.getenv("RULE_BUDGET_ACTION", "flag")
+    RULE_DISABLE_AFTER: int = int(os.getenv("RULE_DISABLE_AFTER", 3))
+    
+    # 問題をルールごとに集約して返す場合（issue_format=grouped）に、ルールごとに含める例の件数の既定値
+    ISSUE_GROUP_MAX_EXAMPLES: int = int(os.getenv("ISSUE_GROUP_MAX_EXAMPLES", 5))
+    
+    # ジョブキュー（実行待ちにできるジョブの最大数と、同時に実行するジョブ数）
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", 100))
+    JOB_CONCURRENCY: int = int(os.getenv("JOB_CONCURRENCY", 2))
+    
+    # 実行待ちのジョブのファイルサイズの合計の上限（バイト、0の場合は無制限）。ジョブのファイルは一時ファイルに保存する
+    JOB_MAX_QUEUED_BYTES: int = int(os.getenv("JOB_MAX_QUEUED_BYTES", 1024 * 1024 * 1024))
+    
+    # ジョブ結果の保持期間（秒）
+    JOB_RESULT_TTL: int = int(os.getenv("JOB_RESULT_TTL", 3600))
+    
+    # ジョブの保存先SQLiteファイル（空の場合はメモリ上にのみ保持する）
+    JOB_STORE_PATH: str = os.getenv("JOB_STORE_PATH", "")
+    
+    # ジョブキューが満杯の場合に再試行を促すまでの秒数（Retry-Afterヘッダー）
+    JOB_RETRY_AFTER: int = int(os.getenv("JOB_RETRY_AFTER", 5))
+    
     # ログレベル
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
+    # デバッグモード（チェック結果に処理段階・ルールごとの所要時間を含める）
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+    
     # APIのタイトルと説明
     API_TITLE: str = "ドキュメント事前チェックツール API"
     API_DESCRIPTION: str = "ドキュメントの誤字脱字や表記ゆれをチェックするツール"
@@ -0,0 +1,298 @@
+"""
+ワーカープール管理モジュール
+テキスト抽出や校正チェックなどのCPU負荷の高い処理をプロセスプールで実行する
+"""
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from . import pipeline
+from .config import settings
+from .format_backends import format_backends
+from .text_extractor import extractor_registry
+
+logger = logging.getLogger(__name__)
+
+
+class PoolScheduler:
+    """
+    プロセスプールへの投入順と形式ごとの同時実行数を管理するスケジューラー
+
+    プールのワーカー数を超える処理は待機させ、空きが出たら優先度（小さいほど先）の順に投入する。
+    形式ごとの上限に達している形式の処理は飛ばし、他の形式の処理を先に投入する。
+    イベントループのスレッドからのみ使う。
+    """
+
+    def __init__(self, capacity: int, format_limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            capacity: 同時に投入する処理の数（プールのワーカー数）
+            format_limits: 形式ごとの同時に投入する処理の上限（指定しない形式はcapacityまで）
+        """
+        self.capacity = capacity
+        self.format_limits = dict(format_limits or {})
+        self._active = 0
+        self._active_by_format: Dict[Optional[str], int] = {}
+        # (優先度, 到着順, 形式, 投入を知らせるFuture)
+        self._waiting: List[tuple] = []
+        self._sequence = itertools.count()
+
+    async def acquire(self, file_format: Optional[str], priority: tuple = ()) -> None:
+        """投入できるまで待ち、枠を確保する（処理が終わったらreleaseで返す）"""
+        if self._can_start(file_format):
+            self._start(file_format)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), file_format, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 枠を確保した直後に中止された場合は返す（待機中に中止された場合は投入時に読み飛ばす）
+            if future.done() and not future.cancelled():
+                self.release(file_format)
+            raise
+
+    def release(self, file_format: Optional[str]) -> None:
+        self._active -= 1
+        self._active_by_format[file_format] -= 1
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "active": self._active,
+            "waiting": sum(1 for entry in self._waiting if not entry[3].done()),
+            "format_limits": self.format_limits,
+        }
+
+    def _can_start(self, file_format: Optional[str]) -> bool:
+        if self._active >= self.capacity:
+            return False
+        limit = self.format_limits.get(file_format)
+        return limit is None or self._active_by_format.get(file_format, 0) < limit
+
+    def _start(self, file_format: Optional[str]) -> None:
+        self._active += 1
+        self._active_by_format[file_format] = self._active_by_format.get(file_format, 0) + 1
+
+    def _dispatch(self) -> None:
+        blocked = []
+        while self._waiting and self._active < self.capacity:
+            entry = heapq.heappop(self._waiting)
+            file_format, future = entry[2], entry[3]
+            if future.done():
+                continue
+            if not self._can_start(file_format):
+                blocked.append(entry)
+                continue
+            self._start(file_format)
+            future.set_result(None)
+        for entry in blocked:
+            heapq.heappush(self._waiting, entry)
+
+
+class CheckExecutor:
+    """チェック処理用のプロセスプール（共通のプールと、形式ごとの専用プール）"""
+
+    def __init__(
+        self,
+        max_workers: int,
+        start_method: str = "forkserver",
+        format_workers: Optional[Dict[str, int]] = None,
+        preload_formats: Sequence[str] = (),
+        format_concurrency: Optional[Dict[str, int]] = None
+    ):
+        """
+        Args:
+            max_workers: 共通のプールのワーカープロセス数（0の場合はプロセスを使わずスレッドプールで実行）
+            start_method: ワーカープロセスの起動方式
+            format_workers: 専用のプールで処理する形式と、そのワーカープロセス数
+            preload_formats: 起動時に抽出ライブラリを読み込んでおく形式
+            format_concurrency: 共通のプールで形式ごとに同時に処理するファイル数の上限
+                                （指定しない形式は、形式の定義のpool_shareから決める）
+        """
+        self.max_workers = max_workers
+        self.start_method = start_method
+        self.format_workers = {f: n for f, n in (format_workers or {}).items() if n > 0}
+        self.preload_formats = tuple(preload_formats)
+        self.format_concurrency = dict(format_concurrency or {})
+        # 形式 → プロセスプール・スケジューラー（Noneは共通のプール）
+        self._pools: Dict[Optional[str], ProcessPoolExecutor] = {}
+        self._schedulers: Dict[Optional[str], PoolScheduler] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._pools)
+
+    def start(self) -> None:
+        """
+        プロセスプールを起動し、全ワーカーをウォームアップする
+
+        共通のプールのワーカーはpreload_formatsの、専用のプールのワーカーはその形式の抽出ライブラリだけを読み込む。
+        """
+        if self._pools:
+            return
+        self.validate_formats()
+        timeouts = settings.EXTERNAL_RULE_TIMEOUT_MS > 0 or settings.EXTERNAL_RULES_DOCUMENT_TIMEOUT_MS > 0
+        if self.max_workers <= 0 and timeouts:
+            # 時間制限による中断はシグナルを使うため、メインスレッドでしか行えない
+            logger.warning(
+                "WORKER_PROCESSES=0 のため、外部ルールの照合を途中で中断できません。"
+                "処理時間の上限はルールの間と行の間でのみ確認します"
+            )
+        for file_format, workers in self._pool_sizes().items():
+            pool = self._pools[file_format] = self._create_pool(workers, self.start_method)
+            if file_format is None:
+                # 専用のプールがある形式は共通のプールに投入しないため、制限しない
+                limits = extractor_registry.concurrency_limits(workers, self.format_concurrency)
+                limits = {f: n for f, n in limits.items() if f not in self.format_workers}
+                self._schedulers[file_format] = PoolScheduler(workers, limits)
+            else:
+                self._schedulers[file_format] = PoolScheduler(workers)
+            self._warm_up(file_format, pool)
+
+    def shutdown(self) -> None:
+        """プロセスプールを停止する"""
+        if self._pools:
+            for pool in self._pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+            self._pools = {}
+            self._schedulers = {}
+            logger.info("ワーカープロセスを停止しました")
+
+    def stats(self) -> Dict[str, dict]:
+        """プールごとの実行中・待機中の処理数（キーは形式、共通のプールは "shared"）"""
+        return {
+            "shared" if file_format is None else file_format: scheduler.stats()
+            for file_format, scheduler in self._schedulers.items()
+        }
+
+    async def run(
+        self,
+        func: Callable,
+        *args: Any,
+        file_format: Optional[str] = None,
+        priority: tuple = ()
+    ) -> Any:
+        """
+        関数をワーカープールで実行し、結果を待つ
+
+        file_formatの専用のプールがあればそのプールで、なければ共通のプールで実行する。
+        プールのワーカーがすべて使用中の場合はpriorityの小さい順に投入し、
+        共通のプールでは形式ごとの上限を超えて同時に投入しない。
+        プロセスプールが起動していない場合は既定のスレッドプールで実行するため、
+        いずれの場合もイベントループをブロックしない。
+        """
+        loop = asyncio.get_running_loop()
+        key = file_format if file_format in self._pools else None
+        pool = self._pools.get(key)
+        scheduler = self._schedulers.get(key)
+        try:
+            if scheduler is None:
+                return await loop.run_in_executor(pool, functools.partial(func, *args))
+            await scheduler.acquire(file_format, priority)
+            try:
+                future = pool.submit(func, *args)
+            except BaseException:
+                scheduler.release(file_format)
+                raise
+            # 待機中のリクエストが中止されてもワーカーでは処理が続くため、枠は処理が終わってから返す
+            future.add_done_callback(functools.partial(self._release_soon, loop, scheduler, file_format))
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # ワーカーの異常終了（メモリ不足など）でプールが壊れた場合は作り直す
+            if pool is not None and self._pools.get(key) is pool:
+                await self._restart_pool(key, pool)
+            raise
+
+    async def _restart_pool(self, file_format: Optional[str], broken: ProcessPoolExecutor) -> None:
+        """壊れたプロセスプールを作り直し、起動時と同じようにウォームアップする"""
+        start_method = self.start_method
+        if start_method == "fork":
+            # 起動後のプロセスではイベントループやジョブのスレッドが動いているため、forkで作り直すと
+            # ロックなどの状態を引き継いだワーカーになる。作り直すプールはforkserverで起動する
+            if "forkserver" not in multiprocessing.get_all_start_methods():
+                logger.error(
+                    "ワーカープロセスが異常終了しましたが、forkで起動したプールは再起動できません。サーバーを再起動してください"
+                )
+                return
+            start_method = "forkserver"
+        logger.error(f"ワーカープロセスが異常終了したため、プロセスプールを再起動します（起動方式: {start_method}）")
+        # 再起動中に届いた処理も新しいプールに投入されるよう、ウォームアップの前に置き換える
+        pool = self._pools[file_format] = self._create_pool(self._pool_sizes()[file_format], start_method)
+        broken.shutdown(wait=False, cancel_futures=True)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._warm_up, file_format, pool)
+        except Exception as e:
+            logger.error(f"再起動したプロセスプールのウォームアップに失敗しました: {e}")
+
+    @staticmethod
+    def _release_soon(loop, scheduler: PoolScheduler, file_format: Optional[str], future) -> None:
+        try:
+            loop.call_soon_threadsafe(scheduler.release, file_format)
+        except RuntimeError:
+            # イベントループが終了している（停止中）
+            pass
+
+    def validate_formats(self) -> None:
+        """
+        形式ごとの設定に、登録されていない形式が含まれていないか確認する（形式名の誤りを無視しないため）
+
+        Raises:
+            ValueError: 登録されていない形式が含まれる場合
+        """
+        for setting, formats, supported in (
+            ("FORMAT_WORKER_POOLS", self.format_workers, extractor_registry.formats),
+            ("FORMAT_CONCURRENCY", self.format_concurrency, extractor_registry.formats),
+            ("PRELOAD_FORMATS", self.preload_formats, format_backends.formats),
+        ):
+            unknown = [f for f in formats if f not in supported]
+            if unknown:
+                raise ValueError(
+                    f"{setting}にサポートされていない形式があります: {', '.join(unknown)}"
+                    f"（対応している形式: {', '.join(supported)}）"
+                )
+
+    def _pool_sizes(self) -> Dict[Optional[str], int]:
+        sizes: Dict[Optional[str], int] = dict(self.format_workers)
+        if self.max_workers > 0:
+            sizes[None] = self.max_workers
+        return sizes
+
+    def _warm_up(self, file_format: Optional[str], pool: ProcessPoolExecutor) -> None:
+        """プールの全ワーカーで抽出ライブラリを読み込み、読み込み時間を記録する（完了するまでブロックする）"""
+        workers = self._pool_sizes()[file_format]
+        formats = self.preload_formats if file_format is None else (file_format,)
+        futures = [pool.submit(pipeline.warm_up_worker, formats) for _ in range(workers)]
+        pids = set()
+        for future in futures:
+            pid, imports = future.result()
+            pids.add(pid)
+            format_backends.record_worker_imports(imports)
+        label = "共通" if file_format is None else file_format
+        logger.info(f"ワーカープロセスを起動しました: {label}のプール, {len(pids)}プロセス")
+
+    def _create_pool(self, max_workers: int, start_method: str) -> ProcessPoolExecutor:
+        context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            # フォークサーバーで重いモジュールを読み込んでおき、各ワーカーはそこからフォークする
+            # （フォークサーバーは全プールで共有するため、ここで読み込むのはpreload_formatsの抽出ライブラリだけ）
+            modules = [format_backends.backends[name].module for name in format_backends.backends_for(self.preload_formats)]
+            context.set_forkserver_preload([pipeline.__name__, *modules])
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+
+
+# シングルトンインスタンス
+check_executor = CheckExecutor(
+    settings.WORKER_PROCESSES,
+    settings.WORKER_START_METHOD,
+    settings.FORMAT_WORKER_POOLS,
+    settings.PRELOAD_FORMATS,
+    settings.FORMAT_CONCURRENCY
+)
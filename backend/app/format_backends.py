@@ -0,0 +1,157 @@
+"""
+形式ライブラリ管理モジュール
+ドキュメント形式ごとの抽出ライブラリ（PyMuPDF・PyPDF2・python-docx・openpyxl・python-pptx）を
+最初に使うときに読み込み、読み込みにかかった時間を記録する
+
+起動時にすべてのライブラリを読み込まないため、プロセスの起動（--reloadでの再起動を含む）が速くなり、
+特定の形式だけを処理するワーカーは他の形式のライブラリを読み込まずに済む。
+"""
+import importlib
+import logging
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Iterable, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class FormatBackend(NamedTuple):
+    """抽出ライブラリの定義"""
+    name: str
+    module: str
+    formats: tuple
+
+
+# 抽出ライブラリの一覧（PyPDF2はPyMuPDFで抽出できないページの読み直しに使う）
+BACKENDS = (
+    FormatBackend("pymupdf", "fitz", ("pdf",)),
+    FormatBackend("pypdf2", "PyPDF2", ("pdf",)),
+    FormatBackend("python-docx", "docx", ("docx",)),
+    FormatBackend("openpyxl", "openpyxl", ("xlsx",)),
+    FormatBackend("python-pptx", "pptx", ("pptx",)),
+)
+
+
+class FormatBackendRegistry:
+    """抽出ライブラリを遅延して読み込み、プロセスごとの読み込み時間と、ワーカーから報告された読み込み時間を保持する"""
+
+    def __init__(self, backends: Iterable[FormatBackend]):
+        self.backends: Dict[str, FormatBackend] = {backend.name: backend for backend in backends}
+        self._modules: Dict[str, ModuleType] = {}
+        self._import_seconds: Dict[str, float] = {}
+        # リクエストの処理中に読み込み、まだ呼び出し元に報告していないもの
+        self._pending: Dict[str, float] = {}
+        # ワーカープロセスから報告された読み込み（ライブラリ名 → 回数・合計秒数・最大秒数）
+        self._worker_imports: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def formats(self) -> List[str]:
+        """対応している形式（拡張子からドットを除いたもの）"""
+        return sorted({file_format for backend in self.backends.values() for file_format in backend.formats})
+
+    def load(self, name: str) -> ModuleType:
+        """
+        抽出ライブラリのモジュールを返す（読み込んでいなければ読み込む）
+
+        Raises:
+            KeyError: 登録されていないライブラリの場合
+            ImportError: ライブラリがインストールされていない場合
+        """
+        module = self._modules.get(name)
+        if module is None:
+            module, seconds = self._import(name)
+            if seconds is not None:
+                with self._lock:
+                    self._pending[name] = seconds
+        return module
+
+    def preload(self, formats: Iterable[str]) -> Dict[str, float]:
+        """
+        指定した形式の抽出ライブラリを読み込む（起動時のウォームアップ用）
+
+        Args:
+            formats: 形式（"pdf" / ".pdf" のどちらでもよい）
+
+        Returns:
+            この呼び出しで新たに読み込んだライブラリと、読み込みにかかった秒数
+
+        Raises:
+            ValueError: 対応していない形式が含まれる場合
+        """
+        imported = {}
+        for name in self.backends_for(formats):
+            _, seconds = self._import(name)
+            if seconds is not None:
+                imported[name] = seconds
+        if imported:
+            logger.info(
+                "抽出ライブラリを読み込みました: "
+                + ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in imported.items())
+            )
+        return imported
+
+    def backends_for(self, formats: Iterable[str]) -> List[str]:
+        """形式の抽出に使うライブラリ名の一覧"""
+        names = []
+        for file_format in formats:
+            file_format = file_format.lower().lstrip(".")
+            matched = [backend.name for backend in self.backends.values() if file_format in backend.formats]
+            if not matched:
+                raise ValueError(f"サポートされていない形式です: {file_format}")
+            names.extend(name for name in matched if name not in names)
+        return names
+
+    def take_pending_imports(self) -> Dict[str, float]:
+        """リクエストの処理中に読み込んだライブラリと秒数を返し、記録を消す（ワーカーから呼び出し元への報告用）"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def record_worker_imports(self, imports: Dict[str, float]) -> None:
+        """ワーカープロセスから報告された読み込み時間を記録する"""
+        with self._lock:
+            for name, seconds in imports.items():
+                record = self._worker_imports.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+                record["count"] += 1
+                record["total"] += seconds
+                record["max"] = max(record["max"], seconds)
+
+    def stats(self) -> Dict[str, dict]:
+        """ライブラリごとの読み込み状況（このプロセスでの読み込み時間と、ワーカーでの読み込み回数・時間）"""
+        with self._lock:
+            result = {}
+            for name, backend in self.backends.items():
+                seconds = self._import_seconds.get(name)
+                worker = self._worker_imports.get(name)
+                result[name] = {
+                    "module": backend.module,
+                    "formats": list(backend.formats),
+                    "loaded": name in self._modules,
+                    "import_ms": round(seconds * 1000, 1) if seconds is not None else None,
+                    "worker_imports": worker["count"] if worker else 0,
+                    "worker_import_ms_mean": round(worker["total"] * 1000 / worker["count"], 1) if worker else None,
+                    "worker_import_ms_max": round(worker["max"] * 1000, 1) if worker else None,
+                }
+            return result
+
+    def _import(self, name: str):
+        """モジュールと、新たに読み込んだ場合はその秒数（読み込み済みの場合はNone）を返す"""
+        backend = self.backends[name]
+        with self._lock:
+            module = self._modules.get(name)
+            if module is not None:
+                return module, None
+            # 同じライブラリを複数のスレッドで同時に読み込まないよう、ロックを保持したまま読み込む
+            started = time.perf_counter()
+            module = importlib.import_module(backend.module)
+            seconds = time.perf_counter() - started
+            self._modules[name] = module
+            self._import_seconds[name] = seconds
+        logger.debug(f"抽出ライブラリを読み込みました: {name} ({seconds * 1000:.1f}ms)")
+        return module, seconds
+
+
+# シングルトンインスタンス
+format_backends = FormatBackendRegistry(BACKENDS)
@@ -0,0 +1,193 @@
+"""
+校正結果の問題モジュール
+検出された問題をコンパクトに保持し、APIの出力形式（一覧・ルールごとの集約）に変換する
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List
+
+
+class RuleInfo:
+    """ルールのメタ情報（同じルールの問題すべてで1つのインスタンスを共有する）"""
+    __slots__ = ("rule", "type", "severity", "suggestion")
+
+    def __init__(self, rule: str, type: str, severity: str, suggestion: str):
+        self.rule = rule
+        self.type = type
+        self.severity = severity
+        self.suggestion = suggestion
+
+    def to_dict(self) -> dict:
+        return {
+            "rule": self.rule,
+            "type": self.type,
+            "severity": self.severity,
+            "suggestion": self.suggestion,
+        }
+
+
+class Issue:
+    """
+    検出された問題1件
+
+    ルールのメタ情報は文字列を複製せずRuleInfoを参照する。columnは行内の位置（1始まり）。
+    """
+    __slots__ = ("info", "line", "column", "message")
+
+    def __init__(self, info: RuleInfo, line: int, column: int, message: str):
+        self.info = info
+        self.line = line
+        self.column = column
+        self.message = message
+
+    @property
+    def rule(self) -> str:
+        return self.info.rule
+
+    @property
+    def type(self) -> str:
+        return self.info.type
+
+    @property
+    def severity(self) -> str:
+        return self.info.severity
+
+    @property
+    def suggestion(self) -> str:
+        return self.info.suggestion
+
+    def to_dict(self) -> dict:
+        """APIの出力形式の辞書"""
+        info = self.info
+        return {
+            "type": info.type,
+            "severity": info.severity,
+            "line": self.line,
+            "column": self.column,
+            "message": self.message,
+            "rule": info.rule,
+            "suggestion": info.suggestion,
+        }
+
+    def __reduce__(self):
+        # プロセス間の受け渡しで属性名を繰り返し書き出さない
+        return (Issue, (self.info, self.line, self.column, self.message))
+
+    def __repr__(self) -> str:
+        return f"Issue({self.info.rule!r}, line={self.line}, column={self.column}, message={self.message!r})"
+
+
+class IssueTable:
+    """
+    問題の一覧を、ルールのメタ情報の表・メッセージの表と、整数の配列で表したもの
+
+    各問題は (ルールの番号, 行, 列, メッセージの番号) の4つの整数で表し、
+    同じルール・同じメッセージの問題が多い文書でも文字列は1回しか持たない。
+    to_dict() の結果はJSONに変換でき、ワーカーからの受け渡しと結果キャッシュに使う。
+    """
+    _FIELDS = 4
+
+    def __init__(self, rules: List[dict], messages: List[str], rows: Iterable[int]):
+        self.rules = rules
+        self.messages = messages
+        self.rows = array("l", rows)
+
+    @classmethod
+    def from_issues(cls, issues: Iterable[Issue]) -> "IssueTable":
+        rule_numbers: Dict[int, int] = {}
+        message_numbers: Dict[str, int] = {}
+        rules: List[dict] = []
+        messages: List[str] = []
+        rows = array("l")
+        for issue in issues:
+            # RuleInfoは同じルールで共有されているため、インスタンスで識別する
+            rule_number = rule_numbers.get(id(issue.info))
+            if rule_number is None:
+                rule_number = rule_numbers[id(issue.info)] = len(rules)
+                rules.append(issue.info.to_dict())
+            message_number = message_numbers.get(issue.message)
+            if message_number is None:
+                message_number = message_numbers[issue.message] = len(messages)
+                messages.append(issue.message)
+            rows.extend((rule_number, issue.line, issue.column, message_number))
+        return cls(rules, messages, rows)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IssueTable":
+        return cls(data["rules"], data["messages"], data["rows"])
+
+    @classmethod
+    def from_dicts(cls, issues: Iterable[dict]) -> "IssueTable":
+        """APIの出力形式の辞書の一覧から作成する"""
+        infos: Dict[tuple, RuleInfo] = {}
+        converted = []
+        for issue in issues:
+            key = (issue["rule"], issue["type"], issue["severity"], issue.get("suggestion", ""))
+            info = infos.get(key)
+            if info is None:
+                info = infos[key] = RuleInfo(*key)
+            converted.append(Issue(info, issue["line"], issue.get("column", 1), issue["message"]))
+        return cls.from_issues(converted)
+
+    def to_dict(self) -> dict:
+        return {"rules": self.rules, "messages": self.messages, "rows": self.rows.tolist()}
+
+    def __len__(self) -> int:
+        return len(self.rows) // self._FIELDS
+
+    def _iter_rows(self) -> Iterator[tuple]:
+        rows = self.rows
+        for i in range(0, len(rows), self._FIELDS):
+            yield rows[i], rows[i + 1], rows[i + 2], rows[i + 3]
+
+    def to_dicts(self) -> List[dict]:
+        """APIの出力形式（問題1件ごとの辞書）の一覧"""
+        rules, messages = self.rules, self.messages
+        return [
+            {
+                "type": rules[rule_number]["type"],
+                "severity": rules[rule_number]["severity"],
+                "line": line,
+                "column": column,
+                "message": messages[message_number],
+                "rule": rules[rule_number]["rule"],
+                "suggestion": rules[rule_number]["suggestion"],
+            }
+            for rule_number, line, column, message_number in self._iter_rows()
+        ]
+
+    def count_by_rule(self) -> Dict[str, int]:
+        """ルールIDごとの件数"""
+        counts: Dict[str, int] = {}
+        for rule_number in self.rows[::self._FIELDS]:
+            rule_id = self.rules[rule_number]["rule"]
+            counts[rule_id] = counts.get(rule_id, 0) + 1
+        return counts
+
+    def group(self, max_examples: int) -> List[dict]:
+        """
+        ルールごとに集約した一覧（最初に現れた順）
+
+        ルールのメタ情報（提案を含む）が同じ問題を1つにまとめ、件数と、
+        先頭から最大max_examples件の例（行・列・メッセージ）を返す。
+        """
+        groups: Dict[int, dict] = {}
+        for rule_number, line, column, message_number in self._iter_rows():
+            group = groups.get(rule_number)
+            if group is None:
+                group = groups[rule_number] = dict(self.rules[rule_number], count=0, examples=[])
+            group["count"] += 1
+            if len(group["examples"]) < max_examples:
+                group["examples"].append({
+                    "line": line,
+                    "column": column,
+                    "message": self.messages[message_number],
+                })
+        return list(groups.values())
+
+
+def count_by_rule(issues: Iterable[Issue]) -> Dict[str, int]:
+    """ルールIDごとの件数"""
+    counts: Dict[str, int] = {}
+    for issue in issues:
+        counts[issue.rule] = counts.get(issue.rule, 0) + 1
+    return counts
@@ -0,0 +1,418 @@
+"""
+ジョブ管理モジュール
+アップロードされたファイルのチェックをジョブとしてキューに積み、バックグラウンドで実行する
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from .admission import admission_controller
+from .config import settings
+from .utils import FileHandler, StoredUpload
+
+logger = logging.getLogger(__name__)
+
+# ジョブに渡す入力（受信済みのファイル、または受信に失敗したファイルのエラー結果）
+JobInput = Union[StoredUpload, dict]
+
+
+class JobFile(BaseModel):
+    """ジョブ内のファイル1件の進捗"""
+    filename: str
+    status: str = "queued"  # queued / processing / success / error
+    issue_count: int = 0
+
+
+class Job(BaseModel):
+    """チェックジョブ"""
+    job_id: str
+    status: str = "queued"  # queued / running / completed / failed
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    files: List[JobFile]
+    results: List[Optional[dict]]
+    error_message: Optional[str] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        """結果の保持期限（完了していないジョブは期限なし）"""
+        if self.finished_at is None:
+            return None
+        return self.finished_at + settings.JOB_RESULT_TTL
+
+    def summary(self) -> dict:
+        """チェック結果を除いた進捗情報"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.expires_at,
+            "total_files": len(self.files),
+            "completed_files": len([f for f in self.files if f.status in ("success", "error")]),
+            "processed_files": len([f for f in self.files if f.status == "success"]),
+            "files": [f.model_dump() for f in self.files],
+            "error_message": self.error_message,
+        }
+
+
+class JobStore:
+    """
+    ジョブの保存先（メモリ上の辞書と、任意のSQLiteファイル）
+
+    SQLiteには、ジョブの進捗（チェック結果を除く）をjobsに、ファイルごとのチェック結果をjob_resultsに保存する。
+    ファイルが完了するたびに、それまでの結果をまとめて書き直さないようにするため。
+    """
+
+    def __init__(self, db_path: str = ""):
+        """
+        Args:
+            db_path: SQLiteファイルのパス（空の場合はメモリ上にのみ保持する）
+        """
+        self.db_path = db_path
+        # SQLiteファイルを他のサーバープロセスと共有しているか（app.serverで複数のワーカーを起動する場合）。
+        # 共有している場合、他のプロセスのジョブは常にSQLiteから読み、失敗として記録するのは自プロセスのジョブに限る
+        self.shared = False
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def open(self) -> None:
+        """SQLiteファイルを開き、前回終了時に未完了だったジョブを失敗として記録する"""
+        if self.db_path and self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, expires_at REAL, data TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS job_results ("
+                "job_id TEXT NOT NULL, file_index INTEGER NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (job_id, file_index))"
+            )
+            self._db.commit()
+        if self.shared:
+            # 前回の未完了ジョブは、ワーカーを起動する前にサーバーの親プロセスで記録済み
+            return
+        # アップロードされた内容はメモリや一時ファイルにしかないため、前回の未完了ジョブは再開できない
+        interrupted = self.fail_unfinished("サーバーの再起動により中断されました")
+        if interrupted:
+            logger.warning(f"中断されたジョブを失敗として記録しました: {interrupted}件")
+
+    def save(self, job: Job) -> None:
+        """ジョブの進捗を保存する（チェック結果はsave_resultで保存する）"""
+        with self._lock:
+            self._save(job)
+
+    def save_result(self, job: Job, index: int) -> None:
+        """ファイル1件のチェック結果と、ジョブの進捗を保存する"""
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO job_results (job_id, file_index, data) VALUES (?, ?, ?)",
+                    (job.job_id, index, json.dumps(job.results[index], ensure_ascii=False))
+                )
+            self._save(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None and self._db is not None:
+                # 再起動前に完了したジョブはSQLiteから読み込む
+                row = self._db.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if row is not None:
+                    job = self._load(row[0])
+                    # 他のプロセスで実行中のジョブは進捗が変わるため、完了するまで保持しない
+                    if job.is_finished or not self.shared:
+                        self._jobs[job_id] = job
+        if job is not None and job.expires_at is not None and job.expires_at <= time.time():
+            return None
+        return job
+
+    def purge_expired(self) -> int:
+        """保持期限を過ぎたジョブを削除し、削除件数を返す"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.expires_at is not None and job.expires_at <= now
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM job_results WHERE job_id IN (SELECT job_id FROM jobs WHERE expires_at <= ?)",
+                    (now,)
+                )
+                cursor = self._db.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,))
+                self._db.commit()
+                return max(len(expired), cursor.rowcount)
+        return len(expired)
+
+    def fail_unfinished(self, message: str) -> int:
+        """未完了のジョブをすべて失敗として記録し、件数を返す"""
+        with self._lock:
+            jobs = {job.job_id: job for job in self._jobs.values() if not job.is_finished}
+            if self._db is not None and not self.shared:
+                rows = self._db.execute(
+                    "SELECT data FROM jobs WHERE status IN ('queued', 'running')"
+                ).fetchall()
+                for (data,) in rows:
+                    job = self._load(data)
+                    jobs.setdefault(job.job_id, job)
+            for job in jobs.values():
+                job.status = "failed"
+                job.finished_at = time.time()
+                job.error_message = message
+                self._save(job)
+        return len(jobs)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _save(self, job: Job) -> None:
+        self._jobs[job.job_id] = job
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, expires_at, data) VALUES (?, ?, ?, ?)",
+                (job.job_id, job.status, job.expires_at, job.model_dump_json(exclude={"results"}))
+            )
+            self._db.commit()
+
+    def _load(self, data: str) -> Job:
+        """jobsの行と、job_resultsに保存されたチェック結果からジョブを組み立てる"""
+        fields = json.loads(data)
+        if "results" in fields:
+            # チェック結果を行に含めていた以前の形式はそのまま読み込む
+            return Job.model_validate(fields)
+        results: List[Optional[dict]] = [None] * len(fields["files"])
+        rows = self._db.execute(
+            "SELECT file_index, data FROM job_results WHERE job_id = ?", (fields["job_id"],)
+        ).fetchall()
+        for index, result in rows:
+            results[index] = json.loads(result)
+        fields["results"] = results
+        return Job.model_validate(fields)
+
+
+class JobManager:
+    """上限付きのキューとワーカーでジョブを実行する"""
+
+    def __init__(self, store: JobStore, queue_size: int, concurrency: int, max_queued_bytes: int = 0):
+        """
+        Args:
+            store: ジョブの保存先
+            queue_size: 実行待ちにできるジョブの最大数
+            concurrency: 同時に実行するジョブ数
+            max_queued_bytes: 実行待ちのジョブのファイルサイズの合計の上限（0の場合は無制限）
+        """
+        self.store = store
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self.max_queued_bytes = max_queued_bytes
+        self._queue: Optional[asyncio.Queue] = None
+        self._inputs: Dict[str, List[JobInput]] = {}
+        # 実行待ちのジョブのファイルサイズの合計（実行を始めたジョブは受付制御の枠で制限する）
+        self._queued_bytes = 0
+        # 保存中でまだキューに積んでいないジョブの数（保存を待つ間に、他のリクエストに枠を使われないようにする）
+        self._reserved = 0
+        self._tasks: List[asyncio.Task] = []
+        self._processor: Optional[Callable[[StoredUpload], Awaitable[dict]]] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._queue is not None
+
+    def start(self, processor: Callable[[StoredUpload], Awaitable[dict]]) -> None:
+        """
+        ワーカーを起動する（イベントループ上で呼び出す）
+
+        Args:
+            processor: 受信済みのファイル1件をチェックし、CheckResult相当の辞書を返すコルーチン関数
+        """
+        self._processor = processor
+        self.store.open()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+        logger.info(f"ジョブワーカーを起動しました: {self.concurrency}並列, キュー上限 {self.queue_size}件")
+
+    async def stop(self) -> None:
+        """ワーカーを停止し、未実行のジョブの一時ファイルを削除する"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        for inputs in self._inputs.values():
+            self._cleanup_inputs(inputs)
+        self._inputs.clear()
+        self._queued_bytes = 0
+        self._reserved = 0
+        self.store.fail_unfinished("サーバーの停止により中断されました")
+        await run_in_threadpool(self.store.close)
+        logger.info("ジョブワーカーを停止しました")
+
+    def check_capacity(self, size: int = 0) -> None:
+        """
+        ジョブを受け付けられるか確認する（アップロードを受信する前にも呼び出し、受け付けられない場合は受信しない）
+
+        Args:
+            size: 追加するジョブのファイルサイズの合計（バイト）
+
+        Raises:
+            HTTPException: キューが起動していない、満杯、またはファイルサイズの合計が上限を超える（503）
+        """
+        if self._queue is None:
+            raise HTTPException(status_code=503, detail="ジョブキューが起動していません")
+        if self.queue_size > 0 and self._queue.qsize() + self._reserved >= self.queue_size:
+            raise self._busy_error("ジョブキューが満杯です。しばらくしてから再度お試しください")
+        # 実行待ちのジョブがないときは、上限より大きなジョブも単独で受け付ける
+        if self.max_queued_bytes and self._queued_bytes and self._queued_bytes + size > self.max_queued_bytes:
+            raise self._busy_error("実行待ちのジョブのファイルサイズが上限に達しています。しばらくしてから再度お試しください")
+
+    async def submit(self, inputs: List[JobInput]) -> Job:
+        """ジョブを作成してキューに積む（受け付けられない場合は503エラー）"""
+        size = self._size_of(inputs)
+        self.check_capacity(size)
+
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            created_at=time.time(),
+            files=[JobFile(filename=self._filename_of(item)) for item in inputs],
+            results=[None] * len(inputs)
+        )
+        # 確認から積むまでの間に保存を待つため、キューの枠とファイルサイズを先に確保する
+        self._reserved += 1
+        self._queued_bytes += size
+        try:
+            await run_in_threadpool(self.store.save, job)
+        except BaseException:
+            self._queued_bytes -= size
+            raise
+        finally:
+            self._reserved -= 1
+        self._inputs[job.job_id] = inputs
+        self._queue.put_nowait(job.job_id)
+        logger.info(f"ジョブを受け付けました: {job.job_id}, {len(inputs)}ファイル")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"ジョブの実行に失敗: {job_id}, エラー: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        inputs = self._inputs.pop(job_id, [])
+        self._queued_bytes -= self._size_of(inputs)
+        job = self.store.get(job_id)
+        try:
+            if job is None:
+                return
+            # 同期的なチェックと同じ受付制御を受ける（バックグラウンドの処理なので枠が空くまで待つ）
+            uploads = [item for item in inputs if isinstance(item, StoredUpload)]
+            ticket = await admission_controller.acquire(
+                len(uploads), sum(upload.size for upload in uploads), background=True
+            )
+            try:
+                job.status = "running"
+                job.started_at = time.time()
+                await run_in_threadpool(self.store.save, job)
+
+                # ファイルごとのチェックはワーカープールで並列実行し、完了したものから進捗に反映する
+                await asyncio.gather(*[
+                    self._run_file(job, index, item) for index, item in enumerate(inputs)
+                ])
+            finally:
+                ticket.release()
+
+            job.status = "completed"
+            job.finished_at = time.time()
+            await run_in_threadpool(self.store.save, job)
+            logger.info(f"ジョブ完了: {job_id}")
+        except Exception as e:
+            if job is not None:
+                job.status = "failed"
+                job.finished_at = time.time()
+                job.error_message = f"ジョブの実行中にエラーが発生しました: {str(e)}"
+                await run_in_threadpool(self.store.save, job)
+            raise
+        finally:
+            self._cleanup_inputs(inputs)
+
+    async def _run_file(self, job: Job, index: int, item: JobInput) -> None:
+        job.files[index].status = "processing"
+        result = item if isinstance(item, dict) else await self._processor(item)
+        job.results[index] = result
+        job.files[index].status = result["status"]
+        job.files[index].issue_count = len(result["issues"])
+        await run_in_threadpool(self.store.save_result, job, index)
+
+    async def _sweeper(self) -> None:
+        # 保持期限を過ぎた結果を定期的に削除する
+        interval = max(1, min(settings.JOB_RESULT_TTL, 60))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                purged = await run_in_threadpool(self.store.purge_expired)
+                if purged:
+                    logger.info(f"期限切れのジョブを削除しました: {purged}件")
+            except Exception as e:
+                logger.warning(f"期限切れのジョブの削除に失敗: {e}")
+
+    @staticmethod
+    def _busy_error(detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(settings.JOB_RETRY_AFTER)}
+        )
+
+    @staticmethod
+    def _size_of(inputs: List[JobInput]) -> int:
+        return sum(item.size for item in inputs if isinstance(item, StoredUpload))
+
+    @staticmethod
+    def _filename_of(item: JobInput) -> str:
+        return item["filename"] if isinstance(item, dict) else item.filename
+
+    @staticmethod
+    def _cleanup_inputs(inputs: List[JobInput]) -> None:
+        FileHandler.cleanup_temp_files([
+            item.path for item in inputs if isinstance(item, StoredUpload) and item.path
+        ])
+
+
+# シングルトンインスタンス
+job_manager = JobManager(
+    JobStore(settings.JOB_STORE_PATH),
+    settings.JOB_QUEUE_SIZE,
+    settings.JOB_CONCURRENCY,
+    settings.JOB_MAX_QUEUED_BYTES
+)
@@ -0,0 +1,375 @@
+"""
+負荷試験モジュール
+FastAPIアプリケーションを同じプロセス内でuvicornにより起動し、同時接続数を段階的に変えながら /check にアップロードを送り続けて、
+同時接続数ごとのスループット・レイテンシ・エラー率と、サーバーのメモリ使用量の推移を記録する:
+
+    python -m app.synthetic_corpus /tmp/corpus
+    python -m app.load_test /tmp/corpus --concurrency 1,4,16 --duration 30 --output load.json
+
+起動済みのサーバーに対して実行する場合は --url を指定する（メモリ使用量は --server-pid を指定した場合のみ記録する）。
+"""
+import argparse
+import json
+import logging
+import mimetypes
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from .benchmark import percentile
+
+logger = logging.getLogger(__name__)
+
+# アップロードするファイル（ファイル名, 内容, Content-Type）
+Payload = Tuple[str, bytes, str]
+
+
+class RequestMix:
+    """形式ごとの重みに従って、リクエストごとにアップロードするファイルを選ぶ"""
+
+    def __init__(self, payloads: Dict[str, List[Payload]], weights: Dict[str, float], files_per_request: int = 1):
+        self.formats = [f for f in weights if payloads.get(f)]
+        if not self.formats:
+            raise ValueError("アップロードするファイルがありません")
+        self.payloads = payloads
+        self.weights = [weights[f] for f in self.formats]
+        self.files_per_request = files_per_request
+
+    @classmethod
+    def load(cls, paths: Sequence[str], mix: Optional[str] = None, files_per_request: int = 1) -> "RequestMix":
+        """
+        ファイルを読み込んでおき、mix（例: "docx=3,pdf=1"）の重みで選ぶようにする
+
+        mixを省略した場合は、見つかった形式を同じ重みで選ぶ。
+        """
+        from .rule_profiler import iter_corpus_files
+
+        payloads: Dict[str, List[Payload]] = {}
+        for path in iter_corpus_files(paths):
+            file_format = os.path.splitext(path)[1].lower().lstrip(".")
+            with open(path, "rb") as f:
+                data = f.read()
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            payloads.setdefault(file_format, []).append((os.path.basename(path), data, content_type))
+        if mix:
+            weights = {}
+            for item in mix.split(","):
+                file_format, _, weight = item.partition("=")
+                weights[file_format.strip().lstrip(".")] = float(weight or 1)
+        else:
+            weights = {file_format: 1.0 for file_format in sorted(payloads)}
+        return cls(payloads, weights, files_per_request)
+
+    def choose(self, rng: random.Random) -> List[Payload]:
+        formats = rng.choices(self.formats, self.weights, k=self.files_per_request)
+        return [rng.choice(self.payloads[file_format]) for file_format in formats]
+
+    def describe(self) -> dict:
+        return {
+            "weights": dict(zip(self.formats, self.weights)),
+            "files": {f: len(self.payloads[f]) for f in self.formats},
+            "files_per_request": self.files_per_request,
+        }
+
+
+def _read_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        return None
+    return 0.0
+
+
+def _child_pids(pid: int) -> List[int]:
+    """子孫プロセスのPID（forkserverから起動されたワーカープロセスを含む）"""
+    children = []
+    try:
+        task_ids = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for task_id in task_ids:
+        try:
+            with open(f"/proc/{pid}/task/{task_id}/children", encoding="ascii") as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    for child in list(children):
+        children.extend(_child_pids(child))
+    return children
+
+
+def process_tree_rss(pid: int) -> Optional[Tuple[float, float]]:
+    """プロセス本体と子孫プロセスのRSSの合計（MB）。/procがない環境ではNone"""
+    server = _read_rss_mb(pid)
+    if server is None:
+        return None
+    workers = sum(_read_rss_mb(child) or 0.0 for child in _child_pids(pid))
+    return server, workers
+
+
+class MemorySampler:
+    """一定間隔でサーバーのメモリ使用量を記録するスレッド"""
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[dict] = []
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def start(self) -> "MemorySampler":
+        if process_tree_rss(self.pid) is None:
+            logger.warning("このプラットフォームではメモリ使用量を記録できません")
+        else:
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def between(self, start: float, end: float) -> List[dict]:
+        return [s for s in self.samples if start <= s["t"] <= end]
+
+    def _run(self) -> None:
+        while True:
+            usage = process_tree_rss(self.pid)
+            if usage is not None:
+                server, workers = usage
+                self.samples.append({
+                    "t": round(self.elapsed(), 2),
+                    "server_mb": round(server, 1),
+                    "workers_mb": round(workers, 1),
+                    "total_mb": round(server + workers, 1),
+                })
+            if self._stop.wait(self.interval):
+                return
+
+
+class ServerThread:
+    """FastAPIアプリケーションを別スレッドのuvicornで起動する"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port or _find_free_port(host)
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 120) -> "ServerThread":
+        import uvicorn
+        from .main import app
+
+        self._server = uvicorn.Server(uvicorn.Config(app, host=self.host, port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="uvicorn", daemon=True)
+        self._thread.start()
+        # ワーカープロセスの起動（lifespan）が終わるまで待つ
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("サーバーの起動に失敗しました")
+            time.sleep(0.05)
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join()
+
+
+def _find_free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def run_level(
+    url: str,
+    mix: RequestMix,
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0,
+    timeout: float = 120.0,
+    seed: int = 0
+) -> List[Tuple[float, float, str]]:
+    """
+    concurrency本の接続でduration秒間リクエストを送り続ける
+
+    Returns:
+        ウォームアップ後に完了したリクエストの (開始からの経過秒, レイテンシ秒, 結果) のリスト。
+        結果はHTTPステータスコード、または例外のクラス名
+    """
+    records: List[Tuple[float, float, str]] = []
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    def client(index: int) -> None:
+        rng = random.Random(f"{seed}:{concurrency}:{index}")
+        with requests.Session() as session:
+            while time.monotonic() < deadline:
+                files = [("files", payload) for payload in mix.choose(rng)]
+                sent = time.monotonic()
+                try:
+                    response = session.post(f"{url}/check", files=files, timeout=timeout)
+                    outcome = str(response.status_code)
+                except requests.RequestException as e:
+                    outcome = type(e).__name__
+                finished = time.monotonic()
+                if sent >= measure_from:
+                    with lock:
+                        records.append((finished - measure_from, finished - sent, outcome))
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def summarize_level(
+    concurrency: int,
+    records: List[Tuple[float, float, str]],
+    duration: float,
+    memory: List[dict]
+) -> dict:
+    """同時接続数1段階分の結果を集計する"""
+    outcomes: Dict[str, int] = {}
+    for _, _, outcome in records:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    ok = [latency for _, latency, outcome in records if outcome == "200"]
+    # 最後のリクエストが終わるまでを計測時間とする
+    elapsed = max([duration] + [finished for finished, _, _ in records])
+    latency = {"count": len(ok)}
+    if ok:
+        latency.update({
+            f"p{int(q * 100)}_ms": round(percentile(ok, q) * 1000, 1) for q in (0.5, 0.9, 0.95, 0.99)
+        })
+        latency["mean_ms"] = round(sum(ok) * 1000 / len(ok), 1)
+        latency["max_ms"] = round(max(ok) * 1000, 1)
+    return {
+        "concurrency": concurrency,
+        "requests": len(records),
+        "elapsed_sec": round(elapsed, 2),
+        "requests_per_sec": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "error_rate": round(1 - len(ok) / len(records), 4) if records else 0.0,
+        "outcomes": outcomes,
+        "latency": latency,
+        "peak_memory_mb": max((s["total_mb"] for s in memory), default=None),
+    }
+
+
+def print_level(level: dict) -> None:
+    latency = level["latency"]
+    percentiles = " ".join(
+        f"{name}={latency[f'{name}_ms']}" for name in ("p50", "p90", "p95", "p99") if f"{name}_ms" in latency
+    )
+    print(
+        f"concurrency={level['concurrency']:<4} requests={level['requests']:<6} "
+        f"rps={level['requests_per_sec']:<8} errors={level['error_rate']:.1%} {percentiles} "
+        f"peak_mb={level['peak_memory_mb']} outcomes={level['outcomes']}"
+    )
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="/check に負荷をかけ、同時接続数ごとのスループット・レイテンシを計測する")
+    parser.add_argument("paths", nargs="+", help="アップロードするドキュメントのファイルまたはディレクトリ")
+    parser.add_argument("--url", help="起動済みのサーバーのURL（省略時は同じプロセス内で起動する）")
+    parser.add_argument("--server-pid", type=int, help="--url のサーバーのPID（メモリ使用量の記録に使う）")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 16], help="同時接続数（カンマ区切り）")
+    parser.add_argument("--duration", type=float, default=30, help="同時接続数ごとの計測時間（秒）")
+    parser.add_argument("--warmup", type=float, default=5, help="同時接続数ごとの計測前のウォームアップ時間（秒）")
+    parser.add_argument("--mix", help="形式ごとの重み（例: docx=3,pdf=1）。省略時は同じ重み")
+    parser.add_argument("--files-per-request", type=int, default=1, help="1リクエストでアップロードするファイル数")
+    parser.add_argument("--timeout", type=float, default=120, help="リクエストのタイムアウト（秒）")
+    parser.add_argument("--stop-error-rate", type=float, default=0.5,
+                        help="エラー率がこの値を超えたら、それより大きい同時接続数を試さない")
+    parser.add_argument("--cache", action="store_true",
+                        help="結果キャッシュを有効にする（同じファイルを繰り返し送るため、既定では無効にして起動する）")
+    parser.add_argument("--memory-interval", type=float, default=1.0, help="メモリ使用量を記録する間隔（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="ファイルを選ぶ乱数のシード")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    args = parser.parse_args(argv)
+
+    if args.url is None and not args.cache:
+        # 設定はアプリケーションのモジュールを読み込んだ時点で確定するため、読み込む前に上書きする
+        os.environ["RESULT_CACHE_SIZE"] = "0"
+        os.environ["RESULT_CACHE_DIR"] = ""
+    mix = RequestMix.load(args.paths, args.mix, args.files_per_request)
+    server = None
+    url = args.url
+    server_pid = args.server_pid
+    if url is None:
+        server = ServerThread().start()
+        url = server.url
+        server_pid = os.getpid()
+    url = url.rstrip("/")
+
+    sampler = MemorySampler(server_pid, args.memory_interval).start() if server_pid else None
+    levels = []
+    try:
+        for concurrency in args.concurrency:
+            level_started = sampler.elapsed() if sampler else 0.0
+            records = run_level(url, mix, concurrency, args.duration, args.warmup, args.timeout, args.seed)
+            memory = sampler.between(level_started, sampler.elapsed()) if sampler else []
+            level = summarize_level(concurrency, records, args.duration, memory)
+            levels.append(level)
+            print_level(level)
+            if level["error_rate"] > args.stop_error_rate:
+                print(f"エラー率が {args.stop_error_rate:.0%} を超えたため、計測を終了します")
+                break
+    finally:
+        if sampler:
+            sampler.stop()
+        if server:
+            server.stop()
+
+    if args.output:
+        result = {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "url": url,
+            "in_process": server is not None,
+            "result_cache": args.cache or server is None,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": mix.describe(),
+            "levels": levels,
+            "memory": sampler.samples if sampler else [],
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,54 @@
+import asyncio
+import json
 import os
 import tempfile
+import time
 import traceback
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from pathlib import Path
+import anyio
 from fastapi import FastAPI, UploadFile, File, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 # import textract
 
-from .proofreading_rules import ProofreadingRules
-from .text_extractor import TextExtractor
-from .utils import FileHandler, format_file_size, logger
+from .admission import AdmissionTicket, admission_controller
+from .executor import check_executor
+from .format_backends import format_backends
+from .issues import IssueTable
+from .jobs import job_manager
+from . import metrics
+from .pipeline import run_check_pipeline
+from .rules_registry import RulesValidationError, get_proofreading_rules, get_rules_registry
+from .server import notify_rules_updated
+from .result_cache import result_cache
+from .rule_profiler import rule_profiler
+from .text_extractor import TextExtractor, extractor_registry
+from .utils import FileHandler, StoredUpload, format_file_size, logger
 from .config import settings
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動時にワーカープロセスとジョブワーカー、rules.jsonの監視を立ち上げ、終了時に停止する"""
+    await run_in_threadpool(check_executor.start)
+    job_manager.start(check_stored_upload_as_dict)
+    get_rules_registry().start_watching(settings.RULES_WATCH_INTERVAL)
+    yield
+    await run_in_threadpool(get_rules_registry().stop_watching)
+    await job_manager.stop()
+    await run_in_threadpool(check_executor.shutdown)
+
+
 app = FastAPI(
     title=settings.API_TITLE,
     description=settings.API_DESCRIPTION,
-    version=settings.API_VERSION
+    version=settings.API_VERSION,
+    lifespan=lifespan
 )
 
 # CORSの設定
@@ -40,6 +70,12 @@ class CheckResult(BaseModel):
     word_count: int
     issues: List[dict]
     error_message: str = None
+    # 検出された問題の件数（issue_format=grouped の場合もすべての問題を数える）
+    issue_count: int = 0
+    # ルールごとに集約した問題（issue_format=grouped の場合のみ設定する）
+    issue_groups: Optional[List[dict]] = None
+    # 処理段階・ルールごとの所要時間（秒）。DEBUGが有効な場合のみ設定する
+    timings: Optional[dict] = None
 
 
 class CheckResponse(BaseModel):
@@ -48,6 +84,56 @@ class CheckResponse(BaseModel):
     results: List[CheckResult]
 
 
+# 問題の出力形式（list: 1件ずつ / grouped: ルールごとに件数と例を集約）
+ISSUE_FORMATS = ("list", "grouped")
+
+
+def validate_issue_format(issue_format: str, max_examples: Optional[int]) -> int:
+    """問題の出力形式を検証し、集約時にルールごとに返す例の件数を返す"""
+    if issue_format not in ISSUE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"サポートされていない問題の出力形式です: {issue_format}"
+        )
+    if max_examples is None:
+        return settings.ISSUE_GROUP_MAX_EXAMPLES
+    if max_examples < 0:
+        raise HTTPException(status_code=400, detail="max_examples には0以上の値を指定してください")
+    return max_examples
+
+
+def build_json_response(response: CheckResponse) -> Response:
+    """
+    チェック結果をJSONレスポンスにする
+
+    問題の多い文書でも問題1件ごとの検証をやり直さないよう、response_modelを通さずにシリアライズする。
+    """
+    return Response(content=response.model_dump_json(), media_type="application/json")
+
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """APIリクエストの処理時間をメトリクスに記録する"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    # パスパラメータごとに系列が増えないよう、ルートのパス定義で集計する
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        endpoint=route.path if route is not None else "unmatched",
+        status=str(response.status_code)
+    )
+    return response
+
+
+# ストリーミング形式ごとのContent-Type
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
 @app.get("/")
 async def root():
     """ヘルスチェック用エンドポイント"""
@@ -66,10 +152,32 @@ async def health_check():
         "version": settings.API_VERSION,
         "supported_extensions": settings.SUPPORTED_EXTENSIONS,
         "max_file_size": format_file_size(settings.MAX_FILE_SIZE),
-        "max_files_count": settings.MAX_FILES_COUNT
+        "max_files_count": settings.MAX_FILES_COUNT,
+        "worker_processes": check_executor.max_workers if check_executor.is_running else 0,
+        "format_worker_pools": check_executor.format_workers if check_executor.is_running else {},
+        # プールごとの実行中・待機中の処理数と、形式ごとの処理時間の見積もり
+        "worker_pools": check_executor.stats(),
+        "extractors": extractor_registry.stats(),
+        # 抽出ライブラリの読み込み状況（このプロセスと、ワーカープロセスから報告された読み込み時間）
+        "format_backends": format_backends.stats(),
+        "result_cache": result_cache.stats(),
+        "admission": admission_controller.stats(),
+        "rules_version": get_proofreading_rules().version,
+        # 応答したプロセス（サーバーモードでどのワーカーが応答したかの確認用）
+        "pid": os.getpid()
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """処理時間・処理件数などのメトリクスをPrometheusのテキスト形式で出力"""
+    admission_stats = admission_controller.stats()
+    metrics.ADMISSION_ACTIVE.set(admission_stats["active_files"], resource="files")
+    metrics.ADMISSION_ACTIVE.set(admission_stats["active_bytes"], resource="bytes")
+    metrics.ADMISSION_WAITING.set(admission_stats["waiting"])
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/config")
 async def get_config():
     """設定情報を取得"""
@@ -82,10 +190,17 @@ async def get_config():
 
 
 @app.post("/check", response_model=CheckResponse)
-async def check_documents(files: List[UploadFile] = File(...)):
+async def check_documents(
+    files: List[UploadFile] = File(...),
+    issue_format: str = "list",
+    max_examples: Optional[int] = None
+):
     """
     ドキュメントをアップロードして校正チェックを実行する
+
+    issue_format が "grouped" の場合は、問題をルールごとに集約し、件数と最大 max_examples 件の例を返す。
     """
+    max_examples = validate_issue_format(issue_format, max_examples)
     logger.info(f"チェック開始: {len(files)}ファイル")
     
     # ファイルのバリデーション
@@ -95,102 +210,428 @@ async def check_documents(files: List[UploadFile] = File(...)):
         logger.error(f"ファイルバリデーションエラー: {e.detail}")
         raise e
     
-    results = []
+    # 同時に処理する量が上限に達している場合は、枠が空くまで待つ（待ちきれない場合は429/503）
+    ticket = await admission_controller.acquire(len(files), get_upload_size(files))
     temp_files = []
     
     try:
-        for file in files:
-            temp_file = None
-            try:
-                logger.info(f"ファイル処理開始: {file.filename}")
-                
-                # 一時ファイルに保存
-                temp_file = FileHandler.save_temp_file(file)
-                temp_files.append(temp_file)
-                
-                # テキスト抽出
-                extracted_text = TextExtractor.extract_text(temp_file)
-                cleaned_text = TextExtractor.clean_extracted_text(extracted_text)
-                text_stats = TextExtractor.get_text_stats(cleaned_text)
-                
-                # 校正チェック実行
-                issues = perform_proofreading_check(cleaned_text)
-                
-                logger.info(f"ファイル処理完了: {file.filename}, 問題数: {len(issues)}")
-                
-                results.append(CheckResult(
-                    filename=file.filename,
-                    status="success",
-                    text_length=len(cleaned_text),
-                    character_count=text_stats['character_count'],
-                    line_count=text_stats['line_count'],
-                    word_count=text_stats['word_count'],
-                    issues=issues
-                ))
-                
-            except Exception as e:
-                logger.error(f"ファイル処理エラー: {file.filename}, エラー: {e}")
-                results.append(CheckResult(
-                    filename=file.filename,
-                    status="error",
-                    text_length=0,
-                    character_count=0,
-                    line_count=0,
-                    word_count=0,
-                    issues=[],
-                    error_message=f"処理中にエラーが発生しました: {str(e)}"
-                ))
+        # 各ファイルのテキスト抽出と校正チェックはワーカープロセスで並列実行
+        # （見積もりの短いファイルから投入し、結果はアップロード順に並べる）
+        batch_started = time.monotonic()
+        order = order_by_estimated_cost(files)
+        checked = await asyncio.gather(*[
+            check_uploaded_file(files[i], temp_files, issue_format, max_examples, batch_started) for i in order
+        ])
+        results = [None] * len(files)
+        for i, result in zip(order, checked):
+            results[i] = result
     
     finally:
         # 一時ファイルのクリーンアップ
         FileHandler.cleanup_temp_files(temp_files)
+        ticket.release()
     
     successful_files = len([r for r in results if r.status == "success"])
     logger.info(f"チェック完了: {successful_files}/{len(files)}ファイル成功")
     
-    return CheckResponse(
+    return build_json_response(CheckResponse.model_construct(
         total_files=len(files),
         processed_files=successful_files,
         results=results
+    ))
+
+
+@app.post("/check/stream")
+async def check_documents_stream(
+    files: List[UploadFile] = File(...),
+    format: str = "ndjson",
+    issue_format: str = "list",
+    max_examples: Optional[int] = None
+):
+    """
+    ドキュメントをアップロードして校正チェックを実行し、結果をファイルごとに逐次返す
+
+    完了した順に {"type": "result", "index": アップロード順の番号, "result": CheckResult} を出力し、
+    最後に {"type": "summary", "total_files": ..., "processed_files": ...} を出力する。
+    format が "ndjson" の場合は1行1レコード、"sse" の場合はServer-Sent Eventsとして送信する。
+    issue_format・max_examples は POST /check と同じ。
+    """
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"サポートされていないストリーミング形式です: {format}"
+        )
+    max_examples = validate_issue_format(issue_format, max_examples)
+    
+    logger.info(f"チェック開始（ストリーミング）: {len(files)}ファイル")
+    
+    # ファイルのバリデーション
+    try:
+        FileHandler.validate_files(files)
+    except HTTPException as e:
+        logger.error(f"ファイルバリデーションエラー: {e.detail}")
+        raise e
+    
+    # 429/503をステータスコードで返せるよう、レスポンスを開始する前に枠を確保する
+    ticket = await admission_controller.acquire(len(files), get_upload_size(files))
+    
+    return StreamingResponse(
+        stream_check_results(files, format, ticket, issue_format, max_examples),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # 出力を始める前にクライアントが切断した場合も枠を返却する
+        background=BackgroundTask(ticket.release)
+    )
+
+
+def get_upload_size(files: List[UploadFile]) -> int:
+    """アップロードファイルの合計サイズ（バイト）"""
+    return sum(file.size or 0 for file in files)
+
+
+def order_by_estimated_cost(files: List[UploadFile]) -> List[int]:
+    """処理時間の見積もりが短い順に並べたファイルの番号（見積もりが同じ場合はアップロード順）"""
+    return sorted(
+        range(len(files)),
+        key=lambda i: extractor_registry.estimate_seconds(Path(files[i].filename).suffix, files[i].size or 0)
     )
 
+
+async def stream_check_results(
+    files: List[UploadFile],
+    format: str,
+    ticket: AdmissionTicket,
+    issue_format: str = "list",
+    max_examples: int = 0
+):
+    """ファイルごとのチェック結果を完了順にエンコードして出力する"""
+    temp_files = []
+    
+    async def check_indexed(index: int, file: UploadFile):
+        return index, await check_uploaded_file(file, temp_files, issue_format, max_examples, batch_started)
+    
+    # 見積もりの短いファイルから投入し、短いものから結果を返せるようにする
+    batch_started = time.monotonic()
+    tasks = [asyncio.ensure_future(check_indexed(i, files[i])) for i in order_by_estimated_cost(files)]
+    successful_files = 0
+    
+    try:
+        for future in asyncio.as_completed(tasks):
+            index, result = await future
+            if result.status == "success":
+                successful_files += 1
+            yield encode_stream_record("result", {
+                "type": "result",
+                "index": index,
+                "result": result.model_dump()
+            }, format)
+        
+        logger.info(f"チェック完了（ストリーミング）: {successful_files}/{len(files)}ファイル成功")
+        yield encode_stream_record("summary", {
+            "type": "summary",
+            "total_files": len(files),
+            "processed_files": successful_files
+        }, format)
+    
+    finally:
+        # クライアント切断時などに未完了のチェックを中止し、一時ファイルを削除
+        for task in tasks:
+            task.cancel()
+        # スレッドプールで受信中のファイルは中止できず、この後に一時ファイルが作られるため、終わるのを待ってから削除する。
+        # 切断時はこのジェネレーター自体が中止されているため、待つ間は中止を遮断する
+        with anyio.CancelScope(shield=True):
+            await asyncio.gather(*tasks, return_exceptions=True)
+        FileHandler.cleanup_temp_files(temp_files)
+        ticket.release()
+
+
+def encode_stream_record(event: str, record: dict, format: str) -> str:
+    """ストリーミング出力用にレコードをエンコードする"""
+    data = json.dumps(record, ensure_ascii=False)
+    if format == "sse":
+        return f"event: {event}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+async def check_uploaded_file(
+    file: UploadFile,
+    temp_files: List[str],
+    issue_format: str = "list",
+    max_examples: int = 0,
+    batch_started: Optional[float] = None
+) -> CheckResult:
+    """
+    アップロードファイル1件を受信し、ワーカープールで校正チェックを実行する
+
+    Args:
+        file: アップロードファイル
+        temp_files: 作成した一時ファイルの追加先（呼び出し側でクリーンアップする）
+        issue_format: 問題の出力形式（"list" / "grouped"）
+        max_examples: issue_format が "grouped" の場合に、ルールごとに返す例の件数
+        batch_started: リクエストの受付時刻（check_stored_upload を参照）
+    """
+    try:
+        logger.info(f"ファイル処理開始: {file.filename}")
+        
+        # 受信（小さなファイルはメモリ上、大きなファイルは一時ファイル。ブロッキングI/Oのためスレッドプールで実行）
+        started = time.perf_counter()
+        # 一時ファイルは作成した時点でtemp_filesに追加される
+        store = asyncio.ensure_future(run_in_threadpool(FileHandler.store_upload, file, None, temp_files))
+        try:
+            upload = await asyncio.shield(store)
+        except asyncio.CancelledError:
+            # スレッドプールでの受信は中止できないため、一時ファイルの作成が終わるまで待ってから中止する
+            await asyncio.gather(store, return_exceptions=True)
+            raise
+    except Exception as e:
+        metrics.record_file_result(Path(file.filename).suffix, "error", file.size or 0, 0)
+        return build_error_result(file.filename, e)
+    
+    return await check_stored_upload(
+        upload, {"store": time.perf_counter() - started}, issue_format, max_examples, batch_started
+    )
+
+
+async def check_stored_upload(
+    upload: StoredUpload,
+    timings: Optional[dict] = None,
+    issue_format: str = "list",
+    max_examples: int = 0,
+    batch_started: Optional[float] = None
+) -> CheckResult:
+    """
+    受信済みのファイル1件について、ワーカープールで校正チェックを実行する
+
+    Args:
+        upload: 受信済みのファイル
+        timings: それまでの処理段階の所要時間（秒）。この関数で計測した分を追加してメトリクスに記録する
+        issue_format: 問題の出力形式（"list" / "grouped"）
+        max_examples: issue_format が "grouped" の場合に、ルールごとに返す例の件数
+        batch_started: リクエストの受付時刻（省略時は現在時刻）。ワーカーが空いていない場合は
+                       受付の早いリクエストから、同じリクエストの中では処理時間の見積もりが短いファイルから投入する
+    """
+    filename = upload.filename
+    file_extension = Path(filename).suffix
+    timings = dict(timings or {})
+    try:
+        # 同じ内容・同じルールセットのチェック結果があれば再利用する
+        started = time.perf_counter()
+        fingerprint = get_proofreading_rules().fingerprint
+        disabled_rules = rule_profiler.disabled_rules(fingerprint)
+        cache_key = result_cache.make_key(
+            upload.content_hash, file_extension, rule_profiler.effective_fingerprint(fingerprint)
+        )
+        data = await run_in_threadpool(result_cache.get, cache_key)
+        timings["cache_lookup"] = time.perf_counter() - started
+        metrics.CACHE_LOOKUPS.inc(result="miss" if data is None else "hit")
+        if data is None:
+            # テキスト抽出・校正チェック実行
+            started = time.perf_counter()
+            estimated = extractor_registry.estimate_seconds(file_extension, upload.size)
+            data = await check_executor.run(
+                run_check_pipeline, upload.source, filename, disabled_rules,
+                file_format=file_extension.lower().lstrip("."),
+                priority=(batch_started if batch_started is not None else time.monotonic(), estimated)
+            )
+            format_backends.record_worker_imports(data.pop('backend_imports'))
+            # ワーカー側で計測した時間を除いた分を、プールの待ち時間・プロセス間の受け渡し時間とする
+            worker_timings = data.pop('timings')
+            worker_elapsed = sum(v for k, v in worker_timings.items() if k != 'rules')
+            # 抽出ライブラリの読み込みは初回だけのため、見積もりの補正には含めない
+            extractor_registry.observe(file_extension, upload.size, worker_elapsed - worker_timings.get('import', 0.0))
+            timings.update(worker_timings)
+            timings["worker_wait"] = max(0.0, time.perf_counter() - started - worker_elapsed)
+            table = IssueTable.from_dict(data['issues'])
+            # ルールごとの累積統計に加え、時間予算を超えたルールを検出する
+            rule_profiler.record(fingerprint, worker_timings['rules'], table.count_by_rule())
+            await run_in_threadpool(result_cache.put, cache_key, data)
+        else:
+            logger.info(f"キャッシュ済みの結果を使用: {filename}")
+            table = IssueTable.from_dict(data['issues'])
+        
+        logger.info(f"ファイル処理完了: {filename}, 問題数: {len(table)}")
+        metrics.record_file_result(file_extension, "success", upload.size, len(table), timings)
+        
+        # 問題は表から組み立てた値をそのまま使い、1件ごとの検証を省く
+        return CheckResult.model_construct(
+            filename=filename,
+            status="success",
+            text_length=data['text_length'],
+            character_count=data['character_count'],
+            line_count=data['line_count'],
+            word_count=data['word_count'],
+            issues=table.to_dicts() if issue_format == "list" else [],
+            error_message=None,
+            issue_count=len(table),
+            issue_groups=table.group(max_examples) if issue_format == "grouped" else None,
+            timings=timings if settings.DEBUG else None
+        )
+        
+    except Exception as e:
+        metrics.record_file_result(file_extension, "error", upload.size, 0, timings)
+        return build_error_result(filename, e)
+
+
+async def check_stored_upload_as_dict(upload: StoredUpload) -> dict:
+    """
+    ジョブワーカー用に、チェック結果を辞書で返す（CheckResultに戻せるよう未設定の項目は含めない）
+
+    問題は一覧形式で保持し、集約は結果の取得時に行う。
+    """
+    return (await check_stored_upload(upload)).model_dump(exclude_none=True)
+
+
+def build_error_result(filename: str, error: Exception) -> CheckResult:
+    """処理に失敗したファイルのチェック結果を作成する"""
+    logger.error(f"ファイル処理エラー: {filename}, エラー: {error}")
+    return CheckResult(
+        filename=filename,
+        status="error",
+        text_length=0,
+        character_count=0,
+        line_count=0,
+        word_count=0,
+        issues=[],
+        error_message=f"処理中にエラーが発生しました: {str(error)}"
+    )
+
+
+@app.post("/jobs", status_code=202)
+async def submit_check_job(files: List[UploadFile] = File(...)):
+    """
+    ドキュメントをアップロードしてチェックジョブを登録し、ジョブIDをすぐに返す
+
+    進捗は GET /jobs/{job_id}、結果は GET /jobs/{job_id}/result で取得する。
+    """
+    logger.info(f"ジョブ登録: {len(files)}ファイル")
+    
+    # ファイルのバリデーション
+    try:
+        FileHandler.validate_files(files)
+    except HTTPException as e:
+        logger.error(f"ファイルバリデーションエラー: {e.detail}")
+        raise e
+    
+    # キューに空きがない場合は、アップロードを受信せずに断る
+    job_manager.check_capacity()
+    
+    # アップロードの内容はリクエスト終了後に読めなくなるため、ここで受信しておく。
+    # 実行待ちの間メモリを使い続けないよう、サイズにかかわらず一時ファイルに保存する
+    inputs = []
+    temp_files: List[str] = []
+    try:
+        for file in files:
+            try:
+                inputs.append(await run_in_threadpool(FileHandler.store_upload, file, -1, temp_files))
+            except Exception as e:
+                inputs.append(build_error_result(file.filename, e).model_dump())
+        job = await job_manager.submit(inputs)
+    except BaseException:
+        FileHandler.cleanup_temp_files(temp_files)
+        raise
+    
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "total_files": len(job.files),
+        "status_url": f"/jobs/{job.job_id}",
+        "result_url": f"/jobs/{job.job_id}/result"
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_check_job(job_id: str):
+    """ジョブの状態とファイルごとの進捗を取得する"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブが見つかりません: {job_id}")
+    return job.summary()
+
+
+@app.get("/jobs/{job_id}/result", response_model=CheckResponse)
+async def get_check_job_result(job_id: str, issue_format: str = "list", max_examples: Optional[int] = None):
+    """完了したジョブのチェック結果を取得する（issue_format・max_examples は POST /check と同じ）"""
+    max_examples = validate_issue_format(issue_format, max_examples)
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブが見つかりません: {job_id}")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error_message)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"ジョブはまだ完了していません: {job.status}")
+    
+    results = [CheckResult.model_construct(**result) for result in job.results]
+    if issue_format == "grouped":
+        for result in results:
+            table = IssueTable.from_dicts(result.issues)
+            result.issue_count = len(table)
+            result.issue_groups = table.group(max_examples)
+            result.issues = []
+    return build_json_response(CheckResponse.model_construct(
+        total_files=len(results),
+        processed_files=len([r for r in results if r.status == "success"]),
+        results=results
+    ))
+
+
 # 校正ルール取得API
 @app.get("/rules")
 async def get_rules():
-    rules_path = os.path.join(os.path.dirname(__file__), "rules.json")
+    rules_path = get_rules_registry().rules_path
     try:
         with open(rules_path, encoding="utf-8") as f:
             rules = f.read()
-        return JSONResponse(content=rules, media_type="application/json")
+        return JSONResponse(
+            content=rules,
+            media_type="application/json",
+            headers={"X-Rules-Version": get_proofreading_rules().version}
+        )
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+# 校正ルールのプロファイル取得API
+@app.get("/rules/profile")
+async def get_rules_profile(limit: int = 0):
+    """ルールごとの累積所要時間・検出件数を、コストの高い順に返す"""
+    fingerprint = get_proofreading_rules().fingerprint
+    return {
+        "budget_ms": rule_profiler.budget_ms,
+        "action": rule_profiler.action,
+        "rules_version": get_proofreading_rules().version,
+        "disabled_rules": sorted(rule_profiler.disabled_rules(fingerprint)),
+        "rules": rule_profiler.report(limit or None)
+    }
+
 # 校正ルール更新API
 @app.post("/rules")
 async def update_rules(request: Request):
-    rules_path = os.path.join(os.path.dirname(__file__), "rules.json")
     try:
         rules_json = await request.json()
         # バリデーション: 配列であること
         if not isinstance(rules_json, list):
             return JSONResponse(content={"error": "ルールは配列形式で送信してください"}, status_code=400)
-        # 書き込み
-        with open(rules_path, "w", encoding="utf-8") as f:
-            import json
-            json.dump(rules_json, f, ensure_ascii=False, indent=2)
-        # ルールを即時反映（ProofreadingRulesインスタンスを再生成）
-        ProofreadingRules().load_external_rules()
-        return {"message": "ルールを更新しました"}
+        # ルールセット全体を検証・コンパイルしてから、rules.jsonを原子的に書き換えて即時反映する
+        rules = await run_in_threadpool(get_rules_registry().update, rules_json)
+        # 新しいルールセットで計測し直す（時間予算の超過による無効化も解除する）
+        rule_profiler.reset()
+        # サーバーモードでは、他のワーカーにも読み込み直させる
+        notify_rules_updated()
+        return {"message": "ルールを更新しました", "version": rules.version}
+    except RulesValidationError as e:
+        # 正規表現のコンパイルエラーや、破滅的なバックトラッキングを起こしうる構造
+        return JSONResponse(
+            content={"error": str(e), "details": e.errors},
+            status_code=400
+        )
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 def perform_proofreading_check(text: str) -> List[dict]:
     """
     校正チェックを実行する
-    ProofreadingRulesクラスを使用して包括的なチェックを行う
+    共有のコンパイル済みProofreadingRulesを使用して包括的なチェックを行う
     """
-    proofreading_rules = ProofreadingRules()
-    return proofreading_rules.check_all_rules(text)
+    return [issue.to_dict() for issue in get_proofreading_rules().check_all_rules(text)]
 
 
 def is_supported_file(filename: str) -> bool:
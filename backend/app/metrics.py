@@ -0,0 +1,235 @@
+"""
+メトリクスモジュール
+処理段階ごとの所要時間やファイル数などを集計し、Prometheusのテキスト形式で出力する
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 所要時間のヒストグラムの既定のバケット（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """ラベル付きメトリクスの基底クラス"""
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """単調増加するカウンター"""
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Metric):
+    """現在値を表すゲージ"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(Metric):
+    """値の分布を累積バケットで集計するヒストグラム"""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # ラベルごとに [各バケットの件数..., 合計値]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-1] += value
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        lines = []
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録先"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheusのテキスト形式で出力"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "proofing_request_duration_seconds", "APIリクエストの処理時間", ("method", "endpoint", "status")
+)
+FILES_TOTAL = registry.counter(
+    "proofing_files_total", "チェックしたファイル数", ("format", "status")
+)
+BYTES_TOTAL = registry.counter(
+    "proofing_bytes_total", "チェックしたファイルの合計サイズ（バイト）", ("format",)
+)
+ISSUES_TOTAL = registry.counter(
+    "proofing_issues_total", "検出した問題の件数", ("format",)
+)
+STAGE_SECONDS = registry.histogram(
+    "proofing_stage_duration_seconds", "処理段階ごとの所要時間", ("stage", "format")
+)
+RULE_SECONDS = registry.histogram(
+    "proofing_rule_duration_seconds", "校正ルールごとの文書1件あたりの所要時間", ("rule",)
+)
+CACHE_LOOKUPS = registry.counter(
+    "proofing_result_cache_lookups_total", "チェック結果キャッシュの参照件数（hit / miss）", ("result",)
+)
+ADMISSION_ACTIVE = registry.gauge(
+    "proofing_admission_active", "受付制御で処理中のファイル数・合計サイズ", ("resource",)
+)
+ADMISSION_WAITING = registry.gauge(
+    "proofing_admission_waiting", "受付制御で処理待ちのリクエスト数"
+)
+
+
+def record_file_result(
+    file_extension: str,
+    status: str,
+    size: int,
+    issue_count: int,
+    timings: Optional[Dict] = None
+) -> None:
+    """
+    ファイル1件の処理結果をメトリクスに記録する
+
+    Args:
+        file_extension: ファイルの拡張子
+        status: 処理結果（success / error）
+        size: ファイルサイズ（バイト）
+        issue_count: 検出した問題の件数
+        timings: 処理段階ごとの所要時間（秒）。"rules" にはルールごとの所要時間の辞書を含む
+    """
+    file_format = file_extension.lower().lstrip(".") or "unknown"
+    FILES_TOTAL.inc(format=file_format, status=status)
+    BYTES_TOTAL.inc(size, format=file_format)
+    ISSUES_TOTAL.inc(issue_count, format=file_format)
+    for stage, elapsed in (timings or {}).items():
+        if stage == "rules":
+            for rule, rule_elapsed in elapsed.items():
+                RULE_SECONDS.observe(rule_elapsed, rule=rule)
+        else:
+            STAGE_SECONDS.observe(elapsed, stage=stage, format=file_format)
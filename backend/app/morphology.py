@@ -0,0 +1,100 @@
+"""
+形態素解析モジュール
+日本語の形態素解析器（Janome）で行を単語に分割する。Janomeはオプションの依存関係で、
+インストールされていない場合や無効にした場合は利用できない（校正ルールは正規表現による簡易判定を使う）
+"""
+import importlib.util
+import logging
+import threading
+from importlib import metadata
+from typing import List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# 辞書の読み込みには時間がかかるため、プロセスごとに1回だけ行う
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_load_failed = False
+
+
+class Token:
+    """形態素1件"""
+    __slots__ = ("surface", "pos", "pos_detail", "base_form", "start")
+
+    def __init__(self, surface: str, pos: str, pos_detail: str, base_form: str, start: int):
+        self.surface = surface
+        self.pos = pos  # 品詞（例: 助詞）
+        self.pos_detail = pos_detail  # 品詞細分類1（例: 格助詞）
+        self.base_form = base_form
+        self.start = start  # 行内の文字オフセット
+
+    def __repr__(self) -> str:
+        return f"Token({self.surface!r}, {self.pos}/{self.pos_detail}, start={self.start})"
+
+
+def backend_version() -> Optional[str]:
+    """
+    使用する形態素解析器の名前とバージョン（利用できない場合はNone）
+
+    解析器の有無やバージョンでチェック結果が変わるため、ルールセットの指紋に含める。
+    辞書は読み込まない。
+    """
+    if settings.MORPHOLOGY_TOKENIZER != "janome" or _load_failed:
+        return None
+    if importlib.util.find_spec("janome") is None:
+        return None
+    try:
+        return f"janome-{metadata.version('janome')}"
+    except metadata.PackageNotFoundError:
+        return "janome"
+
+
+def is_available() -> bool:
+    return backend_version() is not None
+
+
+def get_tokenizer():
+    """プロセスで共有する形態素解析器（初回の呼び出し時に辞書を読み込む、利用できない場合はNone）"""
+    global _tokenizer, _load_failed
+    if _tokenizer is not None or not is_available():
+        return _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None and not _load_failed:
+            try:
+                from janome.tokenizer import Tokenizer
+                _tokenizer = Tokenizer()
+                logger.info("形態素解析器（Janome）の辞書を読み込みました")
+            except Exception as e:
+                _load_failed = True
+                logger.error(f"形態素解析器の読み込みに失敗したため、簡易判定を使います: {e}")
+    return _tokenizer
+
+
+def tokenize(line: str) -> List[Token]:
+    """
+    1行分のテキストを形態素に分割する
+
+    長い文書でも解析時のメモリ使用量が増えないよう、呼び出し側で行ごとに分割して渡す。
+    """
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return []
+    tokens = []
+    pos = 0
+    for token in tokenizer.tokenize(line):
+        surface = token.surface
+        start = line.find(surface, pos)
+        if start == -1:
+            start = pos
+        pos = start + len(surface)
+        features = token.part_of_speech.split(",")
+        tokens.append(Token(
+            surface,
+            features[0],
+            features[1] if len(features) > 1 else "*",
+            token.base_form,
+            start
+        ))
+    return tokens
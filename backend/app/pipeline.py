@@ -0,0 +1,90 @@
+"""
+チェック処理パイプラインモジュール
+テキスト抽出から校正チェックまでをワーカープロセス上で実行する
+"""
+import os
+import time
+from typing import Collection, Optional, Union
+
+from . import morphology
+from .format_backends import format_backends
+from .issues import IssueTable
+from .rules_registry import get_proofreading_rules
+from .text_extractor import TextExtractor
+
+
+def run_check_pipeline(
+    source: Union[str, bytes],
+    filename: Optional[str] = None,
+    disabled_rules: Collection[str] = ()
+) -> dict:
+    """
+    ファイル1件のテキスト抽出・クリーンアップ・統計取得・校正チェックを実行する
+
+    プロセスプールから呼び出されるため、引数と戻り値はpickle可能な値に限る。
+
+    Args:
+        source: チェック対象のファイルパス、またはファイル内容
+        filename: 形式判定に使うファイル名（sourceがパスの場合は省略可）
+        disabled_rules: 適用しないルールのID（時間予算の超過により無効化されたルールなど）
+
+    Returns:
+        テキスト長・統計情報・検出された問題の表（IssueTable.to_dict()）と、処理段階ごとの所要時間（timings）、
+        この呼び出しで読み込んだ抽出ライブラリと読み込み時間（backend_imports）を含む辞書
+    """
+    timings = {}
+    started = time.perf_counter()
+    if isinstance(source, str):
+        # ディスク上のファイルは読み込み用にコピーせず、メモリマップして抽出する
+        with TextExtractor.map_file(source) as buffer:
+            extracted_text = TextExtractor.extract_text(buffer, filename or source)
+    else:
+        extracted_text = TextExtractor.extract_text(source, filename)
+    started = _lap(timings, 'extract', started)
+    cleaned_text = TextExtractor.clean_extracted_text(extracted_text)
+    started = _lap(timings, 'clean', started)
+    text_stats = TextExtractor.get_text_stats(cleaned_text)
+    started = _lap(timings, 'stats', started)
+    rule_timings = {}
+    issues = get_proofreading_rules().check_all_rules(
+        cleaned_text, timings=rule_timings, disabled_rules=disabled_rules
+    )
+    _lap(timings, 'check', started)
+    timings['rules'] = rule_timings
+    # 抽出ライブラリをこの呼び出しで読み込んだ場合は、その時間を抽出の時間と分けて記録する
+    backend_imports = format_backends.take_pending_imports()
+    if backend_imports:
+        timings['import'] = sum(backend_imports.values())
+        timings['extract'] = max(0.0, timings['extract'] - timings['import'])
+    return {
+        'text_length': len(cleaned_text),
+        'character_count': text_stats['character_count'],
+        'line_count': text_stats['line_count'],
+        'word_count': text_stats['word_count'],
+        # プロセス間の受け渡しと結果キャッシュの容量を抑えるため、ルール・メッセージの文字列を重複させない
+        'issues': IssueTable.from_issues(issues).to_dict(),
+        'timings': timings,
+        'backend_imports': backend_imports,
+    }
+
+
+def _lap(timings: dict, stage: str, started: float) -> float:
+    """前回の計測時点からの経過時間を記録し、現在時刻を返す"""
+    now = time.perf_counter()
+    timings[stage] = now - started
+    return now
+
+
+def warm_up_worker(formats: Collection[str] = ()) -> tuple:
+    """
+    ワーカープロセスでルールセットの構築と形態素解析器の辞書・抽出ライブラリの読み込みを済ませておく（起動時のウォームアップ用）
+
+    Args:
+        formats: 抽出ライブラリを読み込んでおく形式
+
+    Returns:
+        ワーカーのPIDと、新たに読み込んだ抽出ライブラリの読み込み時間
+    """
+    if get_proofreading_rules().morphology_backend:
+        morphology.get_tokenizer()
+    return os.getpid(), format_backends.preload(formats)
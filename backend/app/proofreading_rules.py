@@ -2,23 +2,338 @@
 校正ルールモジュール
 textlintの代替として、日本語文書の校正チェックを行う
 """
+import hashlib
+import logging
 import re
-from typing import List, Dict
+import time
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Collection, List, Dict, Optional, Tuple
 
 
 import json
 import os
 
+from . import morphology
+from .aho_corasick import AhoCorasickMatcher
+from .config import settings
+from .issues import Issue, RuleInfo
+from .morphology import Token
+from .regex_safety import EXTERNAL_RULE_FLAGS, RegexTimeout, RegexWatchdog, analyze_pattern
+
+logger = logging.getLogger(__name__)
+
+
+# チェック処理の実装を変更した場合は更新する（結果キャッシュの無効化に使用）
+ENGINE_VERSION = "3"
+
+# 辞書系ルールの語句を検出する前処理の計測名（ルールではないため無効化できない）
+LITERAL_TERMS_STAGE = "literal-terms"
+# 形態素解析の前処理の計測名（助詞・連続語句のルールで共有する）
+MORPHOLOGY_STAGE = "morphology"
+# 文の区切りを求める前処理の計測名
+SENTENCES_STAGE = "sentences"
+# ルールではない前処理の計測名
+PREPROCESSING_STAGES = frozenset({LITERAL_TERMS_STAGE, MORPHOLOGY_STAGE, SENTENCES_STAGE})
+
+# 繰り返し使う正規表現はモジュール読み込み時に一度だけコンパイルする
+# 文書全体に適用しても行をまたいでマッチしないよう、文字クラスから改行を除いている
+# 2文字以上の語句のうち、同じ行で直後の語句が同一のもの（先読みで連続を重ねて検出する）
+SUCCESSIVE_WORD_PATTERN = re.compile(
+    r'(?<![ぁ-んァ-ヶ一-龯])([ぁ-んァ-ヶ一-龯]{2,})(?![ぁ-んァ-ヶ一-龯])'
+    r'(?=[^ぁ-んァ-ヶ一-龯\n]+\1(?![ぁ-んァ-ヶ一-龯]))'
+)
+# 文の区切りの候補（句点・感嘆符・疑問符と改行）
+SENTENCE_BOUNDARY_PATTERN = re.compile(r'[。！？\n]')
+PARTICLES = ['は', 'が', 'を', 'に', 'で', 'と', 'の', 'へ', 'から', 'まで']
+PARTICLE_PATTERNS = [
+    (particle, re.compile(f'{particle}[^{particle}\\n]*{particle}'))
+    for particle in PARTICLES
+]
+# 形態素解析で二重助詞の判定から除く助詞の細分類（「AとBと」「AのBの」は誤りではない）
+_IGNORED_PARTICLE_DETAILS = {'並立助詞', '連体化'}
+_SENTENCE_TERMINATORS = {'。', '！', '？'}
+# 形態素を使うルール
+_TOKEN_RULES = ('no-doubled-joshi', 'no-successive-word')
+# 行末がこれらの文字の場合は、次の行を別の文とみなす
+_SENTENCE_END_CHARS = '。！？」』）)：:.'
+# 文書内の長い行（上位10%）に対してこの比率以上の長さの行は、文の途中で折り返されたものとみなす
+_WRAP_WIDTH_PERCENTILE = 0.9
+_WRAP_WIDTH_RATIO = 0.8
+_WRAP_MIN_WIDTH = 20
+# 折り返しを推定するのに必要な行数と、基準の長さ（上位10%の行の長さ）に近い行の数。
+# 行が少ない文書や、基準に近い行が少ない文書では、基準が見出しや表の行そのものの長さになるため推定しない
+_WRAP_MIN_LINES = 4
+_WRAP_MIN_FULL_LINES = 3
+_WRAP_FULL_LINE_TOLERANCE = 0.1
+
+
+# 組み込みルールのメタ情報（問題ごとに文字列を複製せず、同じインスタンスを参照する）
+MIXED_WRITING_STYLE_RULE = RuleInfo(
+    'no-mix-dearu-desumasu', 'mixed_writing_style', 'warning', '文体を統一してください'
+)
+REDUNDANT_EXPRESSION_RULE = RuleInfo(
+    'no-redundant-expression', 'redundant_expression', 'info', 'より簡潔な表現を検討してください'
+)
+DOUBLED_PARTICLE_RULE = RuleInfo(
+    'no-doubled-joshi', 'doubled_particle', 'warning', '文を分けるか、助詞を変更してください'
+)
+ZERO_WIDTH_SPACE_RULE = RuleInfo(
+    'no-zero-width-spaces', 'zero_width_space', 'error', 'ゼロ幅スペースを削除してください'
+)
+SUCCESSIVE_WORD_RULE = RuleInfo(
+    'no-successive-word', 'successive_word', 'warning', '表現を変更するか、語句を削除してください'
+)
+KATAKANA_CONSISTENCY_RULE = RuleInfo(
+    'katakana-consistency', 'katakana_inconsistency', 'info', 'どちらか一方に統一してください'
+)
+
+# 辞書系ルールで検出した語句（ルールID → 語句 → 行内で最初に現れた列）
+TermColumns = Dict[str, Dict[str, int]]
+
+
+@lru_cache(maxsize=None)
+def _notation_rule(standard: str) -> RuleInfo:
+    return RuleInfo(
+        'notation-consistency', 'notation_variation', 'info', f'"{standard}"に統一することを検討してください'
+    )
+
+
+@lru_cache(maxsize=None)
+def _sentence_length_rule(max_length: int) -> RuleInfo:
+    return RuleInfo(
+        'max-sentence-length', 'long_sentence', 'info',
+        f'文を分割することを検討してください（推奨: {max_length}文字以下）'
+    )
+
+
+@lru_cache(maxsize=None)
+def _rule_error_rule(rule_id: str) -> RuleInfo:
+    return RuleInfo(rule_id, 'rule_error', 'error', 'ルールの正規表現を見直すか、ルールを削除してください')
+
+
+# 組み合わせが限られるメッセージは、同じ文字列を使い回す
+@lru_cache(maxsize=None)
+def _notation_message(variation: str, standard: str) -> str:
+    return f'表記ゆれの可能性があります: "{variation}" → "{standard}"'
+
+
+@lru_cache(maxsize=None)
+def _redundant_message(pattern: str) -> str:
+    return f'冗長表現の可能性があります: {pattern}'
+
+
+@lru_cache(maxsize=None)
+def _particle_message(particle: str) -> str:
+    return f'助詞「{particle}」が重複している可能性があります'
+
+
+@lru_cache(maxsize=None)
+def _katakana_message(short_form: str, long_form: str) -> str:
+    return f'カタカナ表記が統一されていません: 「{short_form}」と「{long_form}」'
+
+
+def compute_rules_version(rules: List[Dict]) -> str:
+    """外部ルールの内容から求めるバージョン（内容が同じなら同じ値になる）"""
+    definition = json.dumps(rules, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(definition.encode("utf-8")).hexdigest()[:12]
+
+
+# 行をまたいだ文脈を参照しうる構文（先読み・後読み・文字列の先頭/末尾）
+_CONTEXT_SENSITIVE_SYNTAX = re.compile(r'\(\?<?[=!]|\\[AZ]')
+
+
+class LineIndex:
+    """改行位置の索引（文字オフセットから行番号を求める）"""
+
+    def __init__(self, text: str, first_line: int = 1):
+        self.first_line = first_line
+        starts = [0]
+        pos = text.find('\n')
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = text.find('\n', pos + 1)
+        self.line_starts = starts
+
+    def __len__(self) -> int:
+        return len(self.line_starts)
+
+    def line_of(self, offset: int) -> int:
+        """オフセットが属する行番号を返す"""
+        return bisect_right(self.line_starts, offset) - 1 + self.first_line
+
+    def position_of(self, offset: int) -> Tuple[int, int]:
+        """オフセットの (行番号, 列) を返す（列は1始まり）"""
+        pos = bisect_right(self.line_starts, offset) - 1
+        return pos + self.first_line, offset - self.line_starts[pos] + 1
+
+
+class SentenceIndex:
+    """
+    文の区切りの索引（各文の開始・終了オフセットの配列）
+
+    句点・感嘆符・疑問符で文を区切る。PDFなどで文の途中に入った改行（折り返し）は文の区切りとみなさず、
+    それ以外の改行（見出しや表のセル、句点で終わらない短い行の後など）で区切る。
+    折り返しかどうかは、行の長さが文書内の長い行と同程度で、句点などで終わっておらず、タブを含まず、
+    改行の前後がどちらも日本語などの非ASCII文字か（英文は空白の位置で折り返されるため対象外）で判定する。
+    行が少ない文書や、同じ長さの行が続かない文書では折り返しを推定しない。
+    """
+
+    def __init__(self, text: str, index: LineIndex):
+        self.text = text
+        self.starts = array('l')
+        self.ends = array('l')
+        wrapped = self._find_wrapped_line_ends(text, index)
+        start = 0
+        for m in SENTENCE_BOUNDARY_PATTERN.finditer(text):
+            end = m.start()
+            if m.group() == '\n' and end in wrapped:
+                continue
+            self._add(start, end)
+            start = m.end()
+        self._add(start, len(text))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def length(self, i: int) -> int:
+        """文の文字数（折り返しの改行は数えない）"""
+        start, end = self.starts[i], self.ends[i]
+        return end - start - self.text.count('\n', start, end)
+
+    def _add(self, start: int, end: int) -> None:
+        # 前後の空白を除いた範囲を記録する（空白のみの場合は文とみなさない）
+        text = self.text
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    @staticmethod
+    def _find_wrapped_line_ends(text: str, index: LineIndex) -> set:
+        """折り返しとみなす行末の改行のオフセット"""
+        line_starts = index.line_starts
+        if len(line_starts) - 1 < _WRAP_MIN_LINES:
+            return set()
+        widths = [
+            line_starts[i + 1] - 1 - line_starts[i] for i in range(len(line_starts) - 1)
+        ]
+        reference = sorted(widths)[int((len(widths) - 1) * _WRAP_WIDTH_PERCENTILE)]
+        full_lines = sum(
+            1 for width in widths if abs(width - reference) <= reference * _WRAP_FULL_LINE_TOLERANCE
+        )
+        if full_lines < _WRAP_MIN_FULL_LINES:
+            return set()
+        min_width = max(_WRAP_MIN_WIDTH, reference * _WRAP_WIDTH_RATIO)
+        wrapped = set()
+        for i, width in enumerate(widths):
+            line_end = line_starts[i + 1] - 1
+            if (
+                width >= min_width
+                and text[line_end - 1] not in _SENTENCE_END_CHARS
+                and not text[line_end - 1].isascii()
+                and line_end + 1 < len(text)
+                and not text[line_end + 1].isascii()
+                and text.find('\t', line_starts[i], line_end) == -1
+            ):
+                wrapped.add(line_end)
+        return wrapped
+
+
+class _RuleTimer:
+    """ルールIDごとの所要時間を加算し、無効化されたルールを読み飛ばす（記録先がない場合は計測しない）"""
+
+    def __init__(self, timings: Optional[Dict[str, float]], disabled_rules: Collection[str] = ()):
+        self.timings = timings
+        self.disabled_rules = disabled_rules
+
+    def is_disabled(self, rule_id: str) -> bool:
+        return rule_id in self.disabled_rules
+
+    def run(self, rule_id: str, scan, *args) -> List[Issue]:
+        """ルールを実行する（無効化されている場合は実行しない）"""
+        if rule_id in self.disabled_rules:
+            return []
+        return self.measure(rule_id, scan, *args)
+
+    def measure(self, name: str, func, *args):
+        if self.timings is None:
+            return func(*args)
+        started = time.perf_counter()
+        result = func(*args)
+        self.add(name, time.perf_counter() - started)
+        return result
+
+    def add(self, name: str, elapsed: float) -> None:
+        if self.timings is not None:
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+
+class _ExternalRuleBudget:
+    """
+    文書1件のチェックにおける外部ルールの処理時間の上限（ルール1件ごとと、全ルールの合計）
+
+    行ごとに適用する場合も、ルール1件ごとの上限は行ごとではなく文書全体での合計に適用する。
+    照合の途中で中断できない場合（メインスレッド以外）は、ルールの間と行の間でのみ上限を確認する。
+    """
+
+    def __init__(self):
+        self.rule_seconds = settings.EXTERNAL_RULE_TIMEOUT_MS / 1000
+        document_seconds = settings.EXTERNAL_RULES_DOCUMENT_TIMEOUT_MS / 1000
+        self.deadline = time.perf_counter() + document_seconds if document_seconds > 0 else None
+        # ルールごとの処理時間の合計
+        self.rule_spent: Dict[str, float] = {}
+        # 制限時間を超えたルール（同じ文書では再度適用しない）
+        self.failed_rules = set()
+        self.exhausted = False
+        self.watchdog = RegexWatchdog()
+
+    def __enter__(self) -> "_ExternalRuleBudget":
+        self.watchdog.__enter__()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.watchdog.__exit__(*exc_info)
+
+    def document_exhausted(self) -> bool:
+        """全ルールの合計の上限に達したか"""
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def next_limit(self, rule_id: str) -> Optional[float]:
+        """ルールに使える残りの秒数（制限がない場合はNone、上限に達した場合は0）"""
+        limits = [self.rule_seconds - self.rule_spent.get(rule_id, 0.0)] if self.rule_seconds > 0 else []
+        if self.deadline is not None:
+            limits.append(self.deadline - time.perf_counter())
+        return max(0.0, min(limits)) if limits else None
+
+    def spend(self, rule_id: str, seconds: float) -> None:
+        self.rule_spent[rule_id] = self.rule_spent.get(rule_id, 0.0) + seconds
+
+
 class ProofreadingRules:
     """校正ルールクラス（外部JSONルール対応）"""
 
-    def __init__(self, rules_path: str = None):
+    def __init__(self, rules_path: str = None, rules: Optional[List[Dict]] = None):
+        """
+        Args:
+            rules_path: rules.jsonのパス（省略時はアプリケーションのルール）
+            rules: 読み込み済みの外部ルール（指定した場合はrules.jsonを読まない）
+        """
         # デフォルトのルールファイルパス
         if rules_path is None:
             rules_path = os.path.join(os.path.dirname(__file__), "rules.json")
         self.rules_path = rules_path
         self.external_rules = []
-        self.load_external_rules()
+        if rules is None:
+            self.load_external_rules()
+        else:
+            self.external_rules = rules
+            self.compiled_external_rules = self._compile_external_rules(rules)
+        self.version = compute_rules_version(self.external_rules)
 
         # 既存のハードコーディングルールも残す（従来通り）
         self.dearu_patterns = [
@@ -55,213 +370,610 @@ class ProofreadingRules:
             r'より一層'
         ]
 
+        self.zero_width_chars = ['\u200b', '\u200c', '\u200d', '\ufeff', '\u2060']
+        # 長音記号の有無をチェックする組
+        self.katakana_pairs = [
+            ('コンピュータ', 'コンピューター'),
+            ('サーバ', 'サーバー'),
+            ('ユーザ', 'ユーザー'),
+            ('データ', 'データー'),
+            ('エラー', 'エラ'),
+            ('フォルダ', 'フォルダー')
+        ]
+
+        # ハードコーディングルールのパターンを事前コンパイル
+        self.dearu_regex = re.compile('|'.join(f'(?:{p})' for p in self.dearu_patterns))
+        self.desumasu_regex = re.compile('|'.join(f'(?:{p})' for p in self.desumasu_patterns))
+        # 冗長表現のうちリテラルなものは辞書照合、それ以外は正規表現で判定
+        self.redundant_regexes = [
+            (p, None if self._is_literal(p) else re.compile(p))
+            for p in self.redundant_expressions
+        ]
+        self.literal_matcher = self._build_literal_matcher()
+        # 形態素解析器が使える場合は、助詞・連続語句のルールを形態素単位で判定する（辞書は初回の使用時に読み込む）
+        self.morphology_backend = morphology.backend_version()
+        self.fingerprint = self._compute_fingerprint()
+
+    def _compute_fingerprint(self) -> str:
+        """ルールセット全体の指紋（ルール内容が同じなら同じ値になる）"""
+        definition = json.dumps([
+            ENGINE_VERSION,
+            self.external_rules,
+            self.dearu_patterns,
+            self.desumasu_patterns,
+            self.notation_variations,
+            self.redundant_expressions,
+            self.zero_width_chars,
+            self.katakana_pairs,
+            PARTICLES,
+            self.morphology_backend,
+        ], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(definition.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _is_literal(pattern: str) -> bool:
+        """正規表現のメタ文字を含まないパターンかどうか"""
+        return re.escape(pattern) == pattern
+
+    def _build_literal_matcher(self) -> AhoCorasickMatcher:
+        """辞書系ルールのリテラル語句をまとめた照合器を構築する"""
+        entries = []
+        for standard, variations in self.notation_variations.items():
+            entries.append((standard, 'notation-consistency'))
+            entries.extend((variation, 'notation-consistency') for variation in variations)
+        for short_form, long_form in self.katakana_pairs:
+            entries.append((short_form, 'katakana-consistency'))
+            entries.append((long_form, 'katakana-consistency'))
+        entries.extend((char, 'no-zero-width-spaces') for char in self.zero_width_chars)
+        entries.extend(
+            (pattern, 'no-redundant-expression')
+            for pattern, regex in self.redundant_regexes if regex is None
+        )
+        return AhoCorasickMatcher(entries)
+
+    def find_literal_terms(self, text: str) -> TermColumns:
+        """1行分のテキストから辞書系ルールの語句を1パスで検出し、ルールIDごとに集約する"""
+        return self._group_literal_terms(text, LineIndex(text)).get(1, {})
+
     def load_external_rules(self):
-        """外部JSONルールを読み込む"""
+        """外部JSONルールを読み込み、パターンをコンパイルする"""
         try:
             with open(self.rules_path, encoding="utf-8") as f:
                 self.external_rules = json.load(f)
         except Exception as e:
             self.external_rules = []
-            print(f"[ProofreadingRules] rules.jsonの読み込みに失敗: {e}")
+            logger.error(f"rules.jsonの読み込みに失敗: {e}")
+        self.compiled_external_rules = self._compile_external_rules(self.external_rules)
+
+    @staticmethod
+    def _compile_external_rules(rules: List[Dict]) -> List[Tuple[Dict, "re.Pattern", bool, RuleInfo]]:
+        """
+        外部ルールのパターンをコンパイルする（無効なルールは除外）
+
+        ^ と $ が各行の先頭・末尾に一致するようMULTILINEでコンパイルし、
+        行をまたいだ文脈を参照しない（文書全体に一括適用できる）かと、ルールのメタ情報を併せて記録する。
+        """
+        compiled = []
+        for rule in rules:
+            try:
+                pattern = rule.get("pattern")
+                if not pattern:
+                    continue
+                regex = re.compile(pattern, EXTERNAL_RULE_FLAGS)
+                line_local = not _CONTEXT_SENSITIVE_SYNTAX.search(pattern)
+                rule_id = rule.get("id", "external_rule")
+                info = RuleInfo(rule_id, rule_id, "info", rule.get("description", "見直してください"))
+                compiled.append((rule, regex, line_local, info))
+                # 手作業で編集されたrules.jsonでも危険なパターンに気付けるよう警告する（実行時は時間制限で中断する）
+                for risk in analyze_pattern(pattern):
+                    logger.warning(f"処理時間が極端に長くなるおそれのあるルール: {rule.get('id')}, {risk}")
+            except Exception as e:
+                # 無効な正規表現等はスキップ
+                logger.error(f"ルールのコンパイルに失敗: {rule!r}, エラー: {e}")
+        return compiled
+
+    def check_all_rules(
+        self,
+        text: str,
+        filename: str = "",
+        mode: str = None,
+        timings: Optional[Dict[str, float]] = None,
+        disabled_rules: Collection[str] = ()
+    ) -> List[Issue]:
+        """
+        すべての校正ルールを適用してチェック（外部+従来）
+
+        Args:
+            text: 対象テキスト
+            filename: ファイル名（未使用、互換性のため残す）
+            mode: "document"（各ルールを文書全体に1回適用）または "line"（行ごとに適用）。
+                  省略時は settings.CHECK_MODE。どちらも同じ結果を返す。
+            timings: 指定した場合、ルールIDごとの所要時間（秒）を加算する
+            disabled_rules: 適用しないルールのID
+        """
+        if mode is None:
+            mode = settings.CHECK_MODE
+        if mode == "line":
+            return self.check_lines(text, timings, disabled_rules)
+        return self.check_document(text, timings, disabled_rules)
 
-    def check_all_rules(self, text: str, filename: str = "") -> List[Dict]:
-        """すべての校正ルールを適用してチェック（外部+従来）"""
+    def check_document(
+        self,
+        text: str,
+        timings: Optional[Dict[str, float]] = None,
+        disabled_rules: Collection[str] = ()
+    ) -> List[Issue]:
+        """各ルールを文書全体に1回ずつ適用し、行番号は改行索引から求める"""
+        timer = _RuleTimer(timings, disabled_rules)
+        index = LineIndex(text)
+        terms_by_line = timer.measure(LITERAL_TERMS_STAGE, self._group_literal_terms, text, index)
+        tokens_by_line = self._tokenize_lines(text, index, timer)
+        sentences = self._index_sentences(text, index, timer)
         issues = []
+        # 外部JSONルール
+        with _ExternalRuleBudget() as budget:
+            issues.extend(self._scan_external_rules(text, index, timer, budget))
+        # 従来のハードコーディングルール
+        issues.extend(timer.run('no-mix-dearu-desumasu', self._scan_mixed_writing_style, text, index))
+        issues.extend(timer.run('notation-consistency', self._scan_notation_variations, terms_by_line))
+        issues.extend(timer.run(
+            'no-redundant-expression', self._scan_redundant_expressions, text, index, terms_by_line
+        ))
+        issues.extend(timer.run(
+            'no-doubled-joshi', self._scan_doubled_particles, text, index, tokens_by_line
+        ))
+        issues.extend(timer.run('no-zero-width-spaces', self._scan_zero_width_spaces, terms_by_line))
+        issues.extend(timer.run(
+            'no-successive-word', self._scan_successive_words, text, index, tokens_by_line
+        ))
+        issues.extend(timer.run('max-sentence-length', self._scan_sentence_length, index, sentences))
+        issues.extend(timer.run('katakana-consistency', self._scan_katakana_consistency, terms_by_line))
+        # 行単位チェックと同じ順序（行 → ルール）に並べ替える（安定ソート）
+        issues.sort(key=lambda issue: issue.line)
+        return issues
+
+    def check_lines(
+        self,
+        text: str,
+        timings: Optional[Dict[str, float]] = None,
+        disabled_rules: Collection[str] = ()
+    ) -> List[Issue]:
+        """行ごとにすべてのルールを適用してチェック"""
+        timer = _RuleTimer(timings, disabled_rules)
+        with _ExternalRuleBudget() as budget:
+            return self._check_lines(text, timer, budget)
+
+    def _check_lines(self, text: str, timer: _RuleTimer, budget: "_ExternalRuleBudget") -> List[Issue]:
+        issues = []
+        # 文は行をまたぐため、文の長さは文書全体の索引から求めて、文が始まる行で報告する
+        index = LineIndex(text)
+        long_sentences: Dict[int, List[Issue]] = {}
+        for issue in timer.run(
+            'max-sentence-length', self._scan_sentence_length, index, self._index_sentences(text, index, timer)
+        ):
+            long_sentences.setdefault(issue.line, []).append(issue)
         lines = text.split('\n')
         for line_num, line in enumerate(lines, 1):
+            # 辞書系ルールの語句は行ごとに1回だけ走査する
+            terms = timer.measure(LITERAL_TERMS_STAGE, self.find_literal_terms, line)
+            tokens = self._tokenize_lines(line, LineIndex(line, line_num), timer)
+            tokens = None if tokens is None else tokens.get(line_num, [])
             # 外部JSONルール
-            issues.extend(self.check_external_rules(line, line_num))
+            issues.extend(self._scan_external_rules(line, LineIndex(line, line_num), timer, budget))
             # 従来のハードコーディングルール
-            issues.extend(self.check_mixed_writing_style(line, line_num))
-            issues.extend(self.check_notation_variations(line, line_num))
-            issues.extend(self.check_redundant_expressions(line, line_num))
-            issues.extend(self.check_doubled_particles(line, line_num))
-            issues.extend(self.check_zero_width_spaces(line, line_num))
-            issues.extend(self.check_successive_words(line, line_num))
-            issues.extend(self.check_sentence_length(line, line_num))
-            issues.extend(self.check_katakana_consistency(line, line_num))
+            issues.extend(timer.run('no-mix-dearu-desumasu', self.check_mixed_writing_style, line, line_num))
+            issues.extend(timer.run(
+                'notation-consistency', self.check_notation_variations, line, line_num, terms
+            ))
+            issues.extend(timer.run(
+                'no-redundant-expression', self.check_redundant_expressions, line, line_num, terms
+            ))
+            issues.extend(timer.run(
+                'no-doubled-joshi', self.check_doubled_particles, line, line_num, tokens
+            ))
+            issues.extend(timer.run(
+                'no-zero-width-spaces', self.check_zero_width_spaces, line, line_num, terms
+            ))
+            issues.extend(timer.run(
+                'no-successive-word', self.check_successive_words, line, line_num, tokens
+            ))
+            issues.extend(long_sentences.get(line_num, ()))
+            issues.extend(timer.run(
+                'katakana-consistency', self.check_katakana_consistency, line, line_num, terms
+            ))
         return issues
 
-    def check_external_rules(self, text: str, line_num: int) -> List[Dict]:
+    def _group_literal_terms(self, text: str, index: LineIndex) -> Dict[int, TermColumns]:
+        """辞書系ルールの語句を1パスで検出し、行番号・ルールIDごとに、語句が最初に現れた列を集約する"""
+        terms_by_line: Dict[int, TermColumns] = {}
+        line_starts = index.line_starts
+        # ヒットはほぼオフセット順に得られるため、直前の行の範囲に収まる場合は二分探索を省く
+        line_lo, line_hi, line_terms = 0, -1, None
+        for start, term, rule_id in self.literal_matcher.finditer(text):
+            if not line_lo <= start < line_hi:
+                pos = bisect_right(line_starts, start)
+                line_lo = line_starts[pos - 1]
+                line_hi = line_starts[pos] if pos < len(line_starts) else len(text) + 1
+                line_terms = terms_by_line.setdefault(pos - 1 + index.first_line, {})
+            column = start - line_lo + 1
+            found = line_terms.get(rule_id)
+            if found is None:
+                line_terms[rule_id] = {term: column}
+            elif column < found.get(term, column + 1):
+                found[term] = column
+        return terms_by_line
+
+    # --- 行単位のチェック（各スキャナーを1行分のテキストに適用する） ---
+
+    def check_external_rules(self, text: str, line_num: int) -> List[Issue]:
         """外部JSONルールによるチェック"""
+        return self._scan_external_rules(text, LineIndex(text, line_num))
+    
+    def check_mixed_writing_style(self, text: str, line_num: int) -> List[Issue]:
+        """「ですます調」と「である調」の混在をチェック"""
+        return self._scan_mixed_writing_style(text, LineIndex(text, line_num))
+    
+    def check_notation_variations(self, text: str, line_num: int,
+                                  terms: Optional[TermColumns] = None) -> List[Issue]:
+        """表記ゆれをチェック"""
+        if terms is None:
+            terms = self.find_literal_terms(text)
+        return self._scan_notation_variations({line_num: terms})
+    
+    def check_redundant_expressions(self, text: str, line_num: int,
+                                    terms: Optional[TermColumns] = None) -> List[Issue]:
+        """冗長表現をチェック"""
+        if terms is None:
+            terms = self.find_literal_terms(text)
+        return self._scan_redundant_expressions(text, LineIndex(text, line_num), {line_num: terms})
+    
+    def check_doubled_particles(self, text: str, line_num: int,
+                                tokens: Optional[List[Token]] = None) -> List[Issue]:
+        """二重助詞をチェック"""
+        index = LineIndex(text, line_num)
+        if tokens is not None:
+            tokens_by_line = {line_num: tokens}
+        else:
+            tokens_by_line = self._tokenize_text(text, index) if self.morphology_backend else None
+        return self._scan_doubled_particles(text, index, tokens_by_line)
+    
+    def check_zero_width_spaces(self, text: str, line_num: int,
+                                terms: Optional[TermColumns] = None) -> List[Issue]:
+        """ゼロ幅スペースをチェック"""
+        if terms is None:
+            terms = self.find_literal_terms(text)
+        return self._scan_zero_width_spaces({line_num: terms})
+    
+    def check_successive_words(self, text: str, line_num: int,
+                               tokens: Optional[List[Token]] = None) -> List[Issue]:
+        """連続する同一語句をチェック"""
+        index = LineIndex(text, line_num)
+        if tokens is not None:
+            tokens_by_line = {line_num: tokens}
+        else:
+            tokens_by_line = self._tokenize_text(text, index) if self.morphology_backend else None
+        return self._scan_successive_words(text, index, tokens_by_line)
+    
+    def check_sentence_length(self, text: str, line_num: int, max_length: int = 120) -> List[Issue]:
+        """文の長さをチェック"""
+        index = LineIndex(text, line_num)
+        return self._scan_sentence_length(index, SentenceIndex(text, index), max_length)
+    
+    def check_katakana_consistency(self, text: str, line_num: int,
+                                   terms: Optional[TermColumns] = None) -> List[Issue]:
+        """カタカナ表記の一貫性をチェック"""
+        if terms is None:
+            terms = self.find_literal_terms(text)
+        return self._scan_katakana_consistency({line_num: terms})
+
+    # --- 文書全体を対象とするスキャナー（結果は行番号順） ---
+
+    def _scan_external_rules(self, text: str, index: LineIndex,
+                             timer: Optional[_RuleTimer] = None,
+                             budget: Optional["_ExternalRuleBudget"] = None) -> List[Issue]:
+        """
+        外部JSONルールを適用する（timerを指定した場合はルールIDごとに計測する）
+
+        各ルールは時間制限付きで実行し、制限を超えたルールは中断してrule_errorとして報告する。
+        """
+        if budget is None:
+            with _ExternalRuleBudget() as budget:
+                return self._scan_external_rules(text, index, timer, budget)
         issues = []
-        for rule in self.external_rules:
+        lines = None
+        for rule, regex, line_local, info in self.compiled_external_rules:
+            rule_id = info.rule
+            if (timer is not None and timer.is_disabled(rule_id)) or rule_id in budget.failed_rules:
+                continue
+            if budget.document_exhausted():
+                if not budget.exhausted:
+                    budget.exhausted = True
+                    issues.append(self._rule_error(
+                        "external-rules", index.first_line,
+                        f"外部ルールの処理時間の合計が上限（{settings.EXTERNAL_RULES_DOCUMENT_TIMEOUT_MS} ms）"
+                        f"を超えたため、残りのルールを適用しませんでした"
+                    ))
+                break
+            seconds = budget.next_limit(rule_id)
+            started = time.perf_counter()
             try:
-                pattern = rule.get("pattern")
-                if not pattern:
-                    continue
-                # re.UNICODE, re.MULTILINE, re.DOTALL で日本語対応
-                matches = list(re.finditer(pattern, text, re.UNICODE))
-                for m in matches:
-                    match_text = m.group(0)
-                    message = rule.get("message", "ルール違反: {match}").replace("{match}", match_text)
-                    issues.append({
-                        "type": rule.get("id", "external_rule"),
-                        "severity": "info",
-                        "line": line_num,
-                        "message": message,
-                        "rule": rule.get("id", "external_rule"),
-                        "suggestion": rule.get("description", "見直してください")
-                    })
+                if seconds is not None and seconds <= 0:
+                    # 行ごとに適用した時間の合計が、ルール1件の上限に達した
+                    raise RegexTimeout(f"処理時間の合計が上限（{settings.EXTERNAL_RULE_TIMEOUT_MS} ms）を超えました")
+                # 照合の途中で中断できない場合は、行ごとに適用して行の間で上限を確認する
+                check_deadline = seconds is not None and not budget.watchdog.active
+                with budget.watchdog.limit(seconds or 0):
+                    matches = None
+                    if (line_local and not check_deadline) or len(index) == 1:
+                        matches = [(*index.position_of(m.start()), m.group(0)) for m in regex.finditer(text)]
+                        # 改行をまたいだマッチがあれば行ごとの適用にフォールバックする
+                        if any('\n' in match_text for _, _, match_text in matches):
+                            matches = None
+                    if matches is None:
+                        if lines is None:
+                            lines = text.split('\n')
+                        matches = []
+                        for line_num, line in enumerate(lines, index.first_line):
+                            if check_deadline and time.perf_counter() - started >= seconds:
+                                raise RegexTimeout(f"処理時間が上限（{seconds * 1000:.0f} ms）を超えました")
+                            matches.extend((line_num, m.start() + 1, m.group(0)) for m in regex.finditer(line))
+                template = rule.get("message", "ルール違反: {match}")
+                # 同じ語句に一致した問題ではメッセージを使い回す
+                messages: Dict[str, str] = {}
+                for line_num, column, match_text in matches:
+                    message = messages.get(match_text)
+                    if message is None:
+                        message = messages[match_text] = template.replace("{match}", match_text)
+                    issues.append(Issue(info, line_num, column, message))
+            except RegexTimeout as e:
+                # 同じ文書では以降このルールを適用しない
+                budget.failed_rules.add(rule_id)
+                logger.warning(f"ルールの処理を中断: {rule_id}, {e}")
+                issues.append(self._rule_error(
+                    rule_id, index.first_line,
+                    f"ルール「{rule_id}」の処理が制限時間を超えたため、中断しました"
+                ))
             except Exception as e:
-                # 無効な正規表現等はスキップ
-                print(f"[ProofreadingRules] ルール適用エラー: {e}")
+                logger.error(f"ルール適用エラー: {rule_id}, {e}")
+            elapsed = time.perf_counter() - started
+            budget.spend(rule_id, elapsed)
+            if timer is not None:
+                timer.add(rule_id, elapsed)
+        # ルールごとに収集しているため行番号順に揃える（同一行内はルール順を保つ）
+        issues.sort(key=lambda issue: issue.line)
         return issues
-    
-    def check_mixed_writing_style(self, text: str, line_num: int) -> List[Dict]:
-        """「ですます調」と「である調」の混在をチェック"""
+
+    @staticmethod
+    def _rule_error(rule_id: str, line_num: int, message: str) -> Issue:
+        """ルールを適用できなかったことを表す問題"""
+        return Issue(_rule_error_rule(rule_id), line_num, 1, message)
+
+    def _scan_mixed_writing_style(self, text: str, index: LineIndex) -> List[Issue]:
+        """「ですます調」と「である調」が同じ行に混在する箇所を検出"""
         issues = []
         
-        has_dearu = any(re.search(pattern, text) for pattern in self.dearu_patterns)
-        has_desumasu = any(re.search(pattern, text) for pattern in self.desumasu_patterns)
+        dearu_columns = self._first_columns(self.dearu_regex, text, index)
+        if not dearu_columns:
+            return issues
+        desumasu_columns = self._first_columns(self.desumasu_regex, text, index)
         
-        if has_dearu and has_desumasu:
-            issues.append({
-                'type': 'mixed_writing_style',
-                'severity': 'warning',
-                'line': line_num,
-                'message': '「ですます調」と「である調」が混在しています',
-                'rule': 'no-mix-dearu-desumasu',
-                'suggestion': '文体を統一してください'
-            })
+        for line_num in sorted(dearu_columns.keys() & desumasu_columns.keys()):
+            issues.append(Issue(
+                MIXED_WRITING_STYLE_RULE, line_num,
+                min(dearu_columns[line_num], desumasu_columns[line_num]),
+                '「ですます調」と「である調」が混在しています'
+            ))
         
         return issues
-    
-    def check_notation_variations(self, text: str, line_num: int) -> List[Dict]:
-        """表記ゆれをチェック"""
+
+    @staticmethod
+    def _first_columns(regex: "re.Pattern", text: str, index: LineIndex) -> Dict[int, int]:
+        """行ごとに、正規表現が最初に一致した列を求める"""
+        columns: Dict[int, int] = {}
+        for m in regex.finditer(text):
+            line_num, column = index.position_of(m.start())
+            columns.setdefault(line_num, column)
+        return columns
+
+    def _scan_notation_variations(self, terms_by_line: Dict[int, TermColumns]) -> List[Issue]:
+        """行ごとに検出済みの語句から表記ゆれを判定"""
         issues = []
         
-        for standard, variations in self.notation_variations.items():
-            if standard in text:
-                for variation in variations:
-                    if variation in text and variation != standard:
-                        issues.append({
-                            'type': 'notation_variation',
-                            'severity': 'info',
-                            'line': line_num,
-                            'message': f'表記ゆれの可能性があります: "{variation}" → "{standard}"',
-                            'rule': 'notation-consistency',
-                            'suggestion': f'"{standard}"に統一することを検討してください'
-                        })
+        for line_num in sorted(terms_by_line):
+            found = terms_by_line[line_num].get('notation-consistency', ())
+            if not found:
+                continue
+            for standard, variations in self.notation_variations.items():
+                if standard in found:
+                    for variation in variations:
+                        if variation in found and variation != standard:
+                            issues.append(Issue(
+                                _notation_rule(standard), line_num, found[variation],
+                                _notation_message(variation, standard)
+                            ))
         
         return issues
-    
-    def check_redundant_expressions(self, text: str, line_num: int) -> List[Dict]:
-        """冗長表現をチェック"""
+
+    def _scan_redundant_expressions(self, text: str, index: LineIndex,
+                                    terms_by_line: Dict[int, TermColumns]) -> List[Issue]:
+        """冗長表現を検出（1行につき各パターン1件）"""
         issues = []
         
-        for pattern in self.redundant_expressions:
-            if re.search(pattern, text):
-                issues.append({
-                    'type': 'redundant_expression',
-                    'severity': 'info',
-                    'line': line_num,
-                    'message': f'冗長表現の可能性があります: {pattern}',
-                    'rule': 'no-redundant-expression',
-                    'suggestion': 'より簡潔な表現を検討してください'
-                })
+        # 行番号 → その行でヒットしたパターンと最初に現れた列
+        hits: Dict[int, Dict[str, int]] = {}
+        for line_num, line_terms in terms_by_line.items():
+            found = line_terms.get('no-redundant-expression')
+            if found:
+                hits.setdefault(line_num, {}).update(found)
+        for pattern, regex in self.redundant_regexes:
+            if regex is not None:
+                for line_num, column in self._first_columns(regex, text, index).items():
+                    hits.setdefault(line_num, {})[pattern] = column
+        
+        for line_num in sorted(hits):
+            line_hits = hits[line_num]
+            for pattern, _ in self.redundant_regexes:
+                if pattern in line_hits:
+                    issues.append(Issue(
+                        REDUNDANT_EXPRESSION_RULE, line_num, line_hits[pattern], _redundant_message(pattern)
+                    ))
         
         return issues
-    
-    def check_doubled_particles(self, text: str, line_num: int) -> List[Dict]:
-        """二重助詞をチェック"""
+
+    def _scan_doubled_particles(self, text: str, index: LineIndex,
+                                tokens_by_line: Optional[Dict[int, List[Token]]] = None) -> List[Issue]:
+        """
+        同じ文に同じ助詞が2回以上現れる箇所を検出
+
+        形態素がない場合は、同じ行に同じ文字が2回現れるかで簡易的に判定する。
+        """
         issues = []
-        particles = ['は', 'が', 'を', 'に', 'で', 'と', 'の', 'へ', 'から', 'まで']
         
-        for particle in particles:
-            # 連続する助詞をチェック
-            pattern = f'{particle}[^{particle}]*{particle}'
-            if re.search(pattern, text):
-                issues.append({
-                    'type': 'doubled_particle',
-                    'severity': 'warning',
-                    'line': line_num,
-                    'message': f'助詞「{particle}」が重複している可能性があります',
-                    'rule': 'no-doubled-joshi',
-                    'suggestion': '文を分けるか、助詞を変更してください'
-                })
+        # 行番号 → 重複した助詞と、2回目に現れた列
+        if tokens_by_line is None:
+            hits: Dict[int, Dict[str, int]] = {}
+            for particle, regex in PARTICLE_PATTERNS:
+                # 連続する助詞をチェック
+                for m in regex.finditer(text):
+                    line_num, column = index.position_of(m.end() - len(particle))
+                    hits.setdefault(line_num, {}).setdefault(particle, column)
+        else:
+            hits = self._find_doubled_particle_tokens(tokens_by_line)
+        
+        for line_num in sorted(hits):
+            line_hits = hits[line_num]
+            for particle in PARTICLES:
+                if particle in line_hits:
+                    issues.append(Issue(
+                        DOUBLED_PARTICLE_RULE, line_num, line_hits[particle], _particle_message(particle)
+                    ))
         
         return issues
-    
-    def check_zero_width_spaces(self, text: str, line_num: int) -> List[Dict]:
-        """ゼロ幅スペースをチェック"""
+
+    def _scan_zero_width_spaces(self, terms_by_line: Dict[int, TermColumns]) -> List[Issue]:
+        """行ごとに検出済みの文字からゼロ幅スペースを判定"""
         issues = []
-        zero_width_chars = ['\u200b', '\u200c', '\u200d', '\ufeff', '\u2060']
         
-        for char in zero_width_chars:
-            if char in text:
-                issues.append({
-                    'type': 'zero_width_space',
-                    'severity': 'error',
-                    'line': line_num,
-                    'message': 'ゼロ幅スペースが検出されました',
-                    'rule': 'no-zero-width-spaces',
-                    'suggestion': 'ゼロ幅スペースを削除してください'
-                })
+        for line_num in sorted(terms_by_line):
+            found = terms_by_line[line_num].get('no-zero-width-spaces', {})
+            for char in self.zero_width_chars:
+                if char in found:
+                    issues.append(Issue(
+                        ZERO_WIDTH_SPACE_RULE, line_num, found[char], 'ゼロ幅スペースが検出されました'
+                    ))
         
         return issues
-    
-    def check_successive_words(self, text: str, line_num: int) -> List[Dict]:
-        """連続する同一語句をチェック"""
+
+    @staticmethod
+    def _find_doubled_particle_tokens(tokens_by_line: Dict[int, List[Token]]) -> Dict[int, Dict[str, int]]:
+        """行ごとに、同じ文の中で同じ用法の助詞が2回以上現れたものと、2回目に現れた列を求める"""
+        hits: Dict[int, Dict[str, int]] = {}
+        for line_num, tokens in tokens_by_line.items():
+            seen = set()
+            for token in tokens:
+                if token.surface in _SENTENCE_TERMINATORS:
+                    seen.clear()
+                elif token.pos == '助詞' and token.pos_detail not in _IGNORED_PARTICLE_DETAILS:
+                    key = (token.surface, token.pos_detail)
+                    if key in seen:
+                        hits.setdefault(line_num, {}).setdefault(token.surface, token.start + 1)
+                    seen.add(key)
+        return hits
+
+    def _scan_successive_words(self, text: str, index: LineIndex,
+                               tokens_by_line: Optional[Dict[int, List[Token]]] = None) -> List[Issue]:
+        """
+        同じ行内で連続する同一語句を検出
+
+        形態素がない場合は、文字種で区切った語句が記号や空白を挟んで繰り返されるかで簡易的に判定する。
+        """
         issues = []
         
-        # 日本語の語句分割（簡易版）
-        words = re.findall(r'[ぁ-んァ-ヶ一-龯]+', text)
-        
-        for i in range(len(words) - 1):
-            if words[i] == words[i + 1] and len(words[i]) > 1:
-                issues.append({
-                    'type': 'successive_word',
-                    'severity': 'warning',
-                    'line': line_num,
-                    'message': f'同一語句の連続使用が検出されました: 「{words[i]}」',
-                    'rule': 'no-successive-word',
-                    'suggestion': '表現を変更するか、語句を削除してください'
-                })
+        if tokens_by_line is None:
+            # 日本語の語句分割（簡易版）で隣り合う語句が同一の箇所
+            words = [
+                (*index.position_of(m.start()), m.group(1)) for m in SUCCESSIVE_WORD_PATTERN.finditer(text)
+            ]
+        else:
+            words = self._find_successive_tokens(tokens_by_line)
+        for line_num, column, word in words:
+            issues.append(Issue(
+                SUCCESSIVE_WORD_RULE, line_num, column, f'同一語句の連続使用が検出されました: 「{word}」'
+            ))
         
         return issues
-    
-    def check_sentence_length(self, text: str, line_num: int, max_length: int = 120) -> List[Dict]:
-        """文の長さをチェック"""
+
+    @staticmethod
+    def _find_successive_tokens(tokens_by_line: Dict[int, List[Token]]) -> List[Tuple[int, int, str]]:
+        """行ごとに、空白以外を挟まずに同じ品詞の同じ語が続く箇所を (行番号, 1つ目の語の列, 語) で求める"""
+        words = []
+        for line_num in sorted(tokens_by_line):
+            previous = None
+            for token in tokens_by_line[line_num]:
+                if token.pos == '記号':
+                    if token.pos_detail != '空白':
+                        previous = None
+                    continue
+                if previous is not None and token.surface == previous.surface and token.pos == previous.pos:
+                    words.append((line_num, previous.start + 1, token.surface))
+                previous = token
+        return words
+
+    @staticmethod
+    def _index_sentences(text: str, index: LineIndex, timer: _RuleTimer) -> Optional[SentenceIndex]:
+        """文書1件の文の区切りを1回だけ求める（文単位のルールがすべて無効な場合はNone）"""
+        if timer.is_disabled('max-sentence-length'):
+            return None
+        return timer.measure(SENTENCES_STAGE, SentenceIndex, text, index)
+
+    def _tokenize_lines(self, text: str, index: LineIndex,
+                        timer: _RuleTimer) -> Optional[Dict[int, List[Token]]]:
+        """
+        空行以外の各行を形態素に分割する（文書1件につき1回、形態素を使うルールで共有する）
+
+        形態素解析器が使えない場合や、形態素を使うルールがすべて無効な場合はNoneを返す。
+        """
+        if not self.morphology_backend or all(timer.is_disabled(rule_id) for rule_id in _TOKEN_RULES):
+            return None
+        return timer.measure(MORPHOLOGY_STAGE, self._tokenize_text, text, index)
+
+    @staticmethod
+    def _tokenize_text(text: str, index: LineIndex) -> Optional[Dict[int, List[Token]]]:
+        if morphology.get_tokenizer() is None:
+            return None
+        return {
+            index.first_line + offset: morphology.tokenize(line)
+            for offset, line in enumerate(text.split('\n')) if line.strip()
+        }
+
+    def _scan_sentence_length(self, index: LineIndex, sentences: Optional[SentenceIndex],
+                              max_length: int = 120) -> List[Issue]:
+        """文の長さをチェック（行をまたぐ文は、文が始まる行で報告する）"""
         issues = []
+        if sentences is None:
+            return issues
         
-        sentences = re.split(r'[。！？]', text)
-        for sentence in sentences:
-            if len(sentence.strip()) > max_length:
-                issues.append({
-                    'type': 'long_sentence',
-                    'severity': 'info',
-                    'line': line_num,
-                    'message': f'文が長すぎます（{len(sentence)}文字）',
-                    'rule': 'max-sentence-length',
-                    'suggestion': f'文を分割することを検討してください（推奨: {max_length}文字以下）'
-                })
+        info = _sentence_length_rule(max_length)
+        for i in range(len(sentences)):
+            length = sentences.length(i)
+            if length > max_length:
+                line_num, column = index.position_of(sentences.starts[i])
+                issues.append(Issue(info, line_num, column, f'文が長すぎます（{length}文字）'))
         
         return issues
-    
-    def check_katakana_consistency(self, text: str, line_num: int) -> List[Dict]:
-        """カタカナ表記の一貫性をチェック"""
+
+    def _scan_katakana_consistency(self, terms_by_line: Dict[int, TermColumns]) -> List[Issue]:
+        """行ごとに検出済みの語句からカタカナ表記の不統一を判定"""
         issues = []
         
-        # 長音記号の有無をチェック
-        katakana_pairs = [
-            ('コンピュータ', 'コンピューター'),
-            ('サーバ', 'サーバー'),
-            ('ユーザ', 'ユーザー'),
-            ('データ', 'データー'),
-            ('エラー', 'エラ'),
-            ('フォルダ', 'フォルダー')
-        ]
-        
-        for short_form, long_form in katakana_pairs:
-            if short_form in text and long_form in text:
-                issues.append({
-                    'type': 'katakana_inconsistency',
-                    'severity': 'info',
-                    'line': line_num,
-                    'message': f'カタカナ表記が統一されていません: 「{short_form}」と「{long_form}」',
-                    'rule': 'katakana-consistency',
-                    'suggestion': 'どちらか一方に統一してください'
-                })
+        for line_num in sorted(terms_by_line):
+            found = terms_by_line[line_num].get('katakana-consistency', {})
+            for short_form, long_form in self.katakana_pairs:
+                if short_form in found and long_form in found:
+                    issues.append(Issue(
+                        KATAKANA_CONSISTENCY_RULE, line_num, min(found[short_form], found[long_form]),
+                        _katakana_message(short_form, long_form)
+                    ))
         
         return issues
+
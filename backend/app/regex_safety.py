@@ -0,0 +1,329 @@
+"""
+正規表現の安全性チェックモジュール
+外部ルールの正規表現について、破滅的なバックトラッキング（ReDoS）を起こしうる構造を静的に検出し、
+実行時には処理時間の上限を設けて中断できるようにする
+"""
+import re
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Set
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python 3.10以前
+    import sre_constants
+    import sre_parse
+
+# 外部ルールのコンパイルに使うフラグ（ProofreadingRulesと同じ）
+EXTERNAL_RULE_FLAGS = re.UNICODE | re.MULTILINE
+
+_REPEAT_OPS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+_POSSESSIVE_REPEAT = getattr(sre_constants, "POSSESSIVE_REPEAT", None)
+_ATOMIC_GROUP = getattr(sre_constants, "ATOMIC_GROUP", None)
+_ZERO_WIDTH_OPS = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+
+# 文字集合が重なるかを調べる際に、範囲の端点に加えて試す代表的な文字
+_PROBE_CHARS = "aZz09_ \t\n.,-/。、「」あんアンー一漢字ａ０"
+
+_CATEGORY_PREDICATES = {
+    sre_constants.CATEGORY_DIGIT: str.isdigit,
+    sre_constants.CATEGORY_NOT_DIGIT: lambda ch: not ch.isdigit(),
+    sre_constants.CATEGORY_SPACE: str.isspace,
+    sre_constants.CATEGORY_NOT_SPACE: lambda ch: not ch.isspace(),
+    sre_constants.CATEGORY_WORD: lambda ch: ch.isalnum() or ch == "_",
+    sre_constants.CATEGORY_NOT_WORD: lambda ch: not (ch.isalnum() or ch == "_"),
+}
+
+
+class RegexTimeout(Exception):
+    """正規表現の処理が時間の上限を超えた"""
+
+
+class _CharSet:
+    """正規表現の1文字目に来うる文字の集合（判定関数と、重なりの判定に使う代表文字）"""
+
+    def __init__(self, predicates: List[Callable[[str], bool]], samples: Set[str]):
+        self.predicates = predicates
+        self.samples = samples
+
+    @classmethod
+    def everything(cls) -> "_CharSet":
+        return cls([lambda ch: True], set())
+
+    def union(self, other: "_CharSet") -> "_CharSet":
+        return _CharSet(self.predicates + other.predicates, self.samples | other.samples)
+
+    def contains(self, ch: str) -> bool:
+        return any(predicate(ch) for predicate in self.predicates)
+
+    def overlaps(self, other: "_CharSet") -> bool:
+        for ch in self.samples | other.samples | set(_PROBE_CHARS):
+            if self.contains(ch) and other.contains(ch):
+                return True
+        return False
+
+
+def _charset_of_in(items) -> _CharSet:
+    negate = False
+    predicates: List[Callable[[str], bool]] = []
+    samples: Set[str] = set()
+    for op, av in items:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            ch = chr(av)
+            samples.add(ch)
+            predicates.append(lambda c, ch=ch: c == ch)
+        elif op == sre_constants.RANGE:
+            lo, hi = chr(av[0]), chr(av[1])
+            samples.update((lo, hi))
+            predicates.append(lambda c, lo=lo, hi=hi: lo <= c <= hi)
+        elif op == sre_constants.CATEGORY and av in _CATEGORY_PREDICATES:
+            predicates.append(_CATEGORY_PREDICATES[av])
+        else:
+            # 判定できない要素は何にでも一致するとみなす（安全側に倒す）
+            predicates.append(lambda c: True)
+    if negate:
+        return _CharSet([lambda c: not any(p(c) for p in predicates)], samples)
+    return _CharSet(predicates, samples)
+
+
+def _is_unbounded(op, av) -> bool:
+    return op in _REPEAT_OPS and av[1] == sre_constants.MAXREPEAT
+
+
+def _nullable(element) -> bool:
+    """要素が空文字列に一致しうるか"""
+    op, av = element
+    if op in _ZERO_WIDTH_OPS or op == sre_constants.GROUPREF:
+        return True
+    if op in _REPEAT_OPS or op == _POSSESSIVE_REPEAT:
+        return av[0] == 0 or all(_nullable(e) for e in av[2])
+    if op == sre_constants.SUBPATTERN:
+        return all(_nullable(e) for e in av[3])
+    if op == _ATOMIC_GROUP:
+        return all(_nullable(e) for e in av)
+    if op == sre_constants.BRANCH:
+        return any(all(_nullable(e) for e in branch) for branch in av[1])
+    return False
+
+
+def _first_chars(sequence) -> Optional[_CharSet]:
+    """並びの先頭に来うる文字の集合（空文字列にしか一致しない場合はNone）"""
+    result: Optional[_CharSet] = None
+    for element in sequence:
+        charset = _element_chars(element)
+        if charset is not None:
+            result = charset if result is None else result.union(charset)
+        if not _nullable(element):
+            break
+    return result
+
+
+def _element_chars(element) -> Optional[_CharSet]:
+    op, av = element
+    if op == sre_constants.LITERAL:
+        ch = chr(av)
+        return _CharSet([lambda c: c == ch], {ch})
+    if op == sre_constants.NOT_LITERAL:
+        ch = chr(av)
+        return _CharSet([lambda c: c != ch], {ch})
+    if op == sre_constants.IN:
+        return _charset_of_in(av)
+    if op in _REPEAT_OPS or op == _POSSESSIVE_REPEAT:
+        return _first_chars(av[2])
+    if op == sre_constants.SUBPATTERN:
+        return _first_chars(av[3])
+    if op == _ATOMIC_GROUP:
+        return _first_chars(av)
+    if op == sre_constants.BRANCH:
+        result = None
+        for branch in av[1]:
+            charset = _first_chars(branch)
+            if charset is not None:
+                result = charset if result is None else result.union(charset)
+        return result
+    if op in _ZERO_WIDTH_OPS:
+        return None
+    return _CharSet.everything()
+
+
+def _flatten(sequence) -> list:
+    """グループを展開した要素の並び（選択肢の中は展開しない）"""
+    flat = []
+    for op, av in sequence:
+        if op == sre_constants.SUBPATTERN:
+            flat.extend(_flatten(av[3]))
+        else:
+            flat.append((op, av))
+    return flat
+
+
+def _is_ambiguous_body(body: list) -> bool:
+    """
+    繰り返しの本体が、同じ文字列を複数通りに分割して一致しうるか
+
+    本体の中に上限のない繰り返しがあり、それ以外の要素が省略可能か同じ文字に一致する場合
+    （例: (a+)+、(\\w+\\s?)+）や、先頭の文字が重なる選択肢がある場合（例: (a|ab)+）に該当する。
+    """
+    if all(_nullable(element) for element in body):
+        return True
+    for i, (op, av) in enumerate(body):
+        if _is_unbounded(op, av):
+            inner = _first_chars(av[2])
+            others = body[:i] + body[i + 1:]
+            if inner is None or all(
+                _nullable(other) or (_element_chars(other) or _CharSet.everything()).overlaps(inner)
+                for other in others
+            ):
+                return True
+        elif op == sre_constants.BRANCH:
+            branches = av[1]
+            firsts = [_first_chars(branch) for branch in branches]
+            for j in range(len(firsts)):
+                for k in range(j + 1, len(firsts)):
+                    if firsts[j] is None or firsts[k] is None or firsts[j].overlaps(firsts[k]):
+                        return True
+            rest = body[:i] + body[i + 1:]
+            if any(_is_ambiguous_body(_flatten(branch) + rest) for branch in branches):
+                return True
+    return False
+
+
+def _find_risks(sequence, risks: List[str]) -> None:
+    previous = None
+    for op, av in sequence:
+        if _is_unbounded(op, av):
+            body = _flatten(av[2])
+            if _is_ambiguous_body(body):
+                risks.append("上限のない繰り返しの中に、同じ文字列に複数通りに一致する繰り返しや選択肢があります")
+            if previous is not None and _is_unbounded(*previous):
+                first, prev_chars = _first_chars(av[2]), _first_chars(previous[1][2])
+                if first is not None and prev_chars is not None and first.overlaps(prev_chars):
+                    risks.append("同じ文字に一致する上限のない繰り返しが連続しています")
+            _find_risks(av[2], risks)
+        elif op in _REPEAT_OPS or op == _POSSESSIVE_REPEAT:
+            _find_risks(av[2], risks)
+        elif op == sre_constants.SUBPATTERN:
+            _find_risks(av[3], risks)
+        elif op == sre_constants.BRANCH:
+            for branch in av[1]:
+                _find_risks(branch, risks)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _find_risks(av[1], risks)
+        elif op == _ATOMIC_GROUP:
+            _find_risks(av, risks)
+        if not (op in _ZERO_WIDTH_OPS):
+            previous = (op, av)
+
+
+def analyze_pattern(pattern: str) -> List[str]:
+    """
+    正規表現の構造から、破滅的なバックトラッキングを起こしうる箇所を検出する
+
+    構文のみによる近似的な判定のため、検出されなくても安全とは限らない（実行時の時間制限と併用する）。
+
+    Returns:
+        検出した問題の説明のリスト（問題がない場合は空）
+    """
+    risks: List[str] = []
+    _find_risks(sre_parse.parse(pattern, EXTERNAL_RULE_FLAGS), risks)
+    return list(dict.fromkeys(risks))
+
+
+def validate_rules(rules) -> List[dict]:
+    """
+    外部ルールの定義を検証する
+
+    Returns:
+        問題のあるルールごとの {"index", "id", "error"} のリスト（問題がない場合は空）
+    """
+    errors = []
+    seen_ids = set()
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            errors.append({"index": i, "id": None, "error": "ルールはオブジェクト形式で指定してください"})
+            continue
+        rule_id = rule.get("id")
+        pattern = rule.get("pattern")
+        if not isinstance(rule_id, str) or not rule_id:
+            errors.append({"index": i, "id": rule_id, "error": "idを文字列で指定してください"})
+        elif rule_id in seen_ids:
+            errors.append({"index": i, "id": rule_id, "error": f"idが重複しています: {rule_id}"})
+        seen_ids.add(rule_id)
+        if not isinstance(pattern, str) or not pattern:
+            errors.append({"index": i, "id": rule_id, "error": "patternを文字列で指定してください"})
+            continue
+        try:
+            re.compile(pattern, EXTERNAL_RULE_FLAGS)
+        except re.error as e:
+            errors.append({"index": i, "id": rule_id, "error": f"正規表現のコンパイルに失敗しました: {e}"})
+            continue
+        for risk in analyze_pattern(pattern):
+            errors.append({"index": i, "id": rule_id, "error": f"処理時間が極端に長くなるおそれがあります: {risk}"})
+    return errors
+
+
+def can_interrupt() -> bool:
+    """現在のスレッドで正規表現の処理を時間制限で中断できるか（シグナルはメインスレッドでのみ受け取れる）"""
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+class RegexWatchdog:
+    """
+    正規表現の処理に制限時間を設ける見張り役
+
+    有効な間は一定間隔でSIGALRMを受け取り、limit()のブロック内で期限を過ぎていればRegexTimeoutを送出する。
+    reモジュールの照合処理はシグナルを定期的に確認するため、照合の途中でも中断できる。
+    ルールごとにタイマーを設定し直さずに済むよう、文書1件のチェックにつき1回だけタイマーを設定する。
+    中断できない環境（メインスレッド以外など）では制限を設けずに実行する（activeがFalseになる）。
+    """
+
+    def __init__(self, tick: float = 0.02):
+        """
+        Args:
+            tick: 期限を確認する間隔（秒）。中断までの遅れはこの間隔以内になる
+        """
+        self.tick = tick
+        self._deadline: Optional[float] = None
+        self._limit_seconds = 0.0
+        self._previous_handler = None
+        self._active = False
+
+    @property
+    def active(self) -> bool:
+        """照合の途中で中断できる状態か"""
+        return self._active
+
+    def __enter__(self) -> "RegexWatchdog":
+        if can_interrupt():
+            self._previous_handler = signal.signal(signal.SIGALRM, self._handle_alarm)
+            signal.setitimer(signal.ITIMER_REAL, self.tick, self.tick)
+            self._active = True
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._active:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous_handler)
+            self._active = False
+
+    @contextmanager
+    def limit(self, seconds: float) -> Iterator[None]:
+        """ブロック内の処理が制限時間（秒）を超えた場合にRegexTimeoutを送出する（0以下の場合は無制限）"""
+        if seconds <= 0 or not self._active:
+            yield
+            return
+        self._limit_seconds = seconds
+        self._deadline = time.perf_counter() + seconds
+        try:
+            yield
+        finally:
+            self._deadline = None
+
+    def _handle_alarm(self, signum, frame) -> None:
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            self._deadline = None
+            raise RegexTimeout(f"処理時間が上限（{self._limit_seconds * 1000:.0f} ms）を超えました")
@@ -0,0 +1,223 @@
+"""
+チェック結果キャッシュモジュール
+ファイル内容のハッシュとルールセットの指紋をキーに、チェック結果を再利用する
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .config import settings
+from .proofreading_rules import ENGINE_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def _output_settings() -> list:
+    """チェック結果が変わる設定（変更した場合に、変更前の結果を使わないようキーに含める）"""
+    return [
+        ENGINE_VERSION,
+        settings.CHECK_MODE,
+        settings.MAX_SENTENCE_LENGTH,
+        settings.EXCEL_READ_ONLY,
+        settings.EXCEL_MAX_ROWS_PER_SHEET,
+        settings.EXCEL_MAX_CELLS_PER_SHEET,
+    ]
+
+
+class ResultCache:
+    """メモリ上のLRUと、任意のディスク層からなる2段のチェック結果キャッシュ"""
+
+    def __init__(self, max_entries: int, disk_dir: str = "", disk_max_bytes: int = 0, memory_max_bytes: int = 0):
+        """
+        Args:
+            max_entries: メモリ層に保持する最大件数（0の場合はメモリ層を使わない）
+            disk_dir: ディスク層の保存ディレクトリ（空の場合はディスク層を使わない）
+            disk_max_bytes: ディスク層の合計サイズ上限（バイト）
+            memory_max_bytes: メモリ層の合計サイズ上限（バイト、JSONに変換したときの大きさで数える。0の場合は件数のみで制限する）
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        # キー → (結果, 大きさ)
+        self._memory: "OrderedDict[str, Tuple[dict, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._iter_disk_entries())
+
+    @staticmethod
+    def make_key(content_hash: str, file_extension: str, rules_fingerprint: str) -> str:
+        """キャッシュキーを作成（抽出方法は拡張子で決まるため拡張子も含める。結果が変わる設定も含める）"""
+        output_settings = json.dumps(_output_settings())
+        source = f"{content_hash}:{file_extension.lower()}:{rules_fingerprint}:{output_settings}"
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """キャッシュされた結果を取得（存在しない場合はNone）"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+
+        payload = self._read_disk(key)
+        value = self._decode(key, payload) if payload is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._put_memory(key, value, len(payload))
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        """結果をキャッシュに保存"""
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._put_memory(key, value, len(payload))
+        self._write_disk(key, payload)
+
+    def clear(self) -> None:
+        """メモリ層のキャッシュを破棄"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def stats(self) -> dict:
+        """キャッシュのヒット・ミス件数などの統計情報"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_max_entries": self.max_entries,
+                "memory_bytes": self._memory_bytes,
+                "memory_max_bytes": self.memory_max_bytes,
+                "disk_enabled": bool(self.disk_dir),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+            }
+
+    def _put_memory(self, key: str, value: dict, size: int) -> None:
+        if self.max_entries <= 0:
+            return
+        # 上限より大きな結果は、他のエントリをすべて追い出さないようメモリ層に置かない
+        if self.memory_max_bytes and size > self.memory_max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous[1]
+        self._memory[key] = (value, size)
+        self._memory_bytes += size
+        while len(self._memory) > self.max_entries or (
+            self.memory_max_bytes and self._memory_bytes > self.memory_max_bytes
+        ):
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        """ディスク層のエントリ（JSON文字列）を読み込む"""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                payload = f.read()
+            # 最近使われたエントリを残すため更新時刻を更新
+            os.utime(path)
+            return payload
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"キャッシュの読み込みに失敗しました: {path}, エラー: {e}")
+            return None
+
+    def _decode(self, key: str, payload: str) -> Optional[dict]:
+        try:
+            return json.loads(payload)
+        except ValueError as e:
+            logger.warning(f"キャッシュの読み込みに失敗しました: {self._disk_path(key)}, エラー: {e}")
+            return None
+
+    def _write_disk(self, key: str, payload: str) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 書き込み途中のファイルを読まれないよう、一時ファイルに書いてから置き換える
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=os.path.dirname(path), suffix=".tmp", delete=False
+            ) as f:
+                f.write(payload)
+            size = os.path.getsize(f.name)
+            try:
+                previous_size = os.path.getsize(path)
+            except OSError:
+                previous_size = 0
+            os.replace(f.name, path)
+            with self._lock:
+                self._disk_bytes += size - previous_size
+                over_limit = self._disk_bytes > self.disk_max_bytes
+            if over_limit:
+                self._evict_disk()
+        except Exception as e:
+            logger.warning(f"キャッシュの書き込みに失敗しました: {path}, エラー: {e}")
+
+    def _iter_disk_entries(self):
+        """ディスク層のエントリを (パス, サイズ, 更新時刻) で列挙"""
+        for root, _, filenames in os.walk(self.disk_dir):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _evict_disk(self) -> None:
+        """合計サイズが上限を下回るまで、古いエントリから削除する"""
+        entries = sorted(self._iter_disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError as e:
+                logger.warning(f"キャッシュの削除に失敗しました: {path}, エラー: {e}")
+        with self._lock:
+            self._disk_bytes = total
+        logger.info(f"ディスクキャッシュを整理しました: {total} bytes")
+
+
+# シングルトンインスタンス
+result_cache = ResultCache(
+    settings.RESULT_CACHE_SIZE,
+    settings.RESULT_CACHE_DIR,
+    settings.RESULT_CACHE_DISK_MAX_BYTES,
+    settings.RESULT_CACHE_MEMORY_MAX_BYTES
+)
@@ -0,0 +1,211 @@
+"""
+ルールプロファイラーモジュール
+校正ルールごとの累積所要時間・検出件数を集計し、時間予算を超えたルールを警告または無効化する
+
+コーパスに対してルールセットを実行し、コストの高い順に表示するコマンドとしても使える:
+
+    python -m app.rule_profiler ドキュメントのディレクトリ [--rules rules.json] [--top 20]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from .config import settings
+from .issues import count_by_rule
+from .proofreading_rules import PREPROCESSING_STAGES
+
+logger = logging.getLogger(__name__)
+
+
+class RuleStats:
+    """ルール1件の累積統計"""
+    __slots__ = ("rule", "documents", "total_seconds", "max_seconds", "matches", "over_budget")
+
+    def __init__(self, rule: str):
+        self.rule = rule
+        self.documents = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.matches = 0
+        self.over_budget = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "rule": self.rule,
+            "documents": self.documents,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(self.total_seconds * 1000 / self.documents, 3) if self.documents else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "matches": self.matches,
+            "over_budget": self.over_budget,
+        }
+
+
+class RuleProfiler:
+    """ルールごとの統計と、時間予算を超えたルールの無効化状態"""
+
+    def __init__(self, budget_ms: float, action: str = "flag", disable_after: int = 1):
+        """
+        Args:
+            budget_ms: ルール1件が文書1件に使える時間（ミリ秒、0の場合は予算を設けない）
+            action: 予算を超えた場合の動作（"flag": 警告のみ / "disable": 無効化）
+            disable_after: 無効化するまでに許容する予算超過の回数
+        """
+        self.budget_ms = budget_ms
+        self.action = action
+        self.disable_after = max(1, disable_after)
+        self._stats: Dict[str, RuleStats] = {}
+        # ルールセットの指紋ごとの無効化されたルール（ルールを更新すると無効化は解除される）
+        self._disabled: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, fingerprint: str, rule_timings: Dict[str, float], matches: Dict[str, int]) -> None:
+        """
+        文書1件分のルールごとの所要時間と検出件数を記録する
+
+        Args:
+            fingerprint: チェックに使ったルールセットの指紋
+            rule_timings: ルールIDごとの所要時間（秒）
+            matches: ルールIDごとの検出件数
+        """
+        with self._lock:
+            for rule, elapsed in rule_timings.items():
+                stats = self._stats.get(rule)
+                if stats is None:
+                    stats = self._stats[rule] = RuleStats(rule)
+                stats.documents += 1
+                stats.total_seconds += elapsed
+                stats.max_seconds = max(stats.max_seconds, elapsed)
+                stats.matches += matches.get(rule, 0)
+                if self.budget_ms and elapsed * 1000 > self.budget_ms:
+                    stats.over_budget += 1
+                    self._handle_over_budget(fingerprint, stats, elapsed)
+
+    def disabled_rules(self, fingerprint: str) -> FrozenSet[str]:
+        """ルールセットで無効化されているルールのID"""
+        return self._disabled.get(fingerprint, frozenset())
+
+    def effective_fingerprint(self, fingerprint: str) -> str:
+        """無効化されたルールを反映した指紋（結果キャッシュのキーに使う）"""
+        disabled = self.disabled_rules(fingerprint)
+        if not disabled:
+            return fingerprint
+        return f"{fingerprint}:-{','.join(sorted(disabled))}"
+
+    def report(self, limit: Optional[int] = None) -> List[dict]:
+        """累積所要時間の長い順にルールの統計を返す"""
+        with self._lock:
+            disabled = set().union(*self._disabled.values()) if self._disabled else set()
+            rows = [
+                dict(stats.to_dict(), disabled=stats.rule in disabled)
+                for stats in sorted(self._stats.values(), key=lambda s: s.total_seconds, reverse=True)
+            ]
+        return rows[:limit] if limit else rows
+
+    def reset(self) -> None:
+        """統計と無効化状態を破棄する"""
+        with self._lock:
+            self._stats.clear()
+            self._disabled.clear()
+
+    def _handle_over_budget(self, fingerprint: str, stats: RuleStats, elapsed: float) -> None:
+        logger.warning(
+            f"ルール「{stats.rule}」が文書1件あたりの時間予算を超えました: "
+            f"{elapsed * 1000:.1f} ms（予算 {self.budget_ms} ms, {stats.over_budget}回目）"
+        )
+        if (
+            self.action != "disable"
+            or stats.rule in PREPROCESSING_STAGES
+            or stats.over_budget < self.disable_after
+        ):
+            return
+        disabled = self._disabled.get(fingerprint, frozenset())
+        if stats.rule not in disabled:
+            self._disabled[fingerprint] = disabled | {stats.rule}
+            logger.error(f"時間予算の超過が続いたため、ルール「{stats.rule}」を無効化しました")
+
+
+# シングルトンインスタンス
+rule_profiler = RuleProfiler(
+    settings.RULE_TIME_BUDGET_MS,
+    settings.RULE_BUDGET_ACTION,
+    settings.RULE_DISABLE_AFTER
+)
+
+
+def iter_corpus_files(paths: Iterable[str]) -> Iterable[str]:
+    """指定されたファイル、およびディレクトリ以下のサポートされている形式のファイルを列挙"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    if os.path.splitext(filename)[1].lower() in settings.SUPPORTED_EXTENSIONS:
+                        yield os.path.join(root, filename)
+        else:
+            yield path
+
+
+def profile_corpus(
+    paths: Iterable[str],
+    rules_path: Optional[str] = None,
+    repeat: int = 1,
+    mode: Optional[str] = None,
+    budget_ms: float = 0
+) -> RuleProfiler:
+    """
+    コーパスに対してルールセットを実行し、ルールごとの統計を集計する
+
+    テキスト抽出は1ファイルにつき1回だけ行い、ルールの適用をrepeat回繰り返す。
+    """
+    from .rules_registry import get_proofreading_rules
+    from .text_extractor import TextExtractor
+
+    rules = get_proofreading_rules(rules_path)
+    profiler = RuleProfiler(budget_ms)
+    for path in iter_corpus_files(paths):
+        try:
+            text = TextExtractor.clean_extracted_text(TextExtractor.extract_text(path))
+        except Exception as e:
+            logger.error(f"テキスト抽出に失敗したためスキップします: {path}, エラー: {e}")
+            continue
+        for _ in range(repeat):
+            rule_timings: Dict[str, float] = {}
+            issues = rules.check_all_rules(text, mode=mode, timings=rule_timings)
+            profiler.record(rules.fingerprint, rule_timings, count_by_rule(issues))
+    return profiler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="コーパスに対して校正ルールを実行し、コストの高い順に表示する")
+    parser.add_argument("paths", nargs="+", help="ドキュメントのファイルまたはディレクトリ")
+    parser.add_argument("--rules", help="rules.jsonのパス（省略時はアプリケーションのルール）")
+    parser.add_argument("--repeat", type=int, default=1, help="各文書にルールを適用する回数")
+    parser.add_argument("--mode", choices=["document", "line"], help="ルールの適用方式")
+    parser.add_argument("--budget-ms", type=float, default=settings.RULE_TIME_BUDGET_MS,
+                        help="文書1件あたりの時間予算（ミリ秒）。超えた回数を over_budget に表示する")
+    parser.add_argument("--top", type=int, help="表示するルール数")
+    parser.add_argument("--json", action="store_true", help="JSON形式で出力する")
+    args = parser.parse_args(argv)
+
+    profiler = profile_corpus(args.paths, args.rules, args.repeat, args.mode, args.budget_ms)
+    rows = profiler.report(args.top)
+    if args.json:
+        json.dump(rows, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+        return 0
+
+    print(f"{'rule':<32} {'docs':>6} {'total_ms':>10} {'mean_ms':>9} {'max_ms':>9} {'matches':>8} {'over':>5}")
+    for row in rows:
+        print(
+            f"{row['rule']:<32} {row['documents']:>6} {row['total_ms']:>10.2f} {row['mean_ms']:>9.3f} "
+            f"{row['max_ms']:>9.3f} {row['matches']:>8} {row['over_budget']:>5}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
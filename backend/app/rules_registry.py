@@ -0,0 +1,206 @@
+"""
+ルールレジストリモジュール
+rules.jsonを検証・コンパイルしたルールセットを保持し、更新時は原子的に書き込んで差し替える
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .proofreading_rules import ProofreadingRules
+from .regex_safety import validate_rules
+
+logger = logging.getLogger(__name__)
+
+# ファイルの署名（更新時刻, サイズ, inode番号）
+FileSignature = Optional[Tuple[int, int, int]]
+
+
+class RulesValidationError(ValueError):
+    """ルールセットの検証に失敗した"""
+
+    def __init__(self, errors: List[dict]):
+        super().__init__("ルールの検証に失敗しました")
+        self.errors = errors
+
+
+def _default_rules_path() -> str:
+    return os.path.join(os.path.dirname(__file__), "rules.json")
+
+
+def _rules_file_signature(rules_path: str) -> FileSignature:
+    """rules.jsonの変更検出用の署名を取得（置き換えも検出できるようinode番号を含める）"""
+    try:
+        stat = os.stat(rules_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _read_rules_file(rules_path: str) -> Tuple[List[Dict], List[dict]]:
+    """rules.jsonを読み込み、(ルール, 検証エラー) を返す"""
+    try:
+        with open(rules_path, encoding="utf-8") as f:
+            rules = json.load(f)
+    except Exception as e:
+        return [], [{"index": None, "id": None, "error": f"rules.jsonの読み込みに失敗しました: {e}"}]
+    if not isinstance(rules, list):
+        return [], [{"index": None, "id": None, "error": "ルールは配列形式で記述してください"}]
+    return rules, validate_rules(rules)
+
+
+def _write_atomically(rules_path: str, rules: List[Dict]) -> None:
+    """
+    一時ファイルに書き込んでから置き換える
+
+    読み込み側や他のプロセスが書きかけのrules.jsonを読むことはない。
+    """
+    directory = os.path.dirname(os.path.abspath(rules_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".rules-", suffix=".json.tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(rules, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(rules_path).st_mode & 0o777)
+        except OSError:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, rules_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class RulesRegistry:
+    """
+    rules.json1件分のコンパイル済みルールセット
+
+    ルールセットは (ファイルの署名, ProofreadingRules) の組として1つの属性で保持し、
+    更新時は組ごと差し替える。読み取り側はロックを取らずに現在のルールセットを参照できる。
+    ルールセット全体の検証に失敗した内容は受け付けず、直前のルールセットを使い続ける。
+    """
+
+    def __init__(self, rules_path: str):
+        self.rules_path = rules_path
+        self._state: Optional[Tuple[FileSignature, ProofreadingRules]] = None
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+
+    def get(self) -> ProofreadingRules:
+        """現在のルールセットを取得する（rules.jsonが変更されていれば読み込み直す）"""
+        signature = _rules_file_signature(self.rules_path)
+        state = self._state
+        if state is not None and state[0] == signature:
+            return state[1]
+        with self._lock:
+            state = self._state
+            if state is None or state[0] != signature:
+                state = self._load(signature)
+            return state[1]
+
+    @property
+    def version(self) -> str:
+        return self.get().version
+
+    def reload(self) -> ProofreadingRules:
+        """rules.jsonを強制的に読み込み直す"""
+        with self._lock:
+            return self._load(_rules_file_signature(self.rules_path))[1]
+
+    def update(self, rules: List[Dict]) -> ProofreadingRules:
+        """
+        ルールセット全体を検証・コンパイルしてから、rules.jsonに書き込んで差し替える
+
+        Raises:
+            RulesValidationError: 検証に失敗したルールがある（rules.jsonは変更しない）
+        """
+        errors = validate_rules(rules)
+        if errors:
+            raise RulesValidationError(errors)
+        compiled = ProofreadingRules(self.rules_path, rules=rules)
+        with self._lock:
+            _write_atomically(self.rules_path, rules)
+            self._state = (_rules_file_signature(self.rules_path), compiled)
+        logger.info(f"ルールを更新しました: バージョン {compiled.version}, {len(rules)}件")
+        return compiled
+
+    def start_watching(self, interval: float) -> None:
+        """rules.jsonの変更を一定間隔で確認し、変更があれば読み込み直すスレッドを起動する"""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="rules-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop_watching.wait(interval):
+            try:
+                self.get()
+            except Exception as e:
+                logger.warning(f"rules.jsonの変更の確認に失敗: {e}")
+
+    def _load(self, signature: FileSignature) -> Tuple[FileSignature, ProofreadingRules]:
+        # 呼び出し側で self._lock を取得していること
+        rules, errors = _read_rules_file(self.rules_path)
+        previous = self._state
+        if errors and previous is not None:
+            # 同じ内容を読み直さないよう署名だけ更新して、直前のルールセットを使い続ける
+            logger.error(
+                f"rules.jsonの検証に失敗したため、バージョン {previous[1].version} のルールを使い続けます: {errors}"
+            )
+            self._state = (signature, previous[1])
+            return self._state
+        if errors:
+            # 起動時は直前のルールセットがないため、コンパイルできないルールを除いて読み込む
+            logger.error(f"rules.jsonの検証に失敗したルールがあります: {errors}")
+        compiled = ProofreadingRules(self.rules_path, rules=rules)
+        self._state = (signature, compiled)
+        if previous is not None and previous[1].version != compiled.version:
+            logger.info(f"rules.jsonの変更を反映しました: バージョン {previous[1].version} → {compiled.version}")
+        return self._state
+
+
+# rules.jsonのパスごとのレジストリ
+_registries: Dict[str, RulesRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_rules_registry(rules_path: str = None) -> RulesRegistry:
+    """rules.jsonのレジストリを取得する（省略時はアプリケーションのルール）"""
+    if rules_path is None:
+        rules_path = _default_rules_path()
+    registry = _registries.get(rules_path)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.setdefault(rules_path, RulesRegistry(rules_path))
+    return registry
+
+
+def get_proofreading_rules(rules_path: str = None) -> ProofreadingRules:
+    """
+    共有のコンパイル済みルールセットを取得する
+
+    rules.jsonが変更された場合のみ再構築し、新しいインスタンスに差し替える。
+    読み取り側はロックを取らずに現在のインスタンスを参照できる。
+    """
+    return get_rules_registry(rules_path).get()
+
+
+def reload_proofreading_rules(rules_path: str = None) -> ProofreadingRules:
+    """ルールセットを強制的に再構築して差し替える"""
+    return get_rules_registry(rules_path).reload()
@@ -0,0 +1,239 @@
+"""
+本番用サーバーモジュール
+重いライブラリ・アプリケーション・コンパイル済みのルールセットを読み込んでから複数のHTTPワーカープロセスをフォークし、
+コピーオンライトで読み込み済みのメモリを共有したまま、1つの待ち受けソケットで並列にリクエストを処理する:
+
+    python -m app.server [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+- SIGHUP: 全ワーカーにルールセットを読み込み直させる（POST /rules で更新した場合も自動で送る）
+- SIGTERM / SIGINT: 全ワーカーを停止して終了する
+- 異常終了したワーカーは起動し直す
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 親プロセスのPIDを渡す環境変数（ワーカーがルールの更新を親に知らせるのに使う）
+MASTER_PID_ENV = "PROOFING_SERVER_PID"
+
+
+def notify_rules_updated() -> None:
+    """
+    ルールセットの更新を他のワーカーに知らせる（サーバーモードで起動していない場合は何もしない）
+
+    親プロセスにSIGHUPを送り、親が全ワーカーに転送する。各ワーカーはrules.jsonの変更を検出しても読み込み直すため、
+    これは次のリクエストより前に新しいルールセットをコンパイルさせるためのもの。
+    """
+    master_pid = os.environ.get(MASTER_PID_ENV)
+    if master_pid and int(master_pid) == os.getppid():
+        os.kill(int(master_pid), signal.SIGHUP)
+
+
+def _reload_rules() -> None:
+    from .rules_registry import reload_proofreading_rules
+
+    try:
+        rules = reload_proofreading_rules()
+        logger.info(f"ルールセットを読み込み直しました: pid {os.getpid()}, バージョン {rules.version}")
+    except Exception as e:
+        logger.error(f"ルールセットの読み込み直しに失敗: {e}")
+
+
+def preload() -> None:
+    """
+    フォークする前に、ワーカーで共有する重いモジュールとルールセットを読み込む
+
+    読み込み後にgc.freeze()で既存のオブジェクトをGCの対象から外し、ワーカーでGCが走っても
+    共有ページに書き込まないようにする（コピーオンライトでの共有を保つ）。
+    スレッドやプロセスプールはフォーク後のワーカーで起動するため、ここでは起動しない。
+    """
+    from . import main  # noqa: F401  アプリケーション
+    from . import morphology
+    from .config import settings
+    from .executor import check_executor
+    from .format_backends import format_backends
+    from .jobs import JobStore, job_manager
+    from .rules_registry import get_proofreading_rules
+
+    rules = get_proofreading_rules()
+    if rules.morphology_backend:
+        morphology.get_tokenizer()
+    logger.info(f"ルールセットを読み込みました: バージョン {rules.version}")
+    # 形式名の誤りはワーカーを起動する前に検出する
+    check_executor.validate_formats()
+    # 抽出ライブラリは指定した形式の分だけ読み込み、それ以外は各ワーカーで最初に使うときに読み込む
+    format_backends.preload(settings.PRELOAD_FORMATS)
+
+    if settings.JOB_STORE_PATH:
+        # 前回の未完了ジョブはここで1回だけ失敗として記録し、ワーカーはSQLiteを共有して使う
+        store = JobStore(settings.JOB_STORE_PATH)
+        store.open()
+        store.close()
+        job_manager.store.shared = True
+
+    gc.collect()
+    gc.freeze()
+
+
+def create_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """ワーカーで共有する待ち受けソケットを作成する"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    """待ち受けソケットを共有するHTTPワーカープロセスを起動・監視する"""
+
+    def __init__(self, sock: socket.socket, workers: int, graceful_timeout: float = 30):
+        self.sock = sock
+        self.workers = max(1, workers)
+        self.graceful_timeout = graceful_timeout
+        self._children: Dict[int, float] = {}  # PID → 起動時刻
+        self._stopping = False
+        self._reload_requested = False
+
+    def run(self) -> int:
+        os.environ[MASTER_PID_ENV] = str(os.getpid())
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        for _ in range(self.workers):
+            self._spawn()
+        logger.info(f"サーバーを起動しました: {self.workers}ワーカー, pid {os.getpid()}")
+
+        while not self._stopping:
+            if self._reload_requested:
+                self._reload_requested = False
+                logger.info("ルールセットの読み込み直しを全ワーカーに指示します")
+                self._signal_children(signal.SIGHUP)
+            self._reap(respawn=True)
+            time.sleep(0.2)
+
+        self._shutdown()
+        return 0
+
+    def _handle_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame) -> None:
+        self._reload_requested = True
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                self._run_worker()
+                code = 0
+            except BaseException as e:
+                logger.error(f"ワーカーが異常終了しました: pid {os.getpid()}, エラー: {e}")
+            finally:
+                # 親プロセスの処理に戻らないよう、ここで終了する
+                os._exit(code)
+        self._children[pid] = time.monotonic()
+
+    def _run_worker(self) -> None:
+        # ワーカーが異常終了した場合に、残ったチェック用のプロセスをまとめて停止できるようプロセスグループを分ける
+        os.setpgid(0, 0)
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        # シグナルハンドラー内でルールをコンパイルせず、別スレッドで読み込み直す
+        signal.signal(
+            signal.SIGHUP,
+            lambda signum, frame: threading.Thread(target=_reload_rules, name="rules-reload", daemon=True).start()
+        )
+
+        import uvicorn
+        from .config import settings
+        from .executor import check_executor
+        from .main import app
+
+        # スレッドを起動する前にプロセスプールを起動する（forkで起動する場合に、他のスレッドの状態を引き継がない）
+        check_executor.start()
+        config = uvicorn.Config(app, log_level=settings.LOG_LEVEL.lower(), timeout_graceful_shutdown=self.graceful_timeout)
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def _reap(self, respawn: bool) -> None:
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+            started = self._children.pop(pid, None)
+            if started is None:
+                continue
+            try:
+                os.killpg(pid, signal.SIGTERM)
+            except (ProcessLookupError, PermissionError):
+                pass
+            if respawn and not self._stopping:
+                logger.error(f"ワーカーが終了したため起動し直します: pid {pid}, 終了ステータス {status}")
+                if time.monotonic() - started < 1:
+                    # 起動直後に終了を繰り返す場合に、フォークし続けないようにする
+                    time.sleep(1)
+                self._spawn()
+
+    def _signal_children(self, signum: int) -> None:
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self._children.pop(pid, None)
+
+    def _shutdown(self) -> None:
+        logger.info("サーバーを停止します")
+        self._signal_children(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self._children and time.monotonic() < deadline:
+            self._reap(respawn=False)
+            time.sleep(0.1)
+        if self._children:
+            logger.warning(f"停止しなかったワーカーを強制終了します: {sorted(self._children)}")
+            self._signal_children(signal.SIGKILL)
+            while self._children:
+                self._reap(respawn=False)
+                time.sleep(0.1)
+        self.sock.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    # 設定はモジュールの読み込み時に確定するため、既定値はアプリケーションを読み込む前に設定する。
+    # チェック用のプロセスプールはHTTPワーカーごとに持ち、読み込み済みのメモリを引き継げるようforkで起動する。
+    # 抽出ライブラリも全ワーカーで共有できるよう、既定ではすべての形式の分をフォーク前に読み込む
+    os.environ.setdefault("WORKER_PROCESSES", "1")
+    os.environ.setdefault("WORKER_START_METHOD", "fork")
+    os.environ.setdefault("PRELOAD_FORMATS", "pdf,docx,xlsx,pptx")
+    from .config import settings
+
+    parser = argparse.ArgumentParser(description="複数のワーカープロセスでAPIサーバーを起動する")
+    parser.add_argument("--host", default="0.0.0.0", help="待ち受けるアドレス")
+    parser.add_argument("--port", type=int, default=8000, help="待ち受けるポート")
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="HTTPワーカープロセス数")
+    parser.add_argument("--graceful-timeout", type=float, default=30, help="停止時に処理中のリクエストを待つ秒数")
+    args = parser.parse_args(argv)
+
+    preload()
+    sock = create_socket(args.host, args.port)
+    logger.info(f"待ち受けを開始しました: {args.host}:{args.port}")
+    return PreforkServer(sock, args.workers, args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+合成コーパス生成モジュール
+ベンチマーク用に、大きさと問題の密度を指定した .docx / .xlsx / .pptx / .pdf ファイルを生成する
+
+同じシード・同じ引数からは同じ内容のファイルが生成される:
+
+    python -m app.synthetic_corpus 出力ディレクトリ [--formats docx,xlsx,pptx,pdf] [--sizes 2000,20000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Dict, List, Optional, Sequence
+
+SUPPORTED_FORMATS = ("docx", "xlsx", "pptx", "pdf")
+
+# 問題を含まない文
+CLEAN_SENTENCES = [
+    "本書では、文書校正システムの構成を説明します。",
+    "アップロードされたファイルからテキストを抽出します。",
+    "抽出したテキストは行ごとに整形されます。",
+    "検出結果は一覧で確認できます。",
+    "設定は環境変数で変更できます。",
+    "処理が完了すると結果が表示されます。",
+    "対応している形式は四種類です。",
+    "詳細は付録を参照してください。",
+]
+
+# 問題を1件以上含む文（組み込みルールのいずれかに該当する）
+ISSUE_SENTENCES = [
+    "私は私は会議に出席しました。",  # 同一語句の連続・二重助詞
+    "サーバの設定を確認します。",  # 表記ゆれ
+    "ユーザは画面から操作できる。",  # 表記ゆれ・文体の混在の材料
+    "結果を保存することができます。",  # 冗長表現
+    "まず最初に手順を確認します。",  # 冗長表現
+    "コンピュータとコンピューターを比較します。",  # カタカナ表記の不統一
+    "ファイル​を開きます。",  # ゼロ幅スペース
+    "この機能は便利である。",  # 文体の混在の材料
+    "入力されたデータを検証し、形式を確認し、不足している項目を補い、重複している行を取り除き、"
+    "文字コードを統一し、表記を揃え、最後に結果をまとめて出力するという一連の処理を順番に実行します。",  # 長い文
+]
+
+# PDFの1行に収める文字数と1ページの行数
+PDF_CHARS_PER_LINE = 40
+PDF_LINES_PER_PAGE = 60
+
+
+def generate_paragraphs(rng: random.Random, target_chars: int, issue_density: float) -> List[str]:
+    """
+    合計がおおよそtarget_chars文字になる段落のリストを生成する
+
+    Args:
+        rng: 乱数生成器
+        target_chars: 生成する文字数の目安
+        issue_density: 問題を含むよう作った文の割合（0〜1）。助詞の重複などの簡易判定は、
+                       問題を含まない文どうしの組み合わせでも検出されることがある
+    """
+    paragraphs = []
+    total = 0
+    while total < target_chars:
+        sentences = []
+        for _ in range(rng.randint(1, 4)):
+            pool = ISSUE_SENTENCES if rng.random() < issue_density else CLEAN_SENTENCES
+            sentence = rng.choice(pool)
+            # 同じ文が続くと同一語句の連続として検出されるため、続けて選ばない
+            while sentences and sentence == sentences[-1]:
+                sentence = rng.choice(pool)
+            sentences.append(sentence)
+        paragraph = "".join(sentences)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 1
+    return paragraphs
+
+
+def write_docx(path: str, paragraphs: List[str]) -> None:
+    from docx import Document
+
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def write_xlsx(path: str, paragraphs: List[str]) -> None:
+    from openpyxl import Workbook
+
+    # 1行に3セルずつ、1,000行ごとにシートを分ける
+    workbook = Workbook(write_only=True)
+    sheet = None
+    for i in range(0, len(paragraphs), 3):
+        if i % 3000 == 0:
+            sheet = workbook.create_sheet(f"Sheet{i // 3000 + 1}")
+        sheet.append(paragraphs[i:i + 3])
+    if sheet is None:
+        workbook.create_sheet("Sheet1")
+    workbook.save(path)
+
+
+def write_pptx(path: str, paragraphs: List[str]) -> None:
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    # 1スライドに5段落ずつ
+    presentation = Presentation()
+    layout = presentation.slide_layouts[6]
+    for i in range(0, len(paragraphs), 5):
+        slide = presentation.slides.add_slide(layout)
+        frame = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(6.5)).text_frame
+        frame.text = paragraphs[i]
+        for paragraph in paragraphs[i + 1:i + 5]:
+            frame.add_paragraph().text = paragraph
+    presentation.save(path)
+
+
+def write_pdf(path: str, paragraphs: List[str]) -> None:
+    import fitz  # PyMuPDF
+
+    # 段落はPDF_CHARS_PER_LINE文字ごとに折り返す（実際のPDFと同じく、文の途中で改行が入る）
+    lines = []
+    for paragraph in paragraphs:
+        lines.extend(
+            paragraph[i:i + PDF_CHARS_PER_LINE] for i in range(0, len(paragraph), PDF_CHARS_PER_LINE)
+        )
+    document = fitz.open()
+    for i in range(0, max(len(lines), 1), PDF_LINES_PER_PAGE):
+        page = document.new_page()
+        page.insert_text(
+            (50, 50), "\n".join(lines[i:i + PDF_LINES_PER_PAGE]), fontname="japan", fontsize=10
+        )
+    document.save(path)
+    document.close()
+
+
+WRITERS = {
+    "docx": write_docx,
+    "xlsx": write_xlsx,
+    "pptx": write_pptx,
+    "pdf": write_pdf,
+}
+
+
+def generate_corpus(
+    output_dir: str,
+    formats: Sequence[str] = SUPPORTED_FORMATS,
+    sizes: Sequence[int] = (2000, 20000),
+    count: int = 3,
+    issue_density: float = 0.2,
+    seed: int = 0
+) -> List[Dict]:
+    """
+    形式・大きさの組み合わせごとにcount件のファイルを生成し、manifest.jsonに一覧を書き出す
+
+    ファイルごとにシードを派生させるため、形式や大きさを追加しても既存のファイルの内容は変わらない。
+
+    Returns:
+        生成したファイルの一覧（manifest.jsonのfilesと同じ）
+    """
+    for file_format in formats:
+        if file_format not in WRITERS:
+            raise ValueError(f"サポートされていない形式です: {file_format}")
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    for file_format in formats:
+        for size in sizes:
+            for index in range(count):
+                name = f"{file_format}-{size}-{index:03d}.{file_format}"
+                rng = random.Random(f"{seed}:{size}:{index}:{issue_density}")
+                paragraphs = generate_paragraphs(rng, size, issue_density)
+                WRITERS[file_format](os.path.join(output_dir, name), paragraphs)
+                files.append({
+                    "file": name,
+                    "format": file_format,
+                    "chars": sum(len(p) + 1 for p in paragraphs),
+                    "bytes": os.path.getsize(os.path.join(output_dir, name)),
+                })
+    manifest = {
+        "seed": seed,
+        "issue_density": issue_density,
+        "sizes": list(sizes),
+        "count": count,
+        "files": files,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return files
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ベンチマーク用の合成コーパスを生成する")
+    parser.add_argument("output_dir", help="出力先ディレクトリ")
+    parser.add_argument("--formats", default=",".join(SUPPORTED_FORMATS),
+                        help="生成する形式（カンマ区切り）")
+    parser.add_argument("--sizes", type=_int_list, default=[2000, 20000],
+                        help="1ファイルあたりの文字数の目安（カンマ区切り）")
+    parser.add_argument("--count", type=int, default=3, help="形式・大きさの組み合わせごとのファイル数")
+    parser.add_argument("--issue-density", type=float, default=0.2, help="問題を含む文の割合（0〜1）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip().lstrip(".") for f in args.formats.split(",") if f.strip()]
+    files = generate_corpus(args.output_dir, formats, args.sizes, args.count, args.issue_density, args.seed)
+    print(f"{len(files)}ファイルを生成しました: {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,11 @@
 """
 ユーティリティ関数モジュール
 """
+import hashlib
 import logging
 import os
 import tempfile
-from typing import List
+from typing import List, NamedTuple, Optional, Tuple, Union
 from pathlib import Path
 
 from fastapi import UploadFile, HTTPException
@@ -17,6 +18,20 @@ logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
 
+class StoredUpload(NamedTuple):
+    """受信済みのアップロードファイル（メモリ上の内容、または一時ファイル）"""
+    filename: str
+    content_hash: str
+    size: int
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+    
+    @property
+    def source(self) -> Union[bytes, str]:
+        """テキスト抽出に渡す抽出元（メモリ上の内容または一時ファイルのパス）"""
+        return self.data if self.data is not None else self.path
+
+
 class FileHandler:
     """ファイル処理用ユーティリティクラス"""
     
@@ -64,30 +79,98 @@ class FileHandler:
     @staticmethod
     def save_temp_file(upload_file: UploadFile) -> str:
         """アップロードファイルを一時ファイルとして保存"""
+        return FileHandler.save_temp_file_with_hash(upload_file)[0]
+    
+    @staticmethod
+    def save_temp_file_with_hash(upload_file: UploadFile) -> Tuple[str, str]:
+        """
+        アップロードファイルを一時ファイルとして保存し、内容のハッシュと共に返す
+        
+        Returns:
+            (一時ファイルのパス, 内容のSHA-256ハッシュ)
+        """
+        upload = FileHandler.store_upload(upload_file, memory_limit=-1)
+        return upload.path, upload.content_hash
+    
+    @staticmethod
+    def store_upload(
+        upload_file: UploadFile,
+        memory_limit: Optional[int] = None,
+        temp_files: Optional[List[str]] = None
+    ) -> StoredUpload:
+        """
+        アップロードファイルを受信し、小さなファイルはメモリ上に、大きなファイルは一時ファイルに保持する
+        
+        Args:
+            upload_file: アップロードファイル
+            memory_limit: メモリ上に保持する最大サイズ（バイト）。省略時は
+                          settings.IN_MEMORY_UPLOAD_LIMIT、負の値の場合は常に一時ファイルに保存する
+            temp_files: 一時ファイルを作成した時点で、そのパスを追加するリスト（受信の途中で呼び出し側が
+                        中止された場合も、呼び出し側でクリーンアップできるようにする）
+        
+        Returns:
+            受信したファイル（一時ファイルを作成した場合は呼び出し側で削除する）
+        """
+        if memory_limit is None:
+            memory_limit = settings.IN_MEMORY_UPLOAD_LIMIT
+        suffix = Path(upload_file.filename).suffix
+        temp_file = None
         try:
-            suffix = Path(upload_file.filename).suffix
-            with tempfile.NamedTemporaryFile(
-                delete=False, 
-                suffix=suffix,
-                dir=settings.TEMP_DIR
-            ) as temp_file:
-                content = upload_file.file.read()
+            hasher = hashlib.sha256()
+            size = 0
+            chunks = []
+            if memory_limit < 0:
+                temp_file = FileHandler._create_temp_file(suffix, temp_files)
+            # 一定サイズずつ読み込み、メモリ使用量をチャンクサイズ（またはmemory_limit）に抑える
+            while True:
+                chunk = upload_file.file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
                 
-                # ファイルサイズのチェック（実際のサイズ）
-                if len(content) > settings.MAX_FILE_SIZE:
+                # ファイルサイズのチェック（上限を超えた時点で中断）
+                if size > settings.MAX_FILE_SIZE:
                     raise HTTPException(
                         status_code=400, 
-                        detail=f"ファイルサイズが上限を超えています: {len(content)} bytes"
+                        detail=f"ファイルサイズが上限を超えています: {size} bytes 以上"
                     )
                 
-                temp_file.write(content)
-                logger.info(f"一時ファイルを保存しました: {temp_file.name}")
-                return temp_file.name
+                hasher.update(chunk)
+                if temp_file is None and size > memory_limit:
+                    # メモリ上に保持する上限を超えたら一時ファイルに切り替える
+                    temp_file = FileHandler._create_temp_file(suffix, temp_files)
+                    for buffered in chunks:
+                        temp_file.write(buffered)
+                    chunks = []
+                if temp_file is not None:
+                    temp_file.write(chunk)
+                else:
+                    chunks.append(chunk)
+            
+            if temp_file is not None:
+                temp_file.close()
+                logger.info(f"一時ファイルを保存しました: {temp_file.name} ({size} bytes)")
+                return StoredUpload(upload_file.filename, hasher.hexdigest(), size, path=temp_file.name)
+            return StoredUpload(upload_file.filename, hasher.hexdigest(), size, data=b''.join(chunks))
                 
         except Exception as e:
-            logger.error(f"一時ファイルの保存に失敗しました: {e}")
+            # 書きかけの一時ファイルを残さない
+            if temp_file is not None:
+                temp_file.close()
+                FileHandler.cleanup_temp_files([temp_file.name])
+            if isinstance(e, HTTPException):
+                logger.error(f"ファイルの受信を中断しました: {e.detail}")
+                raise
+            logger.error(f"ファイルの受信に失敗しました: {e}")
             raise HTTPException(status_code=500, detail="ファイルの保存に失敗しました")
     
+    @staticmethod
+    def _create_temp_file(suffix: str, temp_files: Optional[List[str]] = None):
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=settings.TEMP_DIR)
+        if temp_files is not None:
+            temp_files.append(temp_file.name)
+        return temp_file
+    
     @staticmethod
     def cleanup_temp_files(temp_files: List[str]) -> None:
         """一時ファイルを削除"""
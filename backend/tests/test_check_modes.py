@@ -0,0 +1,74 @@
+"""
+ルール適用方式の回帰テスト
+文書全体に一括適用する方式（check_document）と行ごとに適用する方式（check_lines）が、
+同じ問題を同じ順序・同じ行番号・同じ列位置で返すことを確認する
+
+実行方法（backendディレクトリで）:
+    python -m unittest discover tests
+"""
+import unittest
+
+from app.proofreading_rules import ProofreadingRules
+
+# 行頭・行末のアンカーや、サロゲートペアになる文字を含む外部ルール
+EXTERNAL_RULES = [
+    {"id": "line-start", "pattern": "^それで", "message": "行頭の接続詞: '{match}'"},
+    {"id": "line-end", "pattern": "ます$", "message": "行末の表現: '{match}'"},
+    {"id": "emoji", "pattern": "😀+", "message": "絵文字: '{match}'"},
+    {"id": "duplicate-kana", "pattern": "([ぁ-ゖ]{1,2})\\1", "message": "重複: '{match}'"},
+    {"id": "server-notation", "pattern": "(サーバ|サーバー)", "message": "表記ゆれ: '{match}'"},
+]
+
+TEXTS = {
+    "複数行": (
+        "これはテストである。\n"
+        "サーバの設定をします。\n"
+        "ユーザとユーザーが混在しています。\n"
+    ),
+    "CRLF": (
+        "それでは始めます\r\n"
+        "サーバーを起動することができる。\r\n"
+        "\r\n"
+        "これはペンです。これは本である。\r\n"
+    ),
+    "空行": "\n\n\nサーバ\n\n\nそれで終わります",
+    "Unicode": (
+        "😀😀サーバ𠮷野家のののでで​テスト\n"
+        "𠮷😀サーバーを使用します。\n"
+        "ｻｰﾊﾞｰ　全角スペース　です。\n"
+        + "あ" * 130 + "。\n"
+    ),
+    "行をまたぐ長い文": "これは" + "い" * 70 + "\n" + "う" * 70 + "です。\n",
+    "空文字列": "",
+}
+
+
+class CheckModeTest(unittest.TestCase):
+    """check_documentとcheck_linesの結果の一致"""
+
+    def assert_same_issues(self, rules: ProofreadingRules) -> None:
+        for name, text in TEXTS.items():
+            with self.subTest(text=name):
+                document_issues = [issue.to_dict() for issue in rules.check_document(text)]
+                line_issues = [issue.to_dict() for issue in rules.check_lines(text)]
+                self.assertEqual(document_issues, line_issues)
+
+    def test_application_rules(self):
+        self.assert_same_issues(ProofreadingRules())
+
+    def test_external_rules(self):
+        self.assert_same_issues(ProofreadingRules(rules=EXTERNAL_RULES))
+
+    def test_line_and_column(self):
+        """行番号と列位置（1始まり、サロゲートペアも1文字として数える）"""
+        rules = ProofreadingRules(rules=EXTERNAL_RULES)
+        text = TEXTS["Unicode"]
+        for issues in (rules.check_document(text), rules.check_lines(text)):
+            positions = [(issue.line, issue.column) for issue in issues if issue.info.rule == "server-notation"]
+            self.assertEqual(positions, [(1, 3), (2, 3)])
+            positions = [(issue.line, issue.column) for issue in issues if issue.info.rule == "emoji"]
+            self.assertEqual(positions, [(1, 1), (2, 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+ジョブキューの回帰テスト
+同時に登録されたジョブが、キューの上限と実行待ちのファイルサイズの上限を超えないことを確認する
+
+実行方法（backendディレクトリで）:
+    python -m unittest discover tests
+"""
+import asyncio
+import unittest
+
+from fastapi import HTTPException
+
+from app.jobs import JobManager, JobStore
+from app.utils import StoredUpload
+
+
+async def _never_called(upload: StoredUpload) -> dict:
+    raise AssertionError("ワーカーを起動していないため呼び出されない")
+
+
+class JobSubmitTest(unittest.IsolatedAsyncioTestCase):
+    """上限に達したキューへの同時登録"""
+
+    async def asyncSetUp(self):
+        self.store = JobStore()
+
+    async def asyncTearDown(self):
+        await self.manager.stop()
+
+    def start(self, queue_size: int, max_queued_bytes: int = 0) -> None:
+        # ワーカーを起動せず、登録したジョブをキューに積まれたままにする
+        self.manager = JobManager(self.store, queue_size, concurrency=0, max_queued_bytes=max_queued_bytes)
+        self.manager.start(_never_called)
+
+    async def submit_concurrently(self, inputs: list) -> tuple:
+        outcomes = await asyncio.gather(
+            *[self.manager.submit(item) for item in inputs], return_exceptions=True
+        )
+        accepted = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+        rejected = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        return accepted, rejected
+
+    def assert_busy(self, errors: list) -> None:
+        for error in errors:
+            self.assertIsInstance(error, HTTPException)
+            self.assertEqual(error.status_code, 503)
+            self.assertIn("Retry-After", error.headers)
+
+    async def test_concurrent_submits_to_full_queue(self):
+        self.start(queue_size=2)
+        error_result = {"filename": "a.docx", "status": "error", "issues": []}
+        accepted, rejected = await self.submit_concurrently([[error_result] for _ in range(6)])
+
+        self.assertEqual(len(accepted), 2)
+        self.assertEqual(len(rejected), 4)
+        self.assert_busy(rejected)
+        # 断ったジョブは保存されず、「queued」のまま残るジョブもない
+        self.assertEqual(sorted(self.store._jobs), sorted(job.job_id for job in accepted))
+        self.assertEqual(self.manager._queue.qsize(), 2)
+
+    async def test_concurrent_submits_over_queued_bytes(self):
+        self.start(queue_size=10, max_queued_bytes=1000)
+        uploads = [[StoredUpload(f"{i}.pdf", f"hash{i}", 600, data=b"x")] for i in range(4)]
+        accepted, rejected = await self.submit_concurrently(uploads)
+
+        # 実行待ちのジョブがないときは上限を超えるジョブも受け付け、以降は上限まで
+        self.assertEqual(len(accepted), 1)
+        self.assertEqual(len(rejected), 3)
+        self.assert_busy(rejected)
+        self.assertEqual(self.manager._queued_bytes, 600)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+文の区切りの回帰テスト
+PDFなどで文の途中に入った改行（折り返し）だけを文の続きとみなし、
+見出しや短い文書の行を前後の行とつなげないことを確認する
+
+実行方法（backendディレクトリで）:
+    python -m unittest discover tests
+"""
+import unittest
+
+from app.proofreading_rules import LineIndex, ProofreadingRules, SentenceIndex
+
+HEADING = "第一章　文書校正システムの概要と基本的な設計方針について"
+PARAGRAPH = "本章では、" + "文書校正システムの構成と処理の流れを説明し、" * 4 + "各機能の役割を整理します。"
+# 文の範囲には句点を含まない
+SENTENCE = PARAGRAPH[:-1]
+
+
+def sentences_of(text: str) -> list:
+    index = SentenceIndex(text, LineIndex(text))
+    return [text[start:end] for start, end in zip(index.starts, index.ends)]
+
+
+class SentenceIndexTest(unittest.TestCase):
+    """折り返しの判定"""
+
+    def test_two_line_document(self):
+        # 行が2行しかない場合は、句点で終わらない長い行でも次の行とつなげない
+        text = HEADING + "\n" + PARAGRAPH
+        self.assertEqual(sentences_of(text), [HEADING, SENTENCE])
+
+    def test_heading_followed_by_paragraph(self):
+        # 見出しの長さが基準になる場合（段落が1つだけ）と、段落の長さが基準になる場合
+        second_heading = HEADING.replace("一", "二")
+        for text, expected in (
+            (HEADING + "\n" + PARAGRAPH + "\n", [HEADING, SENTENCE]),
+            (
+                HEADING + "\n" + PARAGRAPH + "\n" + second_heading + "\n" + PARAGRAPH + "\n",
+                [HEADING, SENTENCE, second_heading, SENTENCE]
+            ),
+        ):
+            with self.subTest(lines=text.count("\n")):
+                self.assertEqual(sentences_of(text), expected)
+
+    def test_heading_is_not_reported_as_long_sentence(self):
+        rules = ProofreadingRules(rules=[])
+        for case, text in enumerate((
+            HEADING + "\n" + PARAGRAPH,
+            HEADING + "\n" + PARAGRAPH + "\n",
+            HEADING + "\n" + PARAGRAPH + "\n" + HEADING + "\n" + PARAGRAPH + "\n",
+        )):
+            with self.subTest(case=case):
+                issues = rules.check_document(text)
+                self.assertEqual([issue for issue in issues if issue.info.rule == "max-sentence-length"], [])
+
+    def test_wrapped_paragraph(self):
+        # 同じ長さで折り返された行が続く場合は、1つの文とみなす
+        width = 30
+        lines = [PARAGRAPH[i:i + width] for i in range(0, len(PARAGRAPH), width)]
+        text = "第一章　概要\n" + "\n".join(lines) + "\n"
+        self.assertEqual(sentences_of(text), ["第一章　概要", "\n".join(lines)[:-1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -54,7 +54,19 @@ function App() {
     setState(prev => ({ ...prev, isChecking: true, error: null, checkResults: null }));
 
     try {
-      const results = await api.checkFiles(files);
+      // 完了したファイルから順に結果を表示する
+      const partialResults: CheckResponse['results'] = [];
+      const results = await api.checkFilesStream(files, (record) => {
+        partialResults.push(record.result);
+        setState(prev => ({
+          ...prev,
+          checkResults: {
+            total_files: files.length,
+            processed_files: partialResults.filter(r => r.status === 'success').length,
+            results: [...partialResults],
+          },
+        }));
+      });
       setState(prev => ({ ...prev, checkResults: results, isChecking: false }));
     } catch (error) {
       console.error('Failed to check documents:', error);
@@ -1,10 +1,10 @@
 import axios from 'axios';
 import type { AxiosResponse, AxiosError } from 'axios';
 
-import type { CheckResponse, HealthResponse, ConfigResponse } from '../types/api';
+import type { CheckResponse, CheckStreamRecord, CheckStreamResultRecord, HealthResponse, ConfigResponse } from '../types/api';
 
 // APIベースURL（環境変数から取得、デフォルトは開発環境のURL）
-const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
+export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
 // Axiosインスタンスの作成
 const apiClient = axios.create({
@@ -77,6 +77,58 @@ export const api = {
         return response.data;
     },
 
+    // ファイルチェック実行（結果をファイルごとに逐次受け取る）
+    checkFilesStream: async (
+        files: File[],
+        onResult: (record: CheckStreamResultRecord) => void,
+    ): Promise<CheckResponse> => {
+        const formData = new FormData();
+
+        files.forEach((file) => {
+            formData.append('files', file);
+        });
+
+        const response = await fetch(`${API_BASE_URL}/check/stream?format=ndjson`, {
+            method: 'POST',
+            body: formData,
+        });
+        if (!response.ok || !response.body) {
+            throw new Error(`API Error: ${response.status}`);
+        }
+
+        const results: CheckResponse['results'] = new Array(files.length);
+        let summary = { total_files: files.length, processed_files: 0 };
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+
+        const handleLine = (line: string) => {
+            if (!line.trim()) {
+                return;
+            }
+            const record = JSON.parse(line) as CheckStreamRecord;
+            if (record.type === 'result') {
+                results[record.index] = record.result;
+                onResult(record);
+            } else if (record.type === 'summary') {
+                summary = { total_files: record.total_files, processed_files: record.processed_files };
+            }
+        };
+
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += value;
+            const lines = buffer.split('\n');
+            buffer = lines.pop() ?? '';
+            lines.forEach(handleLine);
+        }
+        handleLine(buffer);
+
+        return { ...summary, results: results.filter(Boolean) };
+    },
+
     // 簡単なヘルスチェック
     ping: async (): Promise<{ message: string }> => {
         const response = await apiClient.get<{ message: string }>('/');
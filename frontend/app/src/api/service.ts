@@ -1,5 +1,5 @@
-import apiClient from './client';
-import type { CheckResponse, HealthResponse, ConfigResponse } from '../types/api';
+import apiClient, { api } from './client';
+import type { CheckResponse, CheckStreamResultRecord, HealthResponse, ConfigResponse } from '../types/api';
 
 export class ApiService {
     // ヘルスチェック
@@ -30,6 +30,14 @@ export class ApiService {
 
         return response.data;
     }
+
+    // ドキュメントチェック（完了したファイルから順に結果を受け取る）
+    static async checkDocumentsStream(
+        files: File[],
+        onResult: (record: CheckStreamResultRecord) => void,
+    ): Promise<CheckResponse> {
+        return api.checkFilesStream(files, onResult);
+    }
 }
 
 export default ApiService;
@@ -25,6 +25,21 @@ export interface CheckResponse {
     results: FileCheckResult[];
 }
 
+// ストリーミングチェック（/check/stream）のレコード
+export interface CheckStreamResultRecord {
+    type: 'result';
+    index: number;
+    result: FileCheckResult;
+}
+
+export interface CheckStreamSummaryRecord {
+    type: 'summary';
+    total_files: number;
+    processed_files: number;
+}
+
+export type CheckStreamRecord = CheckStreamResultRecord | CheckStreamSummaryRecord;
+
 export interface HealthResponse {
     status: string;
     timestamp: string;